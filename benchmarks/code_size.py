@@ -0,0 +1,103 @@
+"""
+Measures the size of instrumented code across the example programs: source
+size, size of the compiled `.pyc` and the time to load each module cold
+(compile from source, without cached bytecode) and warm (unmarshal the
+`.pyc`), for the original modules and for the modules instrumented in the
+default and in the compact mode. The modules are not executed, as some
+example programs need packages that may not be installed.
+
+    python benchmarks/code_size.py --analysis dynapyt.analyses.TraceAll.TraceAll
+"""
+
+import argparse
+import importlib.util
+import marshal
+import os
+import py_compile
+import shutil
+import tempfile
+import time
+
+from dynapyt.instrument.instrument import instrument_file
+from dynapyt.utils.hooks import get_hooks_from_analysis
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "--directory",
+    help="Programs to instrument",
+    default=os.path.join(os.path.dirname(__file__), "..", "example_programs"),
+)
+parser.add_argument(
+    "--analysis",
+    help="Analysis class(es) (full dotted path)",
+    nargs="+",
+    default=["dynapyt.analyses.TraceAll.TraceAll"],
+)
+parser.add_argument(
+    "--repeat", help="Loads per module, the fastest counts", type=int, default=5
+)
+
+
+def measure(files, repeat):
+    source_size = pyc_size = cold = warm = 0
+    for file in files:
+        with open(file, "rb") as f:
+            src = f.read()
+        source_size += len(src)
+        pyc = py_compile.compile(file, cfile=file + "c", doraise=True)
+        pyc_size += os.path.getsize(pyc)
+        cold += min(timed(lambda: compile(src, file, "exec")) for _ in range(repeat))
+        with open(pyc, "rb") as f:
+            data = f.read()[16:]
+        warm += min(timed(lambda: marshal.loads(data)) for _ in range(repeat))
+    return source_size, pyc_size, cold, warm
+
+
+def timed(action):
+    start = time.perf_counter()
+    action()
+    return time.perf_counter() - start
+
+
+def copy_programs(directory, target):
+    shutil.copytree(directory, target, ignore=shutil.ignore_patterns("*.json"))
+    files = []
+    for dir_path, _, names in os.walk(target):
+        for name in names:
+            file = os.path.join(dir_path, name)
+            if name.endswith(".py.orig"):
+                # some programs are kept instrumented, measure their originals
+                shutil.move(file, file[: -len(".orig")])
+            elif name.endswith(".py"):
+                files.append(file)
+    return sorted(file for file in files if instrumentable(file))
+
+
+def instrumentable(file):
+    with open(file) as f:
+        return "DYNAPYT: DO NOT INSTRUMENT" not in f.read()
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    selected_hooks = get_hooks_from_analysis(args.analysis)
+    work_dir = tempfile.mkdtemp()
+    try:
+        runs = [("original", None), ("instrumented", False), ("compact", True)]
+        results = []
+        for name, compact in runs:
+            files = copy_programs(args.directory, os.path.join(work_dir, name))
+            if compact is not None:
+                for file in files:
+                    instrument_file(file, selected_hooks, compact)
+            results.append((name, len(files), measure(files, args.repeat)))
+        print(
+            f"{'':<14} {'files':>6} {'source':>10} {'.pyc':>10} {'cold ms':>10} {'warm ms':>10}"
+        )
+        for name, count, (source_size, pyc_size, cold, warm) in results:
+            print(
+                f"{name:<14} {count:>6} {source_size:>10} {pyc_size:>10} "
+                f"{cold * 1e3:>10.2f} {warm * 1e3:>10.2f}"
+            )
+    finally:
+        shutil.rmtree(work_dir)
@@ -0,0 +1,65 @@
+"""
+Measures the overhead of instrumented for loops over ranges, lists and dict
+items: once with an analysis that implements enter_for, once with an
+analysis that implements no hook of the loop, and without instrumentation.
+Loops are driven through dynapyt.runtime._gen_ like instrumented code
+would do.
+
+    python benchmarks/for_loops.py --items 200000 --repeat 5
+"""
+
+import argparse
+import time
+import dynapyt.runtime as _rt
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "--items", help="Number of items per loop", type=int, default=200000
+)
+parser.add_argument(
+    "--repeat", help="Runs per loop, the fastest counts", type=int, default=5
+)
+
+
+class EnterFor(BaseAnalysis):
+    def enter_for(self, dyn_ast, iid, next_value, iterable):
+        pass
+
+
+class NoLoopHooks(BaseAnalysis):
+    def integer(self, dyn_ast, iid, val):
+        pass
+
+
+def run_loop(iterable, instrumented):
+    dyn_ast = "/bench/program.py"
+    start = time.perf_counter()
+    if instrumented:
+        for _ in _rt._gen_(dyn_ast, 1, iterable):
+            pass
+    else:
+        for _ in iterable:
+            pass
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    n = args.items
+    iterables = [
+        ("range", lambda: range(n)),
+        ("list", lambda: list(range(n))),
+        ("dict items", lambda: dict.fromkeys(range(n)).items()),
+    ]
+    runs = [
+        ("enter_for", EnterFor(), True),
+        ("no loop hooks", NoLoopHooks(), True),
+        ("uninstrumented", None, False),
+    ]
+    for name, analysis, instrumented in runs:
+        _rt.analyses = [analysis] if analysis is not None else []
+        for kind, make in iterables:
+            iterable = make()
+            duration = min(run_loop(iterable, instrumented) for _ in range(args.repeat))
+            print(f"{name:<16} {kind:<12} {duration * 1e9 / n:>10.1f} ns/item")
@@ -0,0 +1,96 @@
+"""
+Measures the overhead of constant literals in a hot loop: once with an
+analysis that inventories the literals on every evaluation, once with the
+same analysis marked with `@once`, which reports every literal only the
+first time, and without instrumentation.
+
+    python benchmarks/literals.py --iterations 200000 --repeat 5
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "--iterations", help="Iterations of the loop", type=int, default=200000
+)
+parser.add_argument(
+    "--repeat", help="Runs per configuration, the fastest counts", type=int, default=5
+)
+
+PROGRAM = """
+def work(n):
+    total = 0
+    for i in range(n):
+        total += i * 3 + 7 - 2
+        if "key" == "value" or 1.5 > 2.5:
+            total -= 1
+    return total
+"""
+
+ANALYSES = """
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+from dynapyt.instrument.filters import once
+
+
+class Inventory(BaseAnalysis):
+    def literal(self, dyn_ast, iid, val):
+        pass
+
+
+class InventoryOnce(BaseAnalysis):
+    @once
+    def literal(self, dyn_ast, iid, val):
+        pass
+"""
+
+
+def instrument(directory, analysis):
+    from dynapyt.instrument.instrument import instrument_file
+    from dynapyt.utils.hooks import get_hooks_from_analysis
+
+    program = os.path.join(directory, f"program_{analysis.lower()}.py")
+    with open(program, "w") as f:
+        f.write(PROGRAM)
+    instrument_file(program, get_hooks_from_analysis([f"bench_analyses.{analysis}"]))
+
+
+def run(directory, module, analysis, n):
+    import dynapyt.runtime as _rt
+    from importlib import import_module
+
+    _rt.set_analysis([f"bench_analyses.{analysis}"] if analysis else [])
+    work = import_module(module).work
+    start = time.perf_counter()
+    work(n)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    directory = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(directory, "bench_analyses.py"), "w") as f:
+            f.write(ANALYSES)
+        with open(os.path.join(directory, "program_plain.py"), "w") as f:
+            f.write(PROGRAM)
+        sys.path.insert(0, directory)
+        for analysis in ("Inventory", "InventoryOnce"):
+            instrument(directory, analysis)
+        runs = [
+            ("literal", "program_inventory", "Inventory"),
+            ("literal, @once", "program_inventoryonce", "InventoryOnce"),
+            ("uninstrumented", "program_plain", None),
+        ]
+        for name, module, analysis in runs:
+            duration = min(
+                run(directory, module, analysis, args.iterations)
+                for _ in range(args.repeat)
+            )
+            print(f"{name:<16} {duration * 1e9 / args.iterations:>10.1f} ns/iteration")
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,62 @@
+"""
+Measures how long importing the runtime takes in a fresh interpreter, which
+every instrumented program pays once, with `python -X importtime`. Also
+lists the slow dependencies that the import loads, which should only be
+loaded when an analysis needs them, e.g. libcst for ASTs.
+
+    python benchmarks/startup.py --repeat 10
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "--repeat", help="Interpreters to start, the fastest counts", type=int, default=10
+)
+parser.add_argument(
+    "--module", help="Module to import", default="dynapyt.runtime", type=str
+)
+parser.add_argument(
+    "--top", help="Number of slowest imported modules to list", type=int, default=10
+)
+
+SLOW_DEPENDENCIES = ["libcst", "filelock", "json", "inspect", "tempfile"]
+
+
+def import_times(module, env):
+    """Cumulative import time in microseconds of every module imported by `module`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    env = dict(os.environ)
+    # measure with cached bytecode, like an installed package
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    import_times(args.module, env)
+    runs = [import_times(args.module, env) for _ in range(args.repeat)]
+    best = min(runs, key=lambda times: times[args.module])
+    print(f"import {args.module}: {best[args.module] / 1e3:.1f} ms")
+    print("slow dependencies loaded:")
+    for name in SLOW_DEPENDENCIES:
+        if name in best:
+            print(f"  {name:<20} {best[name] / 1e3:>8.1f} ms")
+    print(f"slowest of the {len(best)} imported modules:")
+    for name, duration in sorted(best.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"  {name:<40} {duration / 1e3:>8.1f} ms")
@@ -0,0 +1,58 @@
+"""
+Measures how many runtime events per second TraceAll and TraceRecorder
+can record. Events are driven through dynapyt.runtime like instrumented
+code would do.
+
+    python benchmarks/trace_throughput.py --events 200000
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+import dynapyt.runtime as _rt
+from dynapyt.analyses.TraceAll import TraceAll
+from dynapyt.analyses.TraceRecorder import TraceRecorder
+from dynapyt.trace.format import zstandard
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "--events", help="Number of events per run", type=int, default=200000
+)
+
+
+def run_events(analysis, events):
+    _rt.analyses = [analysis]
+    dyn_ast = "/bench/program.py"
+    left, right = (lambda: 3), (lambda: 4)
+    start = time.perf_counter()
+    for i in range(events // 4):
+        _rt._binary_op_(dyn_ast, 1, left, 0, right)
+        _rt._int_(dyn_ast, 2, i)
+        _rt._enter_if_(dyn_ast, 3, i % 2 == 0)
+        _rt._str_(dyn_ast, 4, "name")
+    _rt.call_if_exists("end_execution")
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    os.chdir(tempfile.mkdtemp(prefix="dynapyt_bench_"))
+    candidates = [
+        ("TraceAll", lambda: TraceAll()),
+        ("TraceRecorder", lambda: TraceRecorder()),
+        ("TraceRecorder:zlib", lambda: TraceRecorder("zlib")),
+    ]
+    if zstandard is not None:
+        candidates.append(("TraceRecorder:zstd", lambda: TraceRecorder("zstd")))
+    for name, factory in candidates:
+        duration = run_events(factory(), args.events)
+        size = sum(os.path.getsize(f) for f in os.listdir("."))
+        print(
+            f"{name:<20} {args.events / duration:>12.0f} events/s"
+            f" {size / 1024:>10.1f} KiB on disk"
+        )
+        logging.getLogger().handlers.clear()
+        for f in os.listdir("."):
+            os.remove(f)
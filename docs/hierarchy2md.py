@@ -17,12 +17,9 @@ module = importlib.util.module_from_spec(spec)
 sys.modules[module_name] = module
 spec.loader.exec_module(module)
 
-hooks = dir(module.TraceAll())
-hooks = [h for h in hooks if not h.startswith("__")]
-hooks.remove("iid_to_location")
-hooks.remove("asts")
-hooks.remove("_get_ast")
-hooks.remove("location_to_iid")
+# the methods and attributes of all analyses, e.g. snapshot, are no hooks
+base_analysis = sys.modules["dynapyt.analyses.BaseAnalysis"].BaseAnalysis()
+hooks = set(dir(module.TraceAll())) - set(dir(base_analysis))
 hooks.remove("log")
 traceall_hooks = set(hooks)
 
@@ -46,7 +43,17 @@ while len(q) > 0:
             q.append(v)
         hierarchy_hooks.add(k)
 
-non_matching = traceall_hooks.symmetric_difference(hierarchy_hooks)
+# only analyses that name the hooks outside of runtime_event get them, so
+# TraceAll does not implement them, e.g. loop_summary
+opt_in_hooks = set(h for h in hierarchy if h != "runtime_event")
+q = [hierarchy[h] for h in opt_in_hooks]
+while len(q) > 0:
+    curr = q.pop()
+    for k, v in curr.items():
+        q.append(v)
+        opt_in_hooks.add(k)
+
+non_matching = traceall_hooks.symmetric_difference(hierarchy_hooks - opt_in_hooks)
 if len(non_matching) > 0:
     raise Exception("Hooks do not match hierarchy", non_matching)
 
@@ -1,13 +1,36 @@
-import libcst as cst
+from typing import Any, TYPE_CHECKING
 import os.path as path
 from ..instrument.IIDs import IIDs, Location
 
+if TYPE_CHECKING:
+    import libcst as cst
+
 class BaseAnalysis:
 
+    # analyses that query the shadow call stack of dynapyt.utils.context set
+    # this, the runtime does not keep the stack for the others
+    uses_call_stack = False
+
+    def __new__(cls, *args, **kwargs):
+        analysis = super().__new__(cls)
+        # forked children make fresh instances with the same configuration
+        analysis._constructor_args = (args, kwargs)
+        return analysis
+
     def __init__(self) -> None:
         self.asts = {}
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        # the snapshots of child processes are merged at the end of a run,
+        # an analysis that cannot merge them should fail right away
+        if cls.snapshot is not BaseAnalysis.snapshot and cls.merge is BaseAnalysis.merge:
+            raise TypeError(f'{cls.__name__} implements snapshot() but not merge()')
     
-    def _get_ast(self, filepath: str) -> cst.CSTNodeT:
+    def _get_ast(self, filepath: str) -> "cst.CSTNodeT":
+        # libcst is slow to import, only load it when an analysis needs an AST
+        import libcst as cst
+
         if not path.exists(filepath):
             return None
         if filepath not in self.asts:
@@ -23,4 +46,35 @@ class BaseAnalysis:
         return IIDs(filepath).iid_to_location[iid]
     
     def location_to_iid(self, filepath: str, location: Location) -> int:
-        return IIDs(filepath).location_to_iid[location]
\ No newline at end of file
+        return IIDs(filepath).location_to_iid[location]
+
+    def snapshot(self) -> Any:
+        """
+        Returns the results of the analysis as JSON-compatible data, or None
+        if the analysis keeps no results worth merging.
+        """
+        return None
+
+    def merge(self, other: Any) -> None:
+        """
+        Adds the results of another instance of the same analysis, e.g. one
+        that ran in another worker process. `other` is either the instance
+        itself or its snapshot. Analyses that implement `snapshot` must
+        implement it as well.
+        """
+        raise NotImplementedError(f'{type(self).__name__} does not support merging')
+
+    def profile_state(self) -> Any:
+        """
+        A cheap value that changes whenever a hook changes the results of the
+        analysis or reports something, e.g. the number of its findings, so
+        that profiling runs tell which sites matter to it (see dynapyt.prune).
+        It is taken before and after every hook. None, the default, makes
+        every event of the analysis count.
+        """
+        return None
+
+    def serialize(self) -> str:
+        import json
+
+        return json.dumps(self.snapshot())
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Any, Optional
 from .BaseAnalysis import BaseAnalysis
 
 class BranchCoverage(BaseAnalysis):
@@ -8,6 +8,15 @@ class BranchCoverage(BaseAnalysis):
     def enter_control_flow(self, dyn_ast: str, iid: int, cond_value: bool) -> Optional[bool]:
         self.branches[(iid, bool(cond_value))] = self.branches.get((iid, bool(cond_value)), 0) + 1
     
+    def snapshot(self) -> Any:
+        return {'branches': [[iid, cond, n] for (iid, cond), n in self.branches.items()]}
+
+    def merge(self, other: Any) -> None:
+        if isinstance(other, BaseAnalysis):
+            other = other.snapshot()
+        for iid, cond, n in other['branches']:
+            self.branches[(iid, cond)] = self.branches.get((iid, cond), 0) + n
+
     def end_execution(self):
         for k, v in self.branches.items():
             print(f'Branch {k[0]} taken with condition {k[1]}, {v} time{"" if v == 1 else "s"}')
\ No newline at end of file
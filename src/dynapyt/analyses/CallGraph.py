@@ -1,4 +1,4 @@
-from typing import Callable, Tuple, Dict
+from typing import Any, Callable, Tuple, Dict
 import logging
 import libcst as cst
 import libcst.matchers as m
@@ -12,16 +12,15 @@ class CallGraph(BaseAnalysis):
         super(CallGraph, self).__init__()
         logging.basicConfig(filename="dynapyt.json", format='%(message)s', level=logging.INFO)
         self.graph = {}
+        # (file, call iid) -> name of the calling function in the graph
+        self.callers = {}
 
     '''
     DynaPyt hook for pre function call
     '''
     def pre_call(self, dyn_ast: str, iid: int, function: Callable, pos_args: Tuple, kw_args: Dict):
-        ast, iids = self._get_ast(dyn_ast)
         module = getmodule(function)
         module = str(module).split(' ')[1] if module is not None else "''"
-        # calling function 
-        caller = get_parent_by_type(ast, iids.iid_to_location[iid], m.FunctionDef())
         # called function
         if hasattr(function, "__qualname__"):
             '''
@@ -39,19 +38,10 @@ class CallGraph(BaseAnalysis):
         
         #file name
         key = dyn_ast.replace('.py.orig', '').replace('/','.')
-        # format = "file"
-        
-        if caller is None:
-            f = key
-        else:
-            # if caller is a part of class, find the class name
-            caller_parent = get_parent_by_type(ast, iids.iid_to_location[iid], m.ClassDef())
-            if caller_parent is None:
-                f = key + '.' + caller.name.value
-                # format += ".func"
-            else:
-                f = key + '.' + caller_parent.name.value + '.' + caller.name.value
-                # format += ".class.func"
+        # calling function, found in the AST once per call site
+        f = self.callers.get((dyn_ast, iid))
+        if f is None:
+            f = self.callers[(dyn_ast, iid)] = self._caller_name(dyn_ast, key, iid)
 
         # if caller already added
         if f in self.graph.keys():
@@ -64,6 +54,31 @@ class CallGraph(BaseAnalysis):
             # self.graph[f] = [format, callee]
             self.graph[f] = [callee]
     
+    def _caller_name(self, dyn_ast: str, key: str, iid: int) -> str:
+        ast, iids = self._get_ast(dyn_ast)
+        caller = get_parent_by_type(ast, iids.iid_to_location[iid], m.FunctionDef())
+        if caller is None:
+            # format = "file"
+            return key
+        # if caller is a part of class, find the class name
+        caller_parent = get_parent_by_type(ast, iids.iid_to_location[iid], m.ClassDef())
+        if caller_parent is None:
+            # format += ".func"
+            return key + '.' + caller.name.value
+        else:
+            # format += ".class.func"
+            return key + '.' + caller_parent.name.value + '.' + caller.name.value
+
+    def snapshot(self) -> Any:
+        return {'graph': self.graph}
+
+    def merge(self, other: Any) -> None:
+        if isinstance(other, BaseAnalysis):
+            other = other.snapshot()
+        for caller, callees in other['graph'].items():
+            known = self.graph.setdefault(caller, [])
+            known.extend(c for c in callees if c not in known)
+
     '''
     DynaPyt hook for end of execution
     '''
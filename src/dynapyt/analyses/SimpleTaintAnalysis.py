@@ -1,13 +1,15 @@
+from typing import Callable
 import libcst.matchers as m
 from .BaseAnalysis import BaseAnalysis
 from ..utils.nodeLocator import get_node_by_location
+from ..utils.shadow_memory import ShadowMemory
 from aiopg.connection import Cursor
 
 class SimpleTaintAnalysis(BaseAnalysis):
     
     def __init__(self) -> None:
         super().__init__()
-        self.tainted = set()
+        self.tainted = ShadowMemory()
         self.seen_source = False
         self.seen_sink = False
         self.warning = False
@@ -16,43 +18,43 @@ class SimpleTaintAnalysis(BaseAnalysis):
         ast, iids = self._get_ast(dyn_ast)
         node = get_node_by_location(ast, iids.iid_to_location[iid], m.Assign())
         if m.matches(node, m.Assign(value=m.Await(expression=m.Call(func=m.Attribute(value=m.Name(value='request'), attr=m.Name(value='post')))))):
-            self.tainted.add(id(new_val))
+            self.tainted.add(new_val)
 
     def read_attribute(self, dyn_ast, iid, base, name, val):
         if isinstance(base, Cursor) and (name == 'execute'):
             self.seen_sink = True
         else:
-            if id(base) in self.tainted:
-                self.tainted.add(id(val))
-            if id(val) in self.tainted:
-                self.tainted.add(id(base))
+            if base in self.tainted:
+                self.tainted.add(val)
+            if val in self.tainted:
+                self.tainted.add(base)
     
     def read_subscript(self, dyn_ast, iid, base, sl, val):
-        if id(base) in self.tainted:
-            self.tainted.add(id(val))
-        if id(val) in self.tainted:
-            self.tainted.add(id(base))
+        if base in self.tainted:
+            self.tainted.add(val)
+        if val in self.tainted:
+            self.tainted.add(base)
         for i in sl:
-            if id(i) in self.tainted:
-                self.tainted.add(id(base))
+            if i in self.tainted:
+                self.tainted.add(base)
     
     def binary_operation(self, dyn_ast, iid, op, left, right, result):
-        if (id(left) in self.tainted) or (id(right) in self.tainted):
-            self.tainted.add(id(result))
+        if (left in self.tainted) or (right in self.tainted):
+            self.tainted.add(result)
     
     def dictionary(self, dyn_ast, iid, items, value):
         for k, v in items:
-            if id(v) in self.tainted:
-                self.tainted.add(id(value))
+            if v in self.tainted:
+                self.tainted.add(value)
 
     def pre_call(self, dyn_ast: str, iid: int, function: Callable, pos_args, kw_args):
         if self.seen_sink:
             for a in pos_args:
-                if id(a) in self.tainted:
+                if a in self.tainted:
                     self.warning = True
                     print('!!!!!!!!!!!!!!! Sink reached from unsafe source')
             for k, v in kw_args.items():
-                if id(v) in self.tainted:
+                if v in self.tainted:
                     print('!!!!!!!!!!!!!!! Sink reached from unsafe source')
                     self.warning = True
         self.seen_sink = False
@@ -0,0 +1,106 @@
+import os
+import time
+import threading
+from itertools import count
+from types import TracebackType
+from .BaseAnalysis import BaseAnalysis
+from ..trace.format import SymbolTable, MAX_VALUES
+from ..trace.writer import TraceWriter
+from ..utils.hooks import hierarchy
+from ..utils.session import output_path
+
+HOOKS = hierarchy().hooks
+_get_thread_id = getattr(threading, "get_native_id", threading.get_ident)
+
+
+def _discard(*fields):
+    pass
+
+
+class TraceRecorder(BaseAnalysis):
+    """
+    Records every hook call as a fixed-width binary record (see
+    `dynapyt.trace.format`) instead of logging text lines like `TraceAll`.
+    Use `dynapyt.trace.reader.TraceReader` to read the trace back.
+
+    The analysis configuration (`TraceRecorder:zlib`) selects the chunk
+    compression: `none` (default), `zlib` or `zstd`.
+    """
+
+    def __init__(self, compression: str = None, path: str = None) -> None:
+        super().__init__()
+        if path is None:
+            path = output_path(f"dynapyt-trace-{os.getpid()}.dyntrace")
+        self.path = path
+        self.symbols = SymbolTable()
+        self.hook_ids = {name: i for i, name in enumerate(HOOKS)}
+        self.sequence = count()
+        self.started = time.time()
+        self.writer = TraceWriter(path, compression)
+        self._write = self.writer.write
+
+    def record(self, hook: int, dyn_ast: str, iid: int, values: tuple):
+        summarize = self.symbols.summarize
+        n = len(values)
+        if n > MAX_VALUES:
+            raise ValueError(
+                f"{HOOKS[hook]} passes {n} values, a trace record keeps {MAX_VALUES}"
+            )
+        t0, p0 = summarize(values[0]) if n > 0 else (0, 0)
+        t1, p1 = summarize(values[1]) if n > 1 else (0, 0)
+        t2, p2 = summarize(values[2]) if n > 2 else (0, 0)
+        t3, p3 = summarize(values[3]) if n > 3 else (0, 0)
+        self._write(
+            next(self.sequence),
+            time.perf_counter_ns(),
+            _get_thread_id() & 0xFFFFFFFF,
+            self.symbols.intern(dyn_ast),
+            iid,
+            hook,
+            n,
+            t0,
+            t1,
+            t2,
+            t3,
+            p0,
+            p1,
+            p2,
+            p3,
+        )
+
+    def begin_execution(self) -> None:
+        self.record(self.hook_ids["begin_execution"], "", -1, ())
+
+    def uncaught_exception(self, exc: Exception, stack_trace: TracebackType) -> None:
+        self.record(self.hook_ids["uncaught_exception"], "", -1, (exc,))
+
+    def end_execution(self) -> None:
+        if self.writer.closed:
+            return
+        self.record(self.hook_ids["end_execution"], "", -1, ())
+        self._write = _discard
+        self.writer.close(
+            {
+                "hooks": list(HOOKS),
+                "symbols": self.symbols.symbols,
+                "pid": os.getpid(),
+                "started": self.started,
+                "max_values": MAX_VALUES,
+            }
+        )
+
+
+def recording_hook(hook: int):
+    def hook_method(self, dyn_ast, iid, *args):
+        self.record(hook, dyn_ast, iid, args)
+
+    return hook_method
+
+
+# only analyses that implement loop_summary themselves get their loops
+# summarized, recording every hook should not change how loops run
+OPT_IN_HOOKS = hierarchy().opt_in
+
+for _hook_id, _hook_name in enumerate(HOOKS):
+    if not hasattr(TraceRecorder, _hook_name) and _hook_name not in OPT_IN_HOOKS:
+        setattr(TraceRecorder, _hook_name, recording_hook(_hook_id))
@@ -11,11 +11,65 @@ import libcst.matchers as m
 from libcst._types import CSTNodeT
 from libcst.matchers import call_if_not_inside, call_if_inside
 from libcst.metadata.expression_context_provider import ExpressionContext
-from libcst.metadata.scope_provider import QualifiedNameSource, ClassScope
-from ..utils.hooks import snake
+from libcst.metadata.scope_provider import (
+    Assignment,
+    QualifiedNameSource,
+    ClassScope,
+)
+from ..utils.hooks import snake, get_name
 from .IIDs import IIDs
+from .scope import Scope, module_name
 import os
 
+# builtin types that can be told from the code, see __static_type
+_BUILTIN_TYPES = {
+    "bool",
+    "bytes",
+    "complex",
+    "dict",
+    "float",
+    "frozenset",
+    "int",
+    "list",
+    "set",
+    "str",
+    "tuple",
+}
+_TYPING_ALIASES = {
+    "Dict": "dict",
+    "FrozenSet": "frozenset",
+    "List": "list",
+    "Set": "set",
+    "Tuple": "tuple",
+}
+_SUPERTYPES = {"bool": {"int"}}
+
+
+class _CompactCalls(cst.CSTTransformer):
+    """
+    Rewrites calls `_rt._int_(_dynapyt_ast_, ...)` into `_rt_int_(...)`,
+    where `_rt_int_` is bound to the runtime function and the file once at
+    module level.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.bound = []
+
+    def leave_Call(self, original_node, updated_node):
+        if not (
+            m.matches(updated_node.func, m.Attribute(value=m.Name("_rt")))
+            and len(updated_node.args) > 0
+            and m.matches(updated_node.args[0], m.Arg(value=m.Name("_dynapyt_ast_")))
+        ):
+            return updated_node
+        name = updated_node.func.attr.value
+        if name not in self.bound:
+            self.bound.append(name)
+        return updated_node.with_changes(
+            func=cst.Name(value=f"_rt{name}"), args=updated_node.args[1:]
+        )
+
 
 class CodeInstrumenter(m.MatcherDecoratableTransformer):
     METADATA_DEPENDENCIES = (
@@ -27,7 +81,17 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
     )
 
     # Internal
-    def __init__(self, src, file_path, iids: IIDs, selected_hooks):
+    def __init__(
+        self,
+        src,
+        file_path,
+        iids: IIDs,
+        selected_hooks,
+        compact=False,
+        sites=None,
+        scope: Scope = None,
+        module=None,
+    ):
         super().__init__()
         self.source = src
         self.file_path = file_path
@@ -44,10 +108,36 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
                 "ignore": [re.compile(p) for p in details["ignore"]]
                 if "ignore" in details
                 else [],
+                "once": details.get("once", False),
+                "types": details.get("types", {}),
             }
             for hook, details in selected_hooks.items()
         }
         self.to_import = set()
+        # Whether calls of the runtime go through functions bound at module
+        # level, which makes the instrumented code smaller
+        self.compact = compact
+        # IIDs of the sites to instrument, all if None, see __pruned
+        self.sites = sites
+        self.kept_sites = 0
+        self.pruned_sites = 0
+        self.__leave_iids = []
+        # Modules, classes and functions to instrument, all if None; the
+        # stack holds the qualified name of every enclosing one and whether
+        # it is included and ignored, see on_visit
+        self.scope = scope
+        if scope is not None:
+            if module is None:
+                module = module_name(file_path)
+            self.__scopes = [(module, *scope.enter(module))]
+        # Nodes changed by the instrumentation
+        self.instrumented_nodes = 0
+        # Sites of hooks with operand types that are instrumented or not,
+        # see __may_match
+        self.sites_kept = 0
+        self.sites_skipped = 0
+        # Whether a literal is reported only once, see __report_once
+        self.reports_literals = False
 
         # Blacklisted attributes are appended to the end of the source code.
         # Some programs depend on being able to parse these attributes so
@@ -106,6 +196,91 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
         except:
             return True
 
+    def __report_once(self, hook: str, iid: int, call: cst.Call):
+        # If all hooks of a constant literal only need its first event, the
+        # runtime remembers the (possibly replaced) value of the literal in
+        # _dynapyt_literals_ and later evaluations read it from there
+        # instead of calling the runtime.
+        if not self.selected_hooks[hook].get("once", False):
+            return call
+        self.reports_literals = True
+        iid_node = cst.Integer(value=str(iid))
+        return cst.IfExp(
+            test=cst.Comparison(
+                left=iid_node,
+                comparisons=[
+                    cst.ComparisonTarget(
+                        operator=cst.In(), comparator=cst.Name("_dynapyt_literals_")
+                    )
+                ],
+            ),
+            body=cst.Subscript(
+                value=cst.Name("_dynapyt_literals_"),
+                slice=[cst.SubscriptElement(slice=cst.Index(value=iid_node))],
+            ),
+            orelse=call.with_changes(
+                args=[*call.args, cst.Arg(value=cst.Name("_dynapyt_literals_"))],
+                lpar=[],
+                rpar=[],
+            ),
+            lpar=[cst.LeftParen(), *call.lpar],
+            rpar=[*call.rpar, cst.RightParen()],
+        )
+
+    def on_visit(self, node):
+        if self.scope is not None and isinstance(node, (cst.FunctionDef, cst.ClassDef)):
+            qualname, included, ignored = self.__scopes[-1]
+            qualname = f"{qualname}.{node.name.value}"
+            self.__scopes.append(
+                (qualname, *self.scope.enter(qualname, included, ignored))
+            )
+            if isinstance(node, cst.FunctionDef) and not self.__in_scope():
+                # the body of the function is left untouched
+                super().on_visit(node)
+                return False
+        return super().on_visit(node)
+
+    def on_leave(self, original_node, updated_node):
+        self.__leave_iids = []
+        result = super().on_leave(original_node, updated_node)
+        in_scope = self.__in_scope()
+        if self.scope is not None and isinstance(
+            original_node, (cst.FunctionDef, cst.ClassDef)
+        ):
+            self.__scopes.pop()
+        if result is updated_node or isinstance(original_node, cst.Module):
+            return result
+        if not in_scope or self.__pruned(original_node):
+            return updated_node
+        self.instrumented_nodes += 1
+        return result
+
+    def __in_scope(self):
+        if self.scope is None:
+            return True
+        _, included, ignored = self.__scopes[-1]
+        return included and not ignored
+
+    def __pruned(self, original_node):
+        # leaves sites out that are not in self.sites, e.g. sites that did
+        # not matter to the analyses in a profiling run (see dynapyt.prune)
+        if self.sites is None:
+            return False
+        if self.__tracks_calls() and isinstance(
+            original_node, (cst.FunctionDef, cst.Yield)
+        ):
+            # function entries and yields keep the shadow call stack of the
+            # runtime up to date, which other sites may depend on
+            return False
+        site_iids = self.__leave_iids
+        if len(site_iids) == 0:
+            return False
+        if any(iid in self.sites for iid in site_iids):
+            self.kept_sites += 1
+            return False
+        self.pruned_sites += 1
+        return True
+
     def __create_iid(self, node):
         location = self.get_metadata(PositionProvider, node)
         start_line = location.start.line
@@ -115,6 +290,7 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
         iid = self.iids.new(
             self.file_path + ".orig", start_line, start_column, end_line, end_column
         )
+        self.__leave_iids.append(iid)
         return iid
 
     def __create_import(self, names):
@@ -133,8 +309,134 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
         stmt = cst.SimpleStatementLine(body=[imp])
         return stmt
 
+    def __create_bindings(self, names):
+        # _rt_int_, _rt_call_ = _rt._bind_(_dynapyt_ast_, "_int_", "_call_")
+        targets = [cst.Element(value=cst.Name(value=f"_rt{name}")) for name in names]
+        bind_call = cst.Call(
+            func=cst.Attribute(value=cst.Name(value="_rt"), attr=cst.Name("_bind_")),
+            args=[cst.Arg(value=cst.Name("_dynapyt_ast_"))]
+            + [cst.Arg(value=cst.SimpleString(f'"{name}"')) for name in names],
+        )
+        return cst.SimpleStatementLine(
+            body=[
+                cst.Assign(
+                    targets=[
+                        cst.AssignTarget(cst.Tuple(elements=targets, lpar=[], rpar=[]))
+                    ],
+                    value=bind_call,
+                )
+            ]
+        )
+
+    def __tracks_calls(self):
+        # an analysis uses the shadow call stack of the runtime
+        return "call_stack" in self.selected_hooks
+
+    def __static_type(self, node) -> str:
+        # name of the builtin type of the value of node, if it is certain
+        # from the code, or it is annotated for names, otherwise None
+        if isinstance(node, (cst.List, cst.ListComp)):
+            return "list"
+        if isinstance(node, (cst.Set, cst.SetComp)):
+            return "set"
+        if isinstance(node, (cst.Dict, cst.DictComp)):
+            return "dict"
+        if isinstance(node, cst.Tuple):
+            return "tuple"
+        if isinstance(node, cst.Integer):
+            return "int"
+        if isinstance(node, cst.Float):
+            return "float"
+        if isinstance(node, cst.Imaginary):
+            return "complex"
+        if isinstance(node, cst.SimpleString):
+            return "bytes" if "b" in node.prefix.lower() else "str"
+        if isinstance(node, cst.ConcatenatedString):
+            return self.__static_type(node.left)
+        if isinstance(node, cst.FormattedString):
+            return "str"
+        if isinstance(node, cst.Call) and isinstance(node.func, cst.Name):
+            if node.func.value in _BUILTIN_TYPES and any(
+                q.source == QualifiedNameSource.BUILTIN
+                for q in self.get_metadata(QualifiedNameProvider, node.func, set())
+            ):
+                return node.func.value
+            return None
+        if isinstance(node, cst.Name):
+            if node.value in ("True", "False"):
+                return "bool"
+            return self.__annotated_type(node)
+        return None
+
+    def __annotated_type(self, name: cst.Name) -> str:
+        # the type all assignments of the name are annotated with
+        scope = self.get_metadata(ScopeProvider, name, None)
+        if scope is None:
+            return None
+        types = set()
+        for assignment in scope[name.value]:
+            if not isinstance(assignment, Assignment):
+                return None
+            target = assignment.node
+            if isinstance(target, cst.Param):
+                annotation = target.annotation
+            else:
+                parent = self.get_metadata(ParentNodeProvider, target, None)
+                if not (isinstance(parent, cst.AnnAssign) and parent.target is target):
+                    return None
+                annotation = parent.annotation
+            if annotation is None:
+                return None
+            types.add(self.__annotation_type(annotation.annotation))
+        if len(types) != 1:
+            return None
+        return types.pop()
+
+    def __annotation_type(self, annotation) -> str:
+        # list, List[int], typing.List[int], ... -> "list"
+        if isinstance(annotation, cst.Subscript):
+            annotation = annotation.value
+        if isinstance(annotation, cst.Attribute):
+            name = annotation.attr.value
+        elif isinstance(annotation, cst.Name):
+            name = annotation.value
+        else:
+            return None
+        if name in _BUILTIN_TYPES:
+            return name
+        return _TYPING_ALIASES.get(name)
+
+    def __may_match(self, hook: str, operands) -> bool:
+        # False if an operand provably has none of the types that the hook
+        # declares for it with operand_types
+        if hook not in self.selected_hooks:
+            return False
+        for operand, allowed in self.selected_hooks[hook]["types"].items():
+            node = operands.get(operand)
+            static = None if node is None else self.__static_type(node)
+            if static is None or static in allowed:
+                continue
+            if len(_SUPERTYPES.get(static, set()) & set(allowed)) == 0:
+                return False
+        return True
+
+    def __count_site(self, hooks, kept: bool):
+        # only sites that operand types can rule out are counted
+        if any(
+            len(self.selected_hooks[hook]["types"]) > 0
+            for hook in hooks
+            if hook in self.selected_hooks
+        ):
+            if kept:
+                self.sites_kept += 1
+            else:
+                self.sites_skipped += 1
+
+    def __contains_await(self, node):
+        return len(m.findall(node, m.Await())) > 0
+
     def __wrap_in_lambda(self, original_node, updated_node):
-        if len(m.findall(original_node, m.Await())) > 0:
+        if self.__contains_await(original_node):
             return updated_node
         if m.matches(updated_node, m.Call(func=m.Name("super"), args=[])):
             class_arg = cst.Arg(value=cst.Name(value=self.current_class[-1]))
@@ -184,6 +486,20 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
             )
         return lambda_expr
 
+    def __private_name(self, attr):
+        """
+        Name that Python looks up for attribute `attr` here, or None if it
+        is not private.
+        """
+        if not attr.startswith("__") or attr.endswith("__"):
+            return None
+        if len(self.current_class) == 0:
+            return attr
+        class_name = self.current_class[-1].lstrip("_")
+        if class_name == "":
+            return attr
+        return "_" + class_name + attr
+
     def __as_string(self, s):
         if hasattr(self, "quote") and self.quote == '"':
             return "'" + s + "'"
@@ -233,6 +549,12 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
             dynapyt_imports.append(self.__create_import(import_names))
             dynapyt_imports.append(cst.Newline(value="\n"))
         code_body = list(updated_node.body[imports_index + 1 :])
+        bound = []
+        if self.compact:
+            compact_calls = _CompactCalls()
+            code_body = [stmt.visit(compact_calls) for stmt in code_body]
+            if len(compact_calls.bound) > 0:
+                bound.append(self.__create_bindings(compact_calls.bound))
         handler_call = cst.Call(
             func=cst.Attribute(
                 value=cst.Name(value="_rt"), attr=cst.Name(value="_catch_")
@@ -252,10 +574,24 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
                 )
             ],
         )
+        literals = []
+        if self.reports_literals:
+            literals.append(
+                cst.SimpleStatementLine(
+                    body=[
+                        cst.Assign(
+                            targets=[cst.AssignTarget(cst.Name("_dynapyt_literals_"))],
+                            value=cst.Dict(elements=[]),
+                        )
+                    ]
+                )
+            )
         new_body = (
             list(updated_node.body[: imports_index + 1])
             + dynapyt_imports
             + [get_ast]
+            + literals
+            + bound
             + [try_body]
             + self.blacklist_nodes
         )
@@ -298,7 +634,7 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
                 lpar=original_node.lpar,
                 rpar=original_node.rpar,
             )
-            return call
+            return self.__report_once("boolean", iid, call)
 
         if (
             "read_identifier" not in self.selected_hooks
@@ -352,7 +688,7 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
             lpar=original_node.lpar,
             rpar=original_node.rpar,
         )
-        return call
+        return self.__report_once("integer", iid, call)
 
     def leave_Float(self, original_node, updated_node):
         if ("_float" not in self.selected_hooks) or not self.__selected_by_decorators(
@@ -373,7 +709,7 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
             lpar=original_node.lpar,
             rpar=original_node.rpar,
         )
-        return call
+        return self.__report_once("_float", iid, call)
 
     def leave_Imaginary(self, original_node, updated_node):
         if (
@@ -394,7 +730,7 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
             lpar=original_node.lpar,
             rpar=original_node.rpar,
         )
-        return call
+        return self.__report_once("imaginary", iid, call)
 
     def visit_ConcatenatedString(self, node):
         return False
@@ -420,7 +756,10 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
             rpar=original_node.rpar,
         )
 
-        return call
+        if m.findall(original_node, m.FormattedString()):
+            # not a constant
+            return call
+        return self.__report_once("string", iid, call)
 
     @call_if_not_inside(m.FormattedStringExpression() | m.ConcatenatedString())
     def visit_FormattedString(self, node):
@@ -471,7 +810,7 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
             lpar=original_node.lpar,
             rpar=original_node.rpar,
         )
-        return call
+        return self.__report_once("string", iid, call)
 
     @call_if_not_inside(m.AssignTarget() | m.AnnAssign())
     def leave_Dict(self, original_node, updated_node):
@@ -695,13 +1034,16 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
                         )
                     )
             elif m.matches(t_o, m.Attribute()):
+                # delattr needs the mangled name of private attributes
+                attr_name = self.__private_name(t_o.attr.value) or t_o.attr.value
+                attr_arg = cst.SimpleString(value=self.__as_string(attr_name))
                 if m.matches(t, m.Call()):
                     targets.append(
                         cst.Element(
                             value=cst.Tuple(
                                 elements=[
                                     cst.Element(value=t.args[2].value),
-                                    cst.Element(value=t.args[3].value),
+                                    cst.Element(value=attr_arg),
                                     cst.Element(value=cst.Name("False")),
                                 ]
                             )
@@ -709,9 +1051,6 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
                     )
                 else:
                     base_arg = t.value
-                    attr_arg = cst.SimpleString(
-                        value=self.__as_string(str(t.attr.value))
-                    )
                     targets.append(
                         cst.Element(
                             value=cst.Tuple(
@@ -829,9 +1168,15 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
         attr_arg = cst.Arg(
             cst.SimpleString(value=self.__as_string(str(updated_node.attr.value)))
         )
+        args = [ast_arg, iid_arg, base_arg, attr_arg]
+        # private names are mangled here, where the class is known, instead
+        # of being searched for at runtime
+        private_name = self.__private_name(updated_node.attr.value)
+        if private_name is not None:
+            args.append(cst.Arg(cst.SimpleString(self.__as_string(private_name))))
         return cst.Call(
             func=callee_name,
-            args=[ast_arg, iid_arg, base_arg, attr_arg],
+            args=args,
             lpar=original_node.lpar,
             rpar=original_node.rpar,
         )
@@ -839,7 +1184,11 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
     # Operations
     def leave_BinaryOperation(self, original_node, updated_node):
         hook_name = snake(type(original_node.operator).__name__)
-        if hook_name not in self.selected_hooks:
+        kept = self.__may_match(
+            hook_name, {"left": original_node.left, "right": original_node.right}
+        )
+        self.__count_site([hook_name], kept)
+        if not kept:
             return updated_node
         bin_op = {
             "Add": 0,
@@ -863,15 +1212,29 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
         iid = self.__create_iid(original_node)
         ast_arg = cst.Arg(value=cst.Name("_dynapyt_ast_"))
         iid_arg = cst.Arg(value=cst.Integer(value=str(iid)))
-        left_arg = cst.Arg(self.__wrap_in_lambda(original_node.left, updated_node.left))
         operator_name = type(original_node.operator).__name__
         operator_arg = cst.Arg(cst.Integer(str(bin_op[operator_name])))
-        right_arg = cst.Arg(
-            self.__wrap_in_lambda(original_node.right, updated_node.right)
-        )
+        if self.__contains_await(original_node):
+            # both operands are evaluated anyway, pass their values
+            args = [
+                ast_arg,
+                iid_arg,
+                cst.Arg(updated_node.left),
+                operator_arg,
+                cst.Arg(updated_node.right),
+                cst.Arg(cst.Name("True")),
+            ]
+        else:
+            left_arg = cst.Arg(
+                self.__wrap_in_lambda(original_node.left, updated_node.left)
+            )
+            right_arg = cst.Arg(
+                self.__wrap_in_lambda(original_node.right, updated_node.right)
+            )
+            args = [ast_arg, iid_arg, left_arg, operator_arg, right_arg]
         call = cst.Call(
             func=callee_name,
-            args=[ast_arg, iid_arg, left_arg, operator_arg, right_arg],
+            args=args,
             lpar=original_node.lpar,
             rpar=original_node.rpar,
         )
@@ -885,16 +1248,45 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
         ):
             return updated_node
         bool_op = {"And": 13, "Or": 14}
-        callee_name = cst.Attribute(
-            value=cst.Name(value="_rt"), attr=cst.Name(value="_binary_op_")
-        )
-        self.to_import.add("_binary_op_")
+        has_await = self.__contains_await(original_node)
         iid = self.__create_iid(original_node)
         ast_arg = cst.Arg(value=cst.Name("_dynapyt_ast_"))
         iid_arg = cst.Arg(value=cst.Integer(value=str(iid)))
-        left_arg = cst.Arg(self.__wrap_in_lambda(original_node.left, updated_node.left))
         operator_name = type(original_node.operator).__name__
         operator_arg = cst.Arg(cst.Integer(str(bool_op[operator_name])))
+        if has_await:
+            # keeps short-circuiting without a lambda, which cannot await:
+            # _bool_op_(..., r if _bool_left_(..., l, 13) else None) evaluates
+            # both operands where they are, so await, yield and exceptions
+            # behave as in the original expression
+            self.to_import.add("_bool_left_")
+            self.to_import.add("_bool_op_")
+            test = cst.Call(
+                func=cst.Attribute(
+                    value=cst.Name(value="_rt"), attr=cst.Name(value="_bool_left_")
+                ),
+                args=[ast_arg, iid_arg, cst.Arg(updated_node.left), operator_arg],
+            )
+            right = cst.IfExp(
+                test=test,
+                body=updated_node.right,
+                orelse=cst.Name("None"),
+                lpar=[cst.LeftParen()],
+                rpar=[cst.RightParen()],
+            )
+            return cst.Call(
+                func=cst.Attribute(
+                    value=cst.Name(value="_rt"), attr=cst.Name(value="_bool_op_")
+                ),
+                args=[ast_arg, iid_arg, operator_arg, cst.Arg(right)],
+                lpar=original_node.lpar,
+                rpar=original_node.rpar,
+            )
+        callee_name = cst.Attribute(
+            value=cst.Name(value="_rt"), attr=cst.Name(value="_binary_op_")
+        )
+        self.to_import.add("_binary_op_")
+        left_arg = cst.Arg(self.__wrap_in_lambda(original_node.left, updated_node.left))
         right_arg = cst.Arg(
             self.__wrap_in_lambda(original_node.right, updated_node.right)
         )
@@ -933,10 +1325,17 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
         return call
 
     def leave_Comparison(self, original_node, updated_node):
-        if not any(
-            snake(type(i.operator).__name__) in self.selected_hooks
-            for i in updated_node.comparisons
-        ):
+        hooks = []
+        kept = False
+        left = original_node.left
+        for i in original_node.comparisons:
+            hook = get_name(snake(type(i.operator).__name__))
+            hooks.append(hook)
+            if self.__may_match(hook, {"left": left, "right": i.comparator}):
+                kept = True
+            left = i.comparator
+        self.__count_site(hooks, kept)
+        if not kept:
             return updated_node
         comp_op = {
             "Equal": 0,
@@ -958,22 +1357,39 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
         ast_arg = cst.Arg(value=cst.Name("_dynapyt_ast_"))
         iid_arg = cst.Arg(value=cst.Integer(value=str(iid)))
         left_arg = cst.Arg(updated_node.left)
+        # the comparators after the first one are only evaluated while the
+        # chain is true, unless they cannot be wrapped in lambdas: await,
+        # yield and assignment expressions must stay in the enclosing scope
+        lazy = len(updated_node.comparisons) > 1 and not any(
+            self.__contains_await(i.comparator)
+            or len(m.findall(i.comparator, m.NamedExpr() | m.Yield())) > 0
+            for i in original_node.comparisons[1:]
+        )
         comparisons = []
-        for i in updated_node.comparisons:
+        for index, (i_o, i) in enumerate(
+            zip(original_node.comparisons, updated_node.comparisons)
+        ):
             operator_name = type(i.operator).__name__
+            if lazy and index > 0:
+                comparator = self.__wrap_in_lambda(i_o.comparator, i.comparator)
+            else:
+                comparator = i.comparator
             comparisons.append(
                 cst.Element(
                     value=cst.Tuple(
                         elements=[
                             cst.Element(cst.Integer(str(comp_op[operator_name]))),
-                            cst.Element(i.comparator),
+                            cst.Element(comparator),
                         ]
                     )
                 )
             )
+        args = [ast_arg, iid_arg, left_arg, cst.Arg(cst.List(elements=comparisons))]
+        if lazy:
+            args.append(cst.Arg(cst.Name("True")))
         call = cst.Call(
             func=callee_name,
-            args=[ast_arg, iid_arg, left_arg, cst.Arg(cst.List(elements=comparisons))],
+            args=args,
             lpar=original_node.lpar,
             rpar=original_node.rpar,
         )
@@ -1077,13 +1493,12 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
         self, original_node: cst.FunctionDef, updated_node: cst.FunctionDef
     ):
         function_metadata = self.current_function.pop()
-        if (
-            "function_enter" not in self.selected_hooks
-            and "function_exit" not in self.selected_hooks
-        ) or not (
-            self.__selected_by_decorators("function_enter", function_metadata["name"])
-            or self.__selected_by_decorators("function_exit", function_metadata["name"])
-        ):
+        hooked = any(
+            hook in self.selected_hooks
+            and self.__selected_by_decorators(hook, function_metadata["name"])
+            for hook in ("function_enter", "_return")
+        )
+        if not hooked and not self.__tracks_calls():
             return updated_node
         enter_name = cst.Attribute(
             value=cst.Name(value="_rt"), attr=cst.Name(value="_func_entry_")
@@ -1120,17 +1535,35 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
             updated_node.body.body[0],
             m.SimpleStatementLine(body=[m.Expr(value=m.SimpleString())]),
         ):
-            new_body = updated_node.body.with_changes(
-                body=[updated_node.body.body[0], cst.SimpleStatementLine([entry_stmt])]
-                + list(updated_node.body.body[1:])
-                + [cst.SimpleStatementLine([exit_stmt])]
-            )
+            docstring = [updated_node.body.body[0]]
+            body = list(updated_node.body.body[1:])
         else:
-            new_body = updated_node.body.with_changes(
-                body=[cst.SimpleStatementLine([entry_stmt])]
-                + list(updated_node.body.body)
-                + [cst.SimpleStatementLine([exit_stmt])]
+            docstring = []
+            body = list(updated_node.body.body)
+        body = (
+            [cst.SimpleStatementLine([entry_stmt])]
+            + body
+            + [cst.SimpleStatementLine([exit_stmt])]
+        )
+        if self.__tracks_calls():
+            # takes the function off the shadow call stack however it is left
+            self.to_import.add("_func_leave_")
+            leave_call = cst.Call(
+                func=cst.Attribute(
+                    value=cst.Name(value="_rt"), attr=cst.Name(value="_func_leave_")
+                )
             )
+            body = [
+                cst.Try(
+                    body=cst.IndentedBlock(body=body),
+                    finalbody=cst.Finally(
+                        body=cst.IndentedBlock(
+                            body=[cst.SimpleStatementLine([cst.Expr(leave_call)])]
+                        )
+                    ),
+                )
+            ]
+        new_body = updated_node.body.with_changes(body=docstring + body)
         new_node = updated_node
         return new_node.with_changes(body=new_body)
 
@@ -1163,7 +1596,7 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
         return updated_node.with_changes(body=new_stmt)
 
     def leave_Return(self, original_node, updated_node):
-        if "return" not in self.selected_hooks:
+        if "_return" not in self.selected_hooks:
             return updated_node
         callee_name = cst.Attribute(
             value=cst.Name(value="_rt"), attr=cst.Name(value="_return_")
@@ -1194,7 +1627,7 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
 
     def leave_Yield(self, original_node, updated_node):
         function_metadata = self.current_function[-1]
-        if "yield" not in self.selected_hooks:
+        if "_yield" not in self.selected_hooks and not self.__tracks_calls():
             return updated_node
         callee_name = cst.Attribute(
             value=cst.Name(value="_rt"), attr=cst.Name(value="_yield_")
@@ -1225,14 +1658,35 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
             arg_list.append(val_arg)
         call = cst.Call(func=callee_name, args=arg_list)
         if m.matches(updated_node.value, m.From()):
-            return updated_node.with_changes(
+            new_yield = updated_node.with_changes(
                 value=cst.From(item=call),
                 whitespace_after_yield=cst.SimpleWhitespace(" "),
             )
         else:
-            return updated_node.with_changes(
+            new_yield = updated_node.with_changes(
                 value=call, whitespace_after_yield=cst.SimpleWhitespace(" ")
             )
+        if not self.__tracks_calls():
+            return new_yield
+        # puts the generator back on the shadow call stack when it resumes
+        self.to_import.add("_resume_")
+        return cst.Call(
+            func=cst.Attribute(
+                value=cst.Name(value="_rt"), attr=cst.Name(value="_resume_")
+            ),
+            args=[
+                ast_arg,
+                function_iid_arg,
+                function_name,
+                cst.Arg(
+                    value=new_yield.with_changes(
+                        lpar=[cst.LeftParen()], rpar=[cst.RightParen()]
+                    )
+                ),
+            ],
+            lpar=original_node.lpar,
+            rpar=original_node.rpar,
+        )
 
     # def visit_Assert(self, node):
     #     return False
@@ -1592,13 +2046,34 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
             and "exit_if" not in self.selected_hooks
         ):
             return updated_node
+        iid = self.__create_iid(original_node)
+        ast_arg = cst.Arg(value=cst.Name("_dynapyt_ast_"))
+        iid_arg = cst.Arg(value=cst.Integer(value=str(iid)))
+        if self.__contains_await(original_node):
+            # keeps the branches in place instead of wrapping them in lambdas:
+            # _exit_if_expr_(..., body if _enter_if_(..., test) else orelse)
+            enter = cst.Call(
+                func=cst.Attribute(
+                    value=cst.Name(value="_rt"), attr=cst.Name(value="_enter_if_")
+                ),
+                args=[ast_arg, iid_arg, cst.Arg(value=updated_node.test)],
+            )
+            self.to_import.add("_enter_if_")
+            self.to_import.add("_exit_if_expr_")
+            return cst.Call(
+                func=cst.Attribute(
+                    value=cst.Name(value="_rt"), attr=cst.Name(value="_exit_if_expr_")
+                ),
+                args=[
+                    ast_arg,
+                    iid_arg,
+                    cst.Arg(value=updated_node.with_changes(test=enter)),
+                ],
+            )
         callee_name = cst.Attribute(
             value=cst.Name(value="_rt"), attr=cst.Name(value="_if_expr_")
         )
         self.to_import.add("_if_expr_")
-        iid = self.__create_iid(original_node)
-        ast_arg = cst.Arg(value=cst.Name("_dynapyt_ast_"))
-        iid_arg = cst.Arg(value=cst.Integer(value=str(iid)))
         cond_arg = cst.Arg(value=updated_node.test)
         body_arg = cst.Arg(
             value=self.__wrap_in_lambda(original_node.body, updated_node.body)
@@ -1653,8 +2128,14 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
         )
 
     def leave_For(self, original_node, updated_node):
-        if ("enter_for" not in self.selected_hooks) and (
-            "exit_for" not in self.selected_hooks
+        # zip in the counter of a loop summary cannot take async iterables
+        summary = (
+            "loop_summary" in self.selected_hooks and updated_node.asynchronous is None
+        )
+        if (
+            ("enter_for" not in self.selected_hooks)
+            and ("exit_for" not in self.selected_hooks)
+            and not summary
         ):
             return updated_node
         iid = self.__create_iid(original_node)
@@ -1687,9 +2168,70 @@ class CodeInstrumenter(m.MatcherDecoratableTransformer):
                 )
             )
             generator_call = updated_node.iter
-        return updated_node.with_changes(
+        else:
+            generator_call = updated_node.iter
+            else_part = updated_node.orelse
+        for_node = updated_node.with_changes(
             iter=generator_call, orelse=else_part, target=original_node.target
         )
+        if not summary:
+            return for_node
+        # with _rt._loop_(_dynapyt_ast_, iid, iterable) as _dynapyt_loop_{iid}_:
+        #     try:
+        #         for target in _dynapyt_loop_{iid}_: ...
+        #         else: _dynapyt_loop_{iid}_.exhausted(); ...
+        #         _dynapyt_loop_{iid}_.left()
+        #     finally:
+        #         del _dynapyt_loop_{iid}_
+        # the name is deleted however the loop is left, so that it does not
+        # become an attribute of the module or class
+        loop_name = cst.Name(value=f"_dynapyt_loop_{iid}_")
+        loop_call = cst.Call(
+            func=cst.Attribute(value=cst.Name(value="_rt"), attr=cst.Name("_loop_")),
+            args=[ast_arg, iid_arg, cst.Arg(value=for_node.iter)],
+        )
+        self.to_import.add("_loop_")
+        exhausted = cst.SimpleStatementLine(
+            body=[
+                cst.Expr(
+                    value=cst.Call(
+                        func=cst.Attribute(
+                            value=loop_name, attr=cst.Name(value="exhausted")
+                        )
+                    )
+                )
+            ]
+        )
+        left = cst.SimpleStatementLine(
+            body=[
+                cst.Expr(
+                    value=cst.Call(
+                        func=cst.Attribute(value=loop_name, attr=cst.Name(value="left"))
+                    )
+                )
+            ]
+        )
+        old_else = [] if for_node.orelse is None else list(for_node.orelse.body.body)
+        for_node = for_node.with_changes(
+            iter=loop_name,
+            orelse=cst.Else(body=cst.IndentedBlock(body=[exhausted] + old_else)),
+            leading_lines=[],
+        )
+        forget = cst.SimpleStatementLine(
+            body=[cst.Del(target=loop_name)],
+        )
+        return cst.With(
+            items=[cst.WithItem(item=loop_call, asname=cst.AsName(name=loop_name))],
+            body=cst.IndentedBlock(
+                body=[
+                    cst.Try(
+                        body=cst.IndentedBlock(body=[for_node, left]),
+                        finalbody=cst.Finally(body=cst.IndentedBlock(body=[forget])),
+                    )
+                ]
+            ),
+            leading_lines=updated_node.leading_lines,
+        )
 
     def leave_CompFor(self, original_node, updated_node):
         if (
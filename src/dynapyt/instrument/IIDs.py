@@ -1,7 +1,5 @@
 from collections import namedtuple
 from os import path
-import json
-
 
 Location = namedtuple(
     "Location", ["file", "start_line", "start_column", "end_line", "end_column"]
@@ -10,6 +8,9 @@ Location = namedtuple(
 
 class IIDs:
     def __init__(self, file_path):
+        # the runtime imports this module, json is only loaded when needed
+        import json
+
         if file_path.endswith(".py.orig"):
             file_path = file_path[:-8] + "-dynapyt.json"
         else:
@@ -41,6 +42,8 @@ class IIDs:
         return self.next_iid - 1
 
     def store(self):
+        import json
+
         all_data = {
             "next_iid": self.next_iid,
             "iid_to_location": dict(
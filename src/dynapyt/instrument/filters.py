@@ -1,4 +1,4 @@
-from typing import Dict, List
+from typing import Any, Dict, List
 import functools
 
 SEPERATOR = "<dySep>"
@@ -38,19 +38,64 @@ def ignore(patterns=[]):
     return decorator_ignore
 
 
-def get_details(func) -> Dict[str, List[str]]:
+def once(func):
+    """
+    Marks a literal hook that only needs the first event of every literal in
+    the code, e.g. to make an inventory of literals. If all hooks that a
+    literal reaches are marked, the instrumented code reuses the value of
+    the first event afterwards, without calling the runtime.
+    """
     if func.__doc__ is None:
-        return {}
-    start = func.__doc__.find(START)
-    if start == -1:
-        return {}
-    end = func.__doc__.find(END)
-    if end == -1:
-        return {}
-    specs = func.__doc__[start + len(START) : end]
+        func.__doc__ = ""
+    func.__doc__ += f"{START} once {END}"
+    return func
+
+
+def operand_types(**operands):
+    """
+    Declares the types that operands of a binary operation or comparison
+    must have for the hook to care, e.g. `@operand_types(right=[list])`.
+    Sites where the instrumenter can tell from the code that an operand has
+    another type, e.g. a set literal or a name annotated as `set`, are not
+    instrumented. Types are builtin types or their names.
+    """
+
+    def decorator_operand_types(func):
+        if len(operands) > 0:
+            if func.__doc__ is None:
+                func.__doc__ = ""
+            types = [
+                f"{operand}:{getattr(t, '__name__', t)}"
+                for operand, allowed in operands.items()
+                for t in allowed
+            ]
+            func.__doc__ += f"{START} types -> {SEPERATOR.join(types)} {END}"
+        return func
+
+    return decorator_operand_types
+
+
+def get_details(func) -> Dict[str, Any]:
+    docs = func.__doc__
     details = {}
-    if specs.strip().startswith("only ->"):
-        details["only"] = specs.strip().split(" -> ")[1].split(SEPERATOR)
-    elif specs.strip().startswith("ignore ->"):
-        details["ignore"] = specs.strip().split(" -> ")[1].split(SEPERATOR)
+    if docs is None:
+        return details
+    while START in docs:
+        start = docs.find(START)
+        end = docs.find(END)
+        if end == -1:
+            break
+        specs = docs[start + len(START) : end].strip()
+        if specs.startswith("only ->"):
+            details["only"] = specs.split(" -> ")[1].split(SEPERATOR)
+        elif specs.startswith("ignore ->"):
+            details["ignore"] = specs.split(" -> ")[1].split(SEPERATOR)
+        elif specs.startswith("types ->"):
+            types = details["types"] = {}
+            for spec in specs.split(" -> ")[1].split(SEPERATOR):
+                operand, t = spec.split(":")
+                types.setdefault(operand, []).append(t)
+        elif specs == "once":
+            details["once"] = True
+        docs = docs[end + len(END) :]
     return details
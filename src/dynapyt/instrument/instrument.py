@@ -4,9 +4,10 @@ import libcst as cst
 from libcst._exceptions import ParserSyntaxError
 from .CodeInstrumenter import CodeInstrumenter
 from .IIDs import IIDs
+from .scope import Scope, module_name
 import re
 from shutil import copyfile
-from dynapyt.utils.hooks import get_hooks_from_analysis
+from dynapyt.utils.hooks import get_hooks_from_analysis, cached_hooks_from_analysis
 
 parser = argparse.ArgumentParser()
 parser.add_argument(
@@ -17,6 +18,29 @@ parser.add_argument(
 parser.add_argument(
     "--analysis", help="Analysis class(es) (full dotted path)", nargs="+"
 )
+parser.add_argument(
+    "--compact",
+    help="Bind the runtime functions at module level for smaller instrumented code",
+    action="store_true",
+)
+parser.add_argument(
+    "--hooks",
+    help="File that stores the hooks selected for the analyses, reused while they do not change",
+)
+parser.add_argument(
+    "--only",
+    help="Instrument only these modules, classes and functions (globs or re:<regex> of qualified names)",
+    nargs="+",
+)
+parser.add_argument(
+    "--ignore",
+    help="Do not instrument these modules, classes and functions (globs or re:<regex> of qualified names)",
+    nargs="+",
+)
+parser.add_argument(
+    "--root",
+    help="Root directory of the project, names the modules for --only and --ignore",
+)
 
 
 def gather_files(files_arg):
@@ -33,7 +57,16 @@ def gather_files(files_arg):
     return files
 
 
-def instrument_code(src, file_path, iids, selected_hooks):
+def instrument_code(
+    src,
+    file_path,
+    iids,
+    selected_hooks,
+    compact=False,
+    sites=None,
+    scope=None,
+    module=None,
+):
     if "DYNAPYT: DO NOT INSTRUMENT" in src:
         print(f"{file_path} is already instrumented -- skipping it")
         return None
@@ -42,8 +75,21 @@ def instrument_code(src, file_path, iids, selected_hooks):
         ast = cst.parse_module(src)
         ast_wrapper = cst.metadata.MetadataWrapper(ast)
 
-        instrumented_code = CodeInstrumenter(src, file_path, iids, selected_hooks)
+        instrumented_code = CodeInstrumenter(
+            src, file_path, iids, selected_hooks, compact, sites, scope, module
+        )
         instrumented_ast = ast_wrapper.visit(instrumented_code)
+        print(f"{file_path}: instrumented {instrumented_code.instrumented_nodes} nodes")
+        if instrumented_code.sites_skipped > 0:
+            print(
+                f"{file_path}: kept {instrumented_code.sites_kept} and skipped "
+                f"{instrumented_code.sites_skipped} sites by operand types"
+            )
+        if sites is not None:
+            print(
+                f"{file_path}: kept {instrumented_code.kept_sites} and pruned "
+                f"{instrumented_code.pruned_sites} sites"
+            )
 
         return "# DYNAPYT: DO NOT INSTRUMENT\n\n" + instrumented_ast.code
     except ParserSyntaxError:
@@ -51,12 +97,17 @@ def instrument_code(src, file_path, iids, selected_hooks):
         return None
 
 
-def instrument_file(file_path, selected_hooks):
+def instrument_file(
+    file_path, selected_hooks, compact=False, sites=None, scope=None, root=None
+):
     with open(file_path, "r") as file:
         src = file.read()
     iids = IIDs(file_path)
 
-    instrumented_code = instrument_code(src, file_path, iids, selected_hooks)
+    module = None if scope is None else module_name(file_path, root)
+    instrumented_code = instrument_code(
+        src, file_path, iids, selected_hooks, compact, sites, scope, module
+    )
     if instrumented_code is None:
         return
 
@@ -73,13 +124,23 @@ if __name__ == "__main__":
     args = parser.parse_args()
     files = gather_files(args.files)
     analysis = args.analysis
-    selected_hooks = get_hooks_from_analysis(args.analysis)
+    if args.hooks is not None:
+        selected_hooks = cached_hooks_from_analysis(args.analysis, args.hooks)
+    else:
+        selected_hooks = get_hooks_from_analysis(args.analysis)
+    scope = None
+    if args.only is not None or args.ignore is not None:
+        scope = Scope(args.only, args.ignore)
     if len(files) < 2:
         for file_path in files:
-            instrument_file(file_path, selected_hooks)
+            instrument_file(
+                file_path, selected_hooks, args.compact, None, scope, args.root
+            )
     else:
         arg_list = []
         for file_path in files:
-            arg_list.append((file_path, selected_hooks))
+            arg_list.append(
+                (file_path, selected_hooks, args.compact, None, scope, args.root)
+            )
         with Pool() as p:
             p.starmap(instrument_file, arg_list)
@@ -0,0 +1,59 @@
+"""
+Selects the modules, classes and functions to instrument by their
+qualified names, e.g. `mypkg.core.parsers`, `mypkg.core.parsers.Parser`
+and `mypkg.core.parsers.Parser.parse_header`.
+
+Patterns are globs, where `*` also matches dots, or regular expressions
+when prefixed with `re:`, e.g. `mypkg.core.*.parse_*` or
+`re:mypkg\\.core\\..*\\.parse_\\w+`. A module, class or function is
+instrumented if it or an enclosing one matches an `only` pattern (or there
+are none), and neither it nor an enclosing one matches an `ignore`
+pattern. The bodies of functions that are not selected are left untouched,
+including the functions defined in them; classes and modules that are not
+selected are still searched for selected methods and functions.
+"""
+
+import re
+from fnmatch import translate
+from os import path, sep
+from typing import List, Tuple
+
+
+def _compile(pattern: str):
+    if pattern.startswith("re:"):
+        return re.compile(pattern[3:])
+    return re.compile(translate(pattern))
+
+
+class Scope:
+    def __init__(self, only: List[str] = None, ignore: List[str] = None) -> None:
+        self.only = [_compile(p) for p in only or []]
+        self.ignore = [_compile(p) for p in ignore or []]
+
+    def enter(
+        self, qualname: str, included: bool = False, ignored: bool = False
+    ) -> Tuple[bool, bool]:
+        """
+        Whether the module, class or function `qualname` is included and
+        ignored, given whether the enclosing one is.
+        """
+        included = (
+            included
+            or len(self.only) == 0
+            or any(p.fullmatch(qualname) for p in self.only)
+        )
+        ignored = ignored or any(p.fullmatch(qualname) for p in self.ignore)
+        return included, ignored
+
+
+def module_name(file_path: str, root: str = None) -> str:
+    """Qualified name of the module in `file_path` of a project in `root`."""
+    if root is None:
+        root = path.dirname(file_path)
+    parts = path.relpath(re.sub(r"\.py$", "", file_path), root).split(sep)
+    if parts[-1] == "__init__":
+        parts.pop()
+    if len(parts) == 0 or parts == ["."]:
+        # the package of the root itself
+        return path.basename(path.dirname(path.abspath(file_path)))
+    return ".".join(parts)
@@ -0,0 +1,110 @@
+"""
+Reduces the analysis results of several processes, e.g. pytest-xdist
+workers, into one result per analysis.
+
+Every process writes the snapshots of its analyses into the `snapshots`
+directory of its session (see `dynapyt.utils.session`), or into the
+directory in the `DYNAPYT_SNAPSHOT_DIR` environment variable, at the end of
+its execution. Afterwards,
+
+    python -m dynapyt.merge_snapshots --directory <snapshot directory>
+
+merges the snapshots of each analysis class into one instance and calls its
+`end_execution` to report the merged result.
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Iterator, List
+from .analyses.BaseAnalysis import BaseAnalysis
+from .utils.load_analysis import load_analysis_class
+from .utils.session import snapshot_dir
+
+SNAPSHOT_DIR_ENV = "DYNAPYT_SNAPSHOT_DIR"
+
+
+def analysis_name(analysis: BaseAnalysis) -> str:
+    return type(analysis).__module__ + "." + type(analysis).__qualname__
+
+
+def snapshot_lines(analyses: List[BaseAnalysis]) -> List[str]:
+    lines = []
+    for analysis in analyses:
+        serialized = analysis.serialize()
+        if serialized != "null":
+            name = json.dumps(analysis_name(analysis))
+            lines.append(
+                f'{{"analysis": {name}, "pid": {os.getpid()}, "snapshot": {serialized}}}\n'
+            )
+    return lines
+
+
+def write_snapshots(analyses: List[BaseAnalysis], directory: str):
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    lines = snapshot_lines(analyses)
+    if len(lines) == 0:
+        return
+    shard = Path(directory) / f"snapshot-{os.getpid()}.jsonl"
+    tmp = shard.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        f.writelines(lines)
+    # readers never see a partially written shard
+    os.replace(tmp, shard)
+
+
+def read_shard(shard: Path) -> Iterator[dict]:
+    with open(shard, "r") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def merge_snapshots(directory: str) -> List[BaseAnalysis]:
+    merged = {}
+    for shard in sorted(Path(directory).glob("snapshot-*.jsonl")):
+        for entry in read_shard(shard):
+            name = entry["analysis"]
+            if name not in merged:
+                merged[name] = load_analysis_class(name)()
+            merged[name].merge(entry["snapshot"])
+    return list(merged.values())
+
+
+def merge_child_snapshots(analyses: List[BaseAnalysis], directory: str):
+    """
+    Merges the shards of all other processes in `directory`, e.g. children
+    of this process, into `analyses` and removes them.
+    """
+    by_name = {analysis_name(a): a for a in analyses}
+    own_shard = f"snapshot-{os.getpid()}.jsonl"
+    for shard in sorted(Path(directory).glob("snapshot-*.jsonl")):
+        if shard.name == own_shard:
+            continue
+        for entry in read_shard(shard):
+            analysis = by_name.get(entry["analysis"])
+            if analysis is not None:
+                analysis.merge(entry["snapshot"])
+        shard.unlink()
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "--directory",
+    help="Directory of the snapshots, those of the current session by default",
+)
+parser.add_argument(
+    "--output", help="Writes the merged snapshots to a file instead of reporting them"
+)
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    analyses = merge_snapshots(args.directory or snapshot_dir())
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            f.writelines(snapshot_lines(analyses))
+    else:
+        for analysis in analyses:
+            func = getattr(analysis, "end_execution", None)
+            if func is not None:
+                func()
@@ -0,0 +1,187 @@
+"""
+Prunes the instrumentation of a project to the sites that mattered to the
+analyses in a profiling run.
+
+A run with `--profile` (see `dynapyt.run_analysis`) records for every site
+how often each analysis saw an event there and how many of these events
+were relevant, i.e. the hook returned a value that replaces the original
+one or changed the state that the analysis reports with
+`BaseAnalysis.profile_state`. Events of analyses that report no state are
+all relevant. Afterwards,
+
+    python -m dynapyt.prune --directory <project> --profile <session>/profile --analysis <analysis>
+
+instruments the project again, only at the relevant sites. With
+`--functions`, every site of a function that has a relevant site is kept,
+which is coarser but robust against inputs that take other paths through
+the functions. Files without relevant sites are restored to their original
+code. Sites that the profiling run did not reach are pruned as well, so the
+profiling run should exercise the code paths of interest.
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+from shutil import copyfile
+from typing import Any, Dict, List, Set
+import libcst as cst
+from libcst.metadata import MetadataWrapper, PositionProvider
+from .instrument.IIDs import IIDs
+from .instrument.instrument import instrument_file
+from .utils.hooks import cached_hooks_from_analysis, get_hooks_from_analysis
+from .utils.session import hooks_cache
+
+
+def read_profile(directory: str) -> Dict[str, Any]:
+    """Merges the profiles that the processes of a profiling run wrote."""
+    merged = {}
+    for profile_file in sorted(Path(directory).glob("profile-*.json")):
+        with open(profile_file, "r") as f:
+            profile = json.load(f)
+        for name, files in profile.items():
+            for r_file, sites in files.items():
+                merged_sites = merged.setdefault(name, {}).setdefault(r_file, {})
+                for iid, (events, relevant) in sites.items():
+                    counts = merged_sites.setdefault(int(iid), [0, 0])
+                    counts[0] += events
+                    counts[1] += relevant
+    return merged
+
+
+def relevant_sites(profile: Dict[str, Any], analysis: List[str]) -> Dict[str, Set[int]]:
+    """Original file -> IIDs of the sites with relevant events of the analyses."""
+    # the profile names analyses by module and class, like the specs
+    names = {spec.split(":")[0] for spec in analysis}
+    sites = {}
+    for name, files in profile.items():
+        if name not in names:
+            continue
+        for r_file, counts in files.items():
+            file_sites = sites.setdefault(os.path.abspath(r_file), set())
+            file_sites.update(int(iid) for iid, c in counts.items() if c[1] > 0)
+    return sites
+
+
+class _FunctionSpans(cst.CSTVisitor):
+    METADATA_DEPENDENCIES = (PositionProvider,)
+
+    def __init__(self):
+        super().__init__()
+        self.spans = []
+
+    def visit_FunctionDef(self, node):
+        location = self.get_metadata(PositionProvider, node)
+        self.spans.append(
+            (
+                (location.start.line, location.start.column),
+                (location.end.line, location.end.column),
+            )
+        )
+
+
+def function_sites(orig_file: str, sites: Set[int]) -> Set[int]:
+    """All sites of the innermost functions that contain one of `sites`."""
+    with open(orig_file, "r") as f:
+        visitor = _FunctionSpans()
+        MetadataWrapper(cst.parse_module(f.read())).visit(visitor)
+    locations = IIDs(orig_file).iid_to_location
+
+    def span(location):
+        return (
+            (location.start_line, location.start_column),
+            (location.end_line, location.end_column),
+        )
+
+    def contains(outer, inner):
+        return outer[0] <= inner[0] and inner[1] <= outer[1]
+
+    kept = set(sites)
+    for iid in sites:
+        if iid not in locations:
+            continue
+        site = span(locations[iid])
+        enclosing = [s for s in visitor.spans if contains(s, site)]
+        if len(enclosing) == 0:
+            continue
+        # the spans of nested functions are inside the outer ones
+        innermost = max(enclosing, key=lambda s: s[0])
+        kept.update(
+            other
+            for other, location in locations.items()
+            if contains(innermost, span(location))
+        )
+    return kept
+
+
+def prune_file(
+    file_path: str, selected_hooks, sites: Set[int], compact: bool = False
+) -> None:
+    orig_file = file_path + ".orig"
+    copyfile(orig_file, file_path)
+    if len(sites) == 0:
+        os.remove(orig_file)
+        print(f"{file_path}: no relevant sites, restored the original code")
+        return
+    # the locations of the iids include the path that the file was
+    # instrumented under, the sites only keep their iids under the same path
+    for location in IIDs(orig_file).iid_to_location.values():
+        if os.path.abspath(location.file) == os.path.abspath(orig_file):
+            file_path = location.file[: -len(".orig")]
+        break
+    instrument_file(file_path, selected_hooks, compact, sites)
+
+
+def prune_dir(
+    directory: str,
+    profile: Dict[str, Any],
+    analysis: List[str],
+    functions: bool = False,
+    compact: bool = False,
+) -> None:
+    hooks_file = hooks_cache(directory)
+    if os.path.exists(hooks_file):
+        selected_hooks = cached_hooks_from_analysis(analysis, hooks_file)
+    else:
+        selected_hooks = get_hooks_from_analysis(analysis)
+    sites = relevant_sites(profile, analysis)
+    for dir_path, _, file_names in os.walk(directory):
+        for name in file_names:
+            if not name.endswith(".py.orig"):
+                continue
+            orig_file = os.path.abspath(os.path.join(dir_path, name))
+            file_sites = sites.get(orig_file, set())
+            if functions and len(file_sites) > 0:
+                file_sites = function_sites(orig_file, file_sites)
+            prune_file(orig_file[:-5], selected_hooks, file_sites, compact)
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--directory", help="Directory of the instrumented project")
+parser.add_argument(
+    "--profile", help="Profile directory of the profiling run (<session>/profile)"
+)
+parser.add_argument(
+    "--analysis", help="Analysis class(es) (full dotted path)", nargs="+"
+)
+parser.add_argument(
+    "--functions",
+    help="Keep all sites of the functions that have a relevant site",
+    action="store_true",
+)
+parser.add_argument(
+    "--compact",
+    help="Bind the runtime functions at module level for smaller instrumented code",
+    action="store_true",
+)
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    prune_dir(
+        args.directory,
+        read_profile(args.profile),
+        args.analysis,
+        args.functions,
+        args.compact,
+    )
@@ -4,6 +4,8 @@ from os import walk
 from os import path
 import time
 from multiprocessing import Pool
+from dynapyt.utils.session import hooks_cache
+from dynapyt.utils.hooks import cached_hooks_from_analysis
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--directory", help="Directory of the project to analyze")
@@ -15,6 +17,21 @@ parser.add_argument(
     "--skip-instrumentation", help="Skip instrumentation", action="store_true"
 )
 parser.add_argument("--time-limit", help="Time limit for instrumentation in minutes")
+parser.add_argument(
+    "--compact",
+    help="Bind the runtime functions at module level for smaller instrumented code",
+    action="store_true",
+)
+parser.add_argument(
+    "--only",
+    help="Instrument only these modules, classes and functions (globs or re:<regex> of qualified names)",
+    nargs="+",
+)
+parser.add_argument(
+    "--ignore",
+    help="Do not instrument these modules, classes and functions (globs or re:<regex> of qualified names)",
+    nargs="+",
+)
 
 
 def process_files(cmd_list, file_path):
@@ -33,6 +50,9 @@ if __name__ == "__main__":
     all_cmds = []
 
     if args.skip_instrumentation != True:
+        # resolved once here, the workers read them from the file
+        hooks_file = hooks_cache(start)
+        cached_hooks_from_analysis(analysis, hooks_file)
         for dir_path, dir_names, file_names in walk(start):
             if (args.time_limit is not None) and (
                 (time.time() - start_time) / 60 > int(args.time_limit)
@@ -47,8 +67,16 @@ if __name__ == "__main__":
                         "dynapyt.instrument.instrument",
                         "--files",
                         file_path,
-                        "--analysis",
-                    ] + analysis
+                    ]
+                    if args.compact:
+                        cmd_list.append("--compact")
+                    if args.only is not None or args.ignore is not None:
+                        cmd_list += ["--root", start]
+                    if args.only is not None:
+                        cmd_list += ["--only"] + args.only
+                    if args.ignore is not None:
+                        cmd_list += ["--ignore"] + args.ignore
+                    cmd_list += ["--hooks", hooks_file, "--analysis"] + analysis
                     all_cmds.append((cmd_list, file_path))
         with Pool() as p:
             p.starmap(process_files, all_cmds)
@@ -6,19 +6,44 @@ from shutil import rmtree
 import sys
 from pathlib import Path
 from . import runtime as _rt
+from .utils.session import (
+    analyses_file,
+    coverage_dir,
+    end_session,
+    profile_dir,
+    session_dir,
+    start_session,
+)
 
 
 def run_analysis(
-    entry: str, analyses: List[str], name: str = None, coverage: bool = False
-):
+    entry: str,
+    analyses: List[str],
+    name: str = None,
+    coverage: bool = False,
+    out_of_process: bool = False,
+    parallel: bool = False,
+    session: str = None,
+    profile: bool = False,
+    keep_session: bool = False,
+) -> str:
+    if parallel:
+        analyses = ["dynapyt.trace.pipeline.OutOfProcessAnalysis:" + ";".join(analyses)]
+    elif out_of_process:
+        analyses = ["dynapyt.trace.pipeline.OutOfProcessAnalysis:" + ",".join(analyses)]
+
+    temporary = session is None and session_dir() is None
+    session = start_session(session)
     if coverage:
-        Path("/tmp/dynapyt_coverage").mkdir(exist_ok=True)
+        Path(coverage_dir()).mkdir(exist_ok=True)
+    else:
+        rmtree(coverage_dir(), ignore_errors=True)
+    if profile:
+        Path(profile_dir()).mkdir(exist_ok=True)
     else:
-        rmtree("/tmp/dynapyt_coverage", ignore_errors=True)
+        rmtree(profile_dir(), ignore_errors=True)
 
-    if Path("/tmp/dynapyt_analyses.txt").exists():
-        Path("/tmp/dynapyt_analyses.txt").unlink()
-    with open("/tmp/dynapyt_analyses.txt", "w") as f:
+    with open(analyses_file(), "w") as f:
         f.write("\n".join(analyses))
 
     _rt.set_analysis(analyses)
@@ -37,6 +62,19 @@ def run_analysis(
     else:
         importlib.import_module(entry)
     _rt.end_execution()
+    if temporary:
+        coverage_file = Path(coverage_dir()) / "covered.jsonl"
+        covered = _rt._read_coverage(coverage_file) if coverage else None
+        kept = end_session(session, keep_session)
+        if kept is not None:
+            print(f"DynaPyt output written to {kept}", file=sys.stderr)
+        if covered is not None:
+            # outside of the session, coverage_dir is the global directory
+            # that runs without a session of their own add up their coverage in
+            Path(coverage_dir()).mkdir(exist_ok=True)
+            _rt.add_coverage(Path(coverage_dir()) / "covered.jsonl", covered)
+            print(f"DynaPyt coverage written to {coverage_dir()}", file=sys.stderr)
+    return session
 
 
 parser = argparse.ArgumentParser()
@@ -44,9 +82,43 @@ parser.add_argument("--entry", help="Entry file for execution")
 parser.add_argument("--analysis", help="Analysis class name(s)", nargs="+")
 parser.add_argument("--name", help="Associates a given name with current run")
 parser.add_argument("--coverage", help="Enables coverage", action="store_true")
+parser.add_argument(
+    "--out-of-process",
+    help="Runs the analyses in a separate process",
+    action="store_true",
+)
+parser.add_argument(
+    "--parallel",
+    help="Runs every analysis in a separate process of its own",
+    action="store_true",
+)
+parser.add_argument(
+    "--session",
+    help="Session directory of the run, a new temporary directory by default",
+)
+parser.add_argument(
+    "--keep-session",
+    help="Keeps the temporary session directory of the run",
+    action="store_true",
+)
+parser.add_argument(
+    "--profile",
+    help="Records which sites matter to the analyses, for dynapyt.prune",
+    action="store_true",
+)
 
 if __name__ == "__main__":
     args = parser.parse_args()
     name = args.name
     analyses = args.analysis
-    run_analysis(args.entry, analyses, name, args.coverage)
+    run_analysis(
+        args.entry,
+        analyses,
+        name,
+        args.coverage,
+        args.out_of_process,
+        args.parallel,
+        args.session,
+        args.profile,
+        args.keep_session,
+    )
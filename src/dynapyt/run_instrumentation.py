@@ -7,6 +7,8 @@ import shutil
 from subprocess import run
 import time
 from multiprocessing import Pool
+from dynapyt.utils.hooks import cached_hooks_from_analysis
+from dynapyt.utils.session import hooks_cache
 
 
 def instrument_dir(
@@ -14,6 +16,9 @@ def instrument_dir(
     analysis: List[str],
     use_external_dir: bool = False,
     exclude: Set[str] = set(),
+    compact: bool = False,
+    only: List[str] = None,
+    ignore: List[str] = None,
 ):
     start_time = time.time()
     start = directory
@@ -26,6 +31,10 @@ def instrument_dir(
         shutil.copytree(start, external_path)
         start = str(external_path)
 
+    # resolved once here, the workers read them from the file
+    hooks_file = hooks_cache(start)
+    cached_hooks_from_analysis(analysis, hooks_file)
+
     for dir_path, dir_names, file_names in walk(start):
         for name in dir_names:
             if path.join(dir_path, name) in exclude:
@@ -39,8 +48,16 @@ def instrument_dir(
                     "dynapyt.instrument.instrument",
                     "--files",
                     file_path,
-                    "--analysis",
-                ] + analysis
+                ]
+                if compact:
+                    cmd_list.append("--compact")
+                if only is not None or ignore is not None:
+                    cmd_list += ["--root", start]
+                if only is not None:
+                    cmd_list += ["--only"] + only
+                if ignore is not None:
+                    cmd_list += ["--ignore"] + ignore
+                cmd_list += ["--hooks", hooks_file, "--analysis"] + analysis
                 all_cmds.append((cmd_list, file_path))
     with Pool(maxtasksperchild=5) as p:
         p.starmap(process_files, all_cmds)
@@ -58,6 +75,21 @@ parser.add_argument(
     dest="external_dir",
     action="store_true",
 )
+parser.add_argument(
+    "--compact",
+    help="Bind the runtime functions at module level for smaller instrumented code",
+    action="store_true",
+)
+parser.add_argument(
+    "--only",
+    help="Instrument only these modules, classes and functions (globs or re:<regex> of qualified names)",
+    nargs="+",
+)
+parser.add_argument(
+    "--ignore",
+    help="Do not instrument these modules, classes and functions (globs or re:<regex> of qualified names)",
+    nargs="+",
+)
 
 
 def process_files(cmd_list, file_path):
@@ -71,4 +103,11 @@ if __name__ == "__main__":
     start = args.directory
     analysis = args.analysis
     use_external_dir = args.external_dir
-    instrument_dir(start, analysis, use_external_dir)
+    instrument_dir(
+        start,
+        analysis,
+        use_external_dir,
+        compact=args.compact,
+        only=args.only,
+        ignore=args.ignore,
+    )
@@ -4,66 +4,274 @@ from sys import exc_info
 import sys
 import atexit
 import signal
-import json
-import importlib
-from filelock import FileLock
-import libcst as cst
-from .utils.hooks import snake, get_name
+import os
+import threading
+from functools import partial
+from itertools import count
+from operator import itemgetter
+from .utils.hooks import snake, get_name, hook_arguments
 from .instrument.IIDs import IIDs
-from .instrument.filters import START, END, SEPERATOR
+from .instrument.filters import START, END, SEPERATOR, get_details
+from .utils.context import (
+    StackEntry,
+    call_stack,
+    event_context,
+    event_contexts,
+    reset_contexts,
+)
 from .utils.load_analysis import load_analyses
+from .utils.shadow_memory import ShadowMemory
+from .utils.session import (
+    analyses_file,
+    coverage_dir,
+    is_session_root,
+    profile_dir,
+    session_dir,
+    snapshot_dir,
+)
 
 analyses = None
+analysis_specs = None
+# hook -> positions of the arguments the analyses read, see set_analysis
+hook_args = {}
+# event -> fused dispatcher over the analyses, see _fuse
+dispatchers = {}
+# the analyses that hook_args and dispatchers were made for
+_prepared = None
 covered = None
-current_file = None
+# whether an analysis uses the shadow call stack, see _prepare
+tracks_calls = False
+# whether to record which sites matter to the analyses, see _profile
+profiling = False
 end_execution_called = False
+_setup_lock = threading.RLock()
+_end_lock = threading.RLock()
 
 
 def end_execution():
     global covered, end_execution_called
-    if end_execution_called:
-        return
-    end_execution_called = True
-    call_if_exists("end_execution")
+    with _end_lock:
+        if end_execution_called:
+            return
+        end_execution_called = True
+    # argparse and json are only needed at the end, not to start up
+    from .merge_snapshots import (
+        SNAPSHOT_DIR_ENV,
+        merge_child_snapshots,
+        write_snapshots,
+    )
+
+    snapshots = os.environ.get(SNAPSHOT_DIR_ENV, snapshot_dir())
+    if snapshots is None or analyses is None:
+        call_if_exists("end_execution")
+    elif session_dir() is not None and not is_session_root():
+        # a child process of the session only writes its shard, the session
+        # root reports the results of all processes
+        write_snapshots(analyses, snapshots)
+        for analysis in analyses:
+            func = getattr(analysis, "end_execution", None)
+            if func is not None and analysis.snapshot() is None:
+                func()
+    else:
+        if is_session_root():
+            merge_child_snapshots(analyses, snapshots)
+        call_if_exists("end_execution")
+        write_snapshots(analyses, snapshots)
     if covered is not None:
-        with FileLock("/tmp/dynapyt_coverage/covered.jsonl.lock"):
-            if Path("/tmp/dynapyt_coverage/covered.jsonl").exists():
-                existing_coverage = {}
-                with open("/tmp/dynapyt_coverage/covered.jsonl", "r") as f:
-                    content = f.read().splitlines()
-                for c in content:
-                    tmp = json.loads(c)
-                    print(tmp, file=sys.stderr)
-                    existing_coverage.update(tmp)
-                Path("/tmp/dynapyt_coverage/covered.jsonl").unlink()
-            else:
-                existing_coverage = {}
-            for r_file, line_nums in covered.items():
-                if r_file not in existing_coverage:
-                    existing_coverage[r_file] = {}
-                for ln, anas in line_nums.items():
-                    if ln not in existing_coverage[r_file]:
-                        existing_coverage[r_file][ln] = {}
-                    for ana, count in anas.items():
-                        if ana not in existing_coverage[r_file][ln]:
-                            existing_coverage[r_file][ln][ana] = 0
-                        existing_coverage[r_file][ln][ana] += count
-            with open("/tmp/dynapyt_coverage/covered.jsonl", "w") as f:
-                for r_file, line_nums in existing_coverage.items():
-                    tmp = {r_file: line_nums}
-                    f.write(json.dumps(tmp) + "\n")
+        for context in event_contexts():
+            _merge_coverage(covered, context.covered)
+        coverage_file = Path(coverage_dir()) / "covered.jsonl"
+        if session_dir() is None:
+            add_coverage(coverage_file, covered)
+        else:
+            # every process of the session writes a shard of its own, the
+            # session root merges them without any lock
+            shard = coverage_file.with_name(f"covered-{os.getpid()}.jsonl")
+            _write_coverage(shard, covered)
+            if is_session_root():
+                merged = _read_coverage(coverage_file)
+                shards = sorted(coverage_file.parent.glob("covered-*.jsonl"))
+                for shard in shards:
+                    _merge_coverage(merged, _read_coverage(shard))
+                _write_coverage(coverage_file, merged)
+                for shard in shards:
+                    shard.unlink()
+    if profiling and profile_dir() is not None:
+        _write_profile(Path(profile_dir()) / f"profile-{os.getpid()}.json")
+
+
+def _read_coverage(coverage_file: Path) -> dict:
+    import json
+
+    coverage = {}
+    if coverage_file.exists():
+        with open(coverage_file, "r") as f:
+            for line in f:
+                coverage.update(json.loads(line))
+    return coverage
+
+
+def _merge_coverage(existing_coverage: dict, new_coverage: dict) -> dict:
+    for r_file, line_nums in new_coverage.items():
+        if r_file not in existing_coverage:
+            existing_coverage[r_file] = {}
+        for ln, anas in line_nums.items():
+            ln = str(ln)
+            if ln not in existing_coverage[r_file]:
+                existing_coverage[r_file][ln] = {}
+            for ana, count in anas.items():
+                if ana not in existing_coverage[r_file][ln]:
+                    existing_coverage[r_file][ln][ana] = 0
+                existing_coverage[r_file][ln][ana] += count
+    return existing_coverage
+
+
+def add_coverage(coverage_file: Path, coverage: dict):
+    """Merges `coverage` into `coverage_file`, which other runs may share."""
+    from filelock import FileLock
+
+    with FileLock(str(coverage_file) + ".lock"):
+        _write_coverage(
+            coverage_file, _merge_coverage(_read_coverage(coverage_file), coverage)
+        )
+
+
+def _write_coverage(coverage_file: Path, coverage: dict):
+    import json
+
+    tmp = coverage_file.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        for r_file, line_nums in coverage.items():
+            f.write(json.dumps({r_file: line_nums}) + "\n")
+    os.replace(tmp, coverage_file)
+
+
+def collected_profile() -> dict:
+    """
+    The sites of every analysis in a profiling run so far: analysis ->
+    file -> iid -> [events, relevant events], see _profile.
+    """
+    merged = {}
+    for context in event_contexts():
+        for name, files in context.profile.items():
+            for r_file, sites in files.items():
+                merged_sites = merged.setdefault(name, {}).setdefault(r_file, {})
+                for iid, (events, relevant) in sites.items():
+                    counts = merged_sites.setdefault(iid, [0, 0])
+                    counts[0] += events
+                    counts[1] += relevant
+    return merged
+
+
+def _write_profile(profile_file: Path):
+    import json
+
+    with open(profile_file, "w") as f:
+        json.dump(collected_profile(), f)
+
+
+def _end_on_signal(signum, frame):
+    end_execution()
+    handler = _previous_handlers.get(signum)
+    if callable(handler):
+        handler(signum, frame)
+    else:
+        signal.signal(signum, signal.SIG_DFL if handler is None else handler)
+        os.kill(os.getpid(), signum)
+
+
+_previous_handlers = {}
+
+
+def _reset_after_fork():
+    # a forked child starts with copies of the parent's analyses and
+    # buffers, it gets fresh ones and reports its results as a shard
+    global analyses, covered, end_execution_called
+    global _setup_lock, _end_lock
+    end_execution_called = False
+    # other threads do not exist in the child, their locks may never be released
+    _setup_lock = threading.RLock()
+    _end_lock = threading.RLock()
+    reset_contexts()
+    if covered is not None:
+        covered = {}
+    if analysis_specs is not None:
+        # none of the parent's instances may report in the child, even if
+        # making a fresh one fails
+        analyses = []
+        for spec in analysis_specs:
+            try:
+                analyses.extend(load_analyses([_fresh(spec)]))
+            except Exception as e:
+                print(
+                    f"DynaPyt cannot make {spec} anew in process {os.getpid()}, it does not analyze it: {e!r}",
+                    file=sys.stderr,
+                )
+        _prepare(analyses)
+    multiprocessing = sys.modules.get("multiprocessing")
+    if multiprocessing is not None:
+        # multiprocessing children leave through os._exit, without atexit
+        multiprocessing.util.register_after_fork(_end_with_process, _end_with_process)
+
+
+def _fresh(spec):
+    if isinstance(spec, str):
+        return spec
+    # an instance, made again with the arguments it was made with
+    args, kwargs = getattr(spec, "_constructor_args", ((), {}))
+    return type(spec)(*args, **kwargs)
+
+
+def _end_with_process(_=None):
+    import multiprocessing.util
+
+    multiprocessing.util.Finalize(None, end_execution, exitpriority=0)
 
 
 def set_analysis(new_analyses: List[Any]):
-    global analyses, covered
-    if analyses is None:
+    global analyses, analysis_specs, covered, profiling
+    with _setup_lock:
+        if analyses is not None:
+            return
         analyses = []
-        if Path("/tmp/dynapyt_coverage/").exists():
+        reset_contexts()
+        if Path(coverage_dir()).exists():
             covered = {}
-        signal.signal(signal.SIGINT, end_execution)
-        signal.signal(signal.SIGTERM, end_execution)
-        atexit.register(end_execution)
-        analyses = load_analyses(new_analyses)
+        if profile_dir() is not None and Path(profile_dir()).exists():
+            profiling = True
+        if analysis_specs is None:
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    _previous_handlers[signum] = signal.signal(signum, _end_on_signal)
+                except ValueError:
+                    # not in the main thread
+                    pass
+            atexit.register(end_execution)
+            if hasattr(os, "register_at_fork"):
+                os.register_at_fork(after_in_child=_reset_after_fork)
+            multiprocessing = sys.modules.get("multiprocessing")
+            # parent_process is new in Python 3.8
+            parent_process = getattr(multiprocessing, "parent_process", lambda: None)
+            if multiprocessing is not None and parent_process() is not None:
+                # spawned child of a multiprocessing parent
+                _end_with_process()
+        analysis_specs = list(new_analyses)
+        new_analyses = load_analyses(new_analyses)
+        _prepare(new_analyses)
+        analyses = new_analyses
+
+
+def _prepare(new_analyses: List[Any]):
+    global hook_args, dispatchers, tracks_calls, _prepared
+    # the signatures of the hooks are inspected once, arguments that no
+    # analysis reads are not built for every event
+    hook_args = hook_arguments(new_analyses)
+    # the other analyses do not pay for the shadow call stack
+    tracks_calls = any(
+        getattr(analysis, "uses_call_stack", False) for analysis in new_analyses
+    )
+    dispatchers = {}
+    _prepared = new_analyses
 
 
 def filtered(func, f, args):
@@ -78,6 +286,10 @@ def filtered(func, f, args):
         start = docs.find(START)
         end = docs.find(END)
         fltr = docs[start + len(START) : end].strip()
+        if " -> " not in fltr:
+            # not a filter, e.g. once
+            docs = docs[end + len(END) :].lstrip()
+            continue
         patterns = fltr.split(" -> ")[1].split(SEPERATOR)
         if fltr.startswith("only ->") and any(
             [getattr(arg, "__name__", repr(arg)) in patterns for arg in sub_args]
@@ -91,35 +303,220 @@ def filtered(func, f, args):
     return False
 
 
-def call_if_exists(f, *args):
-    global covered, analyses, current_file
-    return_value = None
-    if analyses is None:
-        with open("/tmp/dynapyt_analyses.txt", "r") as af:
-            analysis_list = af.read().split("\n")
-        set_analysis(analysis_list)
-    for analysis in analyses:
-        func = getattr(analysis, f, None)
-        if func is not None and not filtered(func, f, args):
-            return_value = func(*args)
+# hooks of an event that take the same arguments, from the highest level of
+# the hierarchy to the lowest: (hook, number of arguments it takes or None
+# for all, whether its result replaces the value of the event)
+_RUNTIME_EVENT = (("runtime_event", 2, False),)
+_CONTROL_FLOW_EVENT = _RUNTIME_EVENT + (("control_flow_event", 2, False),)
+_EVENT_LEVELS = {
+    "_control_flow_": _CONTROL_FLOW_EVENT,
+    "_bool_": _RUNTIME_EVENT + (("literal", 3, True), ("boolean", 3, True)),
+    "_int_": _RUNTIME_EVENT + (("literal", 3, True), ("integer", 3, True)),
+    "_float_": _RUNTIME_EVENT + (("literal", 3, True), ("float", 3, True)),
+    "_str_": _RUNTIME_EVENT + (("literal", 3, True), ("string", 3, True)),
+    "_img_": _RUNTIME_EVENT + (("literal", 3, True), ("imaginary", 3, True)),
+    "_literal_": _RUNTIME_EVENT + (("literal", 3, True),),
+    "_read_": (
+        ("memory_access", 3, False),
+        ("read", 3, False),
+        ("read_identifier", 3, True),
+    ),
+    "_try_": _CONTROL_FLOW_EVENT + (("enter_try", 2, False),),
+    "_end_try_": _CONTROL_FLOW_EVENT + (("clean_exit_try", 2, False),),
+    "_exc_": _CONTROL_FLOW_EVENT + (("exception", None, False),),
+    "_raise_": _CONTROL_FLOW_EVENT + (("_raise", None, True),),
+    "_func_entry_": _CONTROL_FLOW_EVENT + (("function_enter", None, False),),
+    "_func_exit_": _CONTROL_FLOW_EVENT + (("function_exit", None, False),),
+    "_assert_": _CONTROL_FLOW_EVENT + (("_assert", None, True),),
+    "_break_": _CONTROL_FLOW_EVENT + (("_break", 2, True),),
+    "_continue_": _CONTROL_FLOW_EVENT + (("_continue", 2, True),),
+    "_enter_if_": _CONTROL_FLOW_EVENT
+    + (("enter_control_flow", 3, True), ("enter_if", 3, True)),
+    "_exit_if_": _CONTROL_FLOW_EVENT
+    + (("exit_control_flow", 2, False), ("exit_if", 2, False)),
+    "_enter_while_": _CONTROL_FLOW_EVENT
+    + (("enter_control_flow", 3, True), ("enter_while", 3, True)),
+    "_exit_while_": _CONTROL_FLOW_EVENT
+    + (("exit_control_flow", 2, False), ("exit_while", 2, False)),
+    "_exit_for_": _CONTROL_FLOW_EVENT
+    + (("exit_control_flow", 2, False), ("exit_for", 2, False)),
+    # not a control flow event, so that analyses of all control flow do
+    # not make every loop report a summary
+    "_loop_summary_": (("loop_summary", None, False),),
+}
+
+
+def _fuse(event: str):
+    """
+    Dispatcher of `event` over the analyses that implement one of its hooks,
+    flattened in the order of the hook levels and of the analyses. Within a
+    level the last analysis decides the result, and the result of a lower
+    level that is not None replaces that of a higher one.
+    """
+    levels = _EVENT_LEVELS.get(event, ((event, None, True),))
+    entries = []
+    for level, (hook, arity, replaces) in enumerate(levels):
+        for analysis in analyses:
+            func = getattr(analysis, hook, None)
+            if func is not None:
+                details = get_details(func)
+                has_filter = "only" in details or "ignore" in details
+                name = analysis.__class__.__name__
+                entries.append((level, hook, arity, replaces, name, func, has_filter))
+    count = len(levels)
+
+    if profiling and len(entries) > 0:
+        return _profiling_dispatcher(entries, count)
+
+    if len(entries) == 0:
+
+        def dispatch(context, args):
+            context.events += count
+
+    elif len(entries) == 1 and not entries[0][6]:
+        _, _, arity, replaces, name, func, _ = entries[0]
+
+        def dispatch(context, args):
+            context.events += count
+            if arity is not None:
+                args = args[:arity]
+            result = func(*args)
             if covered is not None and len(args) >= 2:
-                r_file, iid = args[0], args[1]
-                if current_file is None or current_file.file_path != r_file:
-                    current_file = IIDs(r_file)
-                if r_file not in covered:
-                    covered[r_file] = {}
-                line_no = current_file.iid_to_location[
-                    iid
-                ].start_line  # This is not accurate for multiline statements like if, for, multiline calls, etc.
-                if line_no not in covered[r_file]:
-                    covered[r_file][line_no] = {analysis.__class__.__name__: 0}
-                if analysis.__class__.__name__ not in covered[r_file][line_no]:
-                    covered[r_file][line_no][analysis.__class__.__name__] = 0
-                covered[r_file][line_no][analysis.__class__.__name__] += 1
-    return return_value
+                _cover(context, name, args)
+            return result if replaces else None
+
+    else:
+
+        def dispatch(context, args):
+            context.events += count
+            result = None
+            current_level = None
+            level_result = None
+            for level, hook, arity, replaces, name, func, has_filter in entries:
+                if level != current_level:
+                    if level_result is not None:
+                        result = level_result
+                    current_level = level
+                    level_result = None
+                call_args = args if arity is None else args[:arity]
+                if has_filter and filtered(func, hook, call_args):
+                    continue
+                return_value = func(*call_args)
+                if replaces:
+                    level_result = return_value
+                if covered is not None and len(call_args) >= 2:
+                    _cover(context, name, call_args)
+            return result if level_result is None else level_result
+
+    return dispatch
+
+
+def _cover(context, name: str, args):
+    # only this thread writes to its coverage
+    thread_covered = context.covered
+    r_file, iid = args[0], args[1]
+    current_file = context.current_file
+    if current_file is None or current_file.file_path != r_file:
+        current_file = context.current_file = IIDs(r_file)
+    if r_file not in thread_covered:
+        thread_covered[r_file] = {}
+    line_no = current_file.iid_to_location[
+        iid
+    ].start_line  # This is not accurate for multiline statements like if, for, multiline calls, etc.
+    if line_no not in thread_covered[r_file]:
+        thread_covered[r_file][line_no] = {name: 0}
+    if name not in thread_covered[r_file][line_no]:
+        thread_covered[r_file][line_no][name] = 0
+    thread_covered[r_file][line_no][name] += 1
+
+
+def _profiling_dispatcher(entries, count):
+    # like the general dispatcher, but also records for every analysis
+    # whether a hook returned something or changed the state that the
+    # analysis reports; the profile tells analyses apart by their module
+    # and class
+    profiled = []
+    for entry in entries:
+        cls = type(getattr(entry[5], "__self__", None))
+        profiled.append(entry + (f"{cls.__module__}.{cls.__qualname__}",))
+
+    def dispatch(context, args):
+        context.events += count
+        result = None
+        current_level = None
+        level_result = None
+        for level, hook, arity, replaces, name, func, has_filter, qualified in profiled:
+            if level != current_level:
+                if level_result is not None:
+                    result = level_result
+                current_level = level
+                level_result = None
+            call_args = args if arity is None else args[:arity]
+            if has_filter and filtered(func, hook, call_args):
+                continue
+            analysis = getattr(func, "__self__", None)
+            state = getattr(analysis, "profile_state", None)
+            before = state() if state is not None else None
+            return_value = func(*call_args)
+            if replaces:
+                level_result = return_value
+            # without a reported state, every event may matter
+            relevant = (
+                before is None
+                or (replaces and return_value is not None)
+                or state() != before
+            )
+            _profile(context, qualified, call_args, relevant)
+            if covered is not None and len(call_args) >= 2:
+                _cover(context, name, call_args)
+        return result if level_result is None else level_result
+
+    return dispatch
+
+
+def _profile(context, name: str, args, relevant: bool):
+    # only events of sites, e.g. not uncaught_exception
+    if len(args) < 2 or type(args[0]) is not str or type(args[1]) is not int:
+        return
+    sites = context.profile.setdefault(name, {}).setdefault(args[0], {})
+    counts = sites.get(args[1])
+    if counts is None:
+        counts = sites[args[1]] = [0, 0]
+    counts[0] += 1
+    if relevant:
+        counts[1] += 1
+
+
+def _load_analyses():
+    if analyses is None:
+        with _setup_lock:
+            if analyses is None:
+                with open(analyses_file(), "r") as af:
+                    analysis_list = af.read().split("\n")
+                set_analysis(analysis_list)
+    if _prepared is not analyses:
+        # the analyses were assigned directly, e.g. by a benchmark
+        _prepare(analyses)
+
+
+def call_if_exists(event: str, *args):
+    """
+    Calls the hooks of `event` in one pass: a hook, or all levels of an
+    event in `_EVENT_LEVELS`.
+    """
+    if _prepared is not analyses or analyses is None:
+        _load_analyses()
+    dispatcher = dispatchers.get(event)
+    if dispatcher is None:
+        # the same for all threads, so building it twice does no harm
+        dispatcher = dispatchers[event] = _fuse(event)
+    return dispatcher(event_context(), args)
 
 
 def _dynapyt_parse_to_ast_(code):
+    # libcst is slow to import, only load it for analyses that need an AST
+    import libcst as cst
+
     return cst.parse_module(code)
 
 
@@ -150,13 +547,18 @@ def _aug_assign_(dyn_ast, iid, left, opr, right):
         "RightShiftAssign",
         "SubtractAssign",
     ]
-    call_if_exists("operation", dyn_ast, iid, operator[opr][:-6], [left, right], None)
+    reads = hook_args.get("operation")
+    if reads is not None:
+        operands = [left, right] if 3 in reads else None
+        call_if_exists("operation", dyn_ast, iid, operator[opr][:-6], operands, None)
     call_if_exists(
         "binary_operation", dyn_ast, iid, operator[opr][:-6], left, right, None
     )
     call_if_exists(snake(operator[opr][:-6]), dyn_ast, iid, left, right, None)
     call_if_exists("memory_access", dyn_ast, iid, right)
-    call_if_exists("write", dyn_ast, iid, [left], right)
+    reads = hook_args.get("write")
+    if reads is not None:
+        call_if_exists("write", dyn_ast, iid, [left] if 2 in reads else None, right)
     result_high = call_if_exists(
         "augmented_assignment", dyn_ast, iid, left, operator[opr], right
     )
@@ -170,26 +572,76 @@ def _aug_assign_(dyn_ast, iid, left, opr, right):
     return right
 
 
-def _binary_op_(dyn_ast, iid, left, opr, right):
+def _bool_left_(dyn_ast, iid, left, opr):
+    # and/or with await, whose operands cannot be wrapped in lambdas: the
+    # instrumented code is _bool_op_(..., right if _bool_left_(...) else
+    # None), which evaluates both operands in their own frame and tests the
+    # truthiness of the left one only once, here
     call_if_exists("runtime_event", dyn_ast, iid)
-    bin_op = [
-        "Add",
-        "BitAnd",
-        "BitOr",
-        "BitXor",
-        "Divide",
-        "FloorDivide",
-        "LeftShift",
-        "MatrixMultiply",
-        "Modulo",
-        "Multiply",
-        "Power",
-        "RightShift",
-        "Subtract",
-        "And",
-        "Or",
-    ]
-    if opr < 13:
+    evaluate_right = (opr == 13) == bool(left)
+    frame = sys._getframe(1)
+    operands = _pending_operands()
+    if len(operands) >= 64:
+        _drop_finished_operands(operands, frame)
+    operands.append((frame, iid, left, evaluate_right))
+    return evaluate_right
+
+
+def _bool_op_(dyn_ast, iid, opr, right):
+    frame = sys._getframe(1)
+    operands = _pending_operands()
+    # the entries of operands that raised stay behind until they are dropped
+    for i in range(len(operands) - 1, -1, -1):
+        if operands[i][0] is frame and operands[i][1] == iid:
+            _, _, left, evaluated = operands.pop(i)
+            break
+    if evaluated:
+        result = right
+    else:
+        result = left
+        right = None
+    return _report_binary_op(dyn_ast, iid, left, opr, right, result)
+
+
+def _pending_operands():
+    # per task, the tasks of a thread interleave at every await
+    context = event_context()
+    task = context.task
+    return context.operands if task is None else task.operands
+
+
+def _drop_finished_operands(operands, frame):
+    running = set()
+    while frame is not None:
+        running.add(frame)
+        frame = frame.f_back
+    operands[:] = [entry for entry in operands if entry[0] in running]
+
+
+_bin_op = [
+    "Add",
+    "BitAnd",
+    "BitOr",
+    "BitXor",
+    "Divide",
+    "FloorDivide",
+    "LeftShift",
+    "MatrixMultiply",
+    "Modulo",
+    "Multiply",
+    "Power",
+    "RightShift",
+    "Subtract",
+    "And",
+    "Or",
+]
+
+
+def _binary_op_(dyn_ast, iid, left, opr, right, evaluated=False):
+    # operands containing await cannot be wrapped in lambdas, the
+    # instrumented code evaluates them and passes their values instead
+    call_if_exists("runtime_event", dyn_ast, iid)
+    if opr < 13 and not evaluated:
         try:
             left = left()
             right = right()
@@ -222,37 +674,32 @@ def _binary_op_(dyn_ast, iid, left, opr, right):
     elif opr == 12:
         result = left - right
     elif opr == 13:
-        try:
-            left = left()
-        except TypeError:
-            raise
+        left = left()
         if left:
-            try:
-                right = right()
-            except TypeError:
-                raise
-            result = left and right
+            right = right()
+            result = right
         else:
             result = left
     elif opr == 14:
-        try:
-            left = left()
-        except TypeError:
-            raise
+        left = left()
         if left:
             result = left
         else:
-            try:
-                right = right()
-            except TypeError:
-                raise
-            result = left or right
-    call_if_exists("operation", dyn_ast, iid, bin_op[opr], [left, right], result)
+            right = right()
+            result = right
+    return _report_binary_op(dyn_ast, iid, left, opr, right, result)
+
+
+def _report_binary_op(dyn_ast, iid, left, opr, right, result):
+    reads = hook_args.get("operation")
+    if reads is not None:
+        operands = [left, right] if 3 in reads else None
+        call_if_exists("operation", dyn_ast, iid, _bin_op[opr], operands, result)
     result_high = call_if_exists(
-        "binary_operation", dyn_ast, iid, bin_op[opr], left, right, result
+        "binary_operation", dyn_ast, iid, _bin_op[opr], left, right, result
     )
     result_low = call_if_exists(
-        get_name(snake(bin_op[opr])), dyn_ast, iid, left, right, result
+        get_name(snake(_bin_op[opr])), dyn_ast, iid, left, right, result
     )
     if result_low != None:
         return result_low
@@ -272,7 +719,10 @@ def _unary_op_(dyn_ast, iid, opr, right):
         result = not right
     elif opr == 3:
         result = +right
-    call_if_exists("operation", dyn_ast, iid, un_op[opr], [right], result)
+    reads = hook_args.get("operation")
+    if reads is not None:
+        operands = [right] if 3 in reads else None
+        call_if_exists("operation", dyn_ast, iid, un_op[opr], operands, result)
     result_high = call_if_exists(
         "unary_operation", dyn_ast, iid, un_op[opr], right, result
     )
@@ -286,7 +736,9 @@ def _unary_op_(dyn_ast, iid, opr, right):
     return result
 
 
-def _comp_op_(dyn_ast, iid, left, comparisons):
+def _comp_op_(dyn_ast, iid, left, comparisons, lazy=False):
+    # with lazy, the comparators after the first one are thunks, called only
+    # while the chain is true, like a chained comparison in Python
     call_if_exists("runtime_event", dyn_ast, iid)
     comp_op = [
         "Equal",
@@ -301,8 +753,11 @@ def _comp_op_(dyn_ast, iid, left, comparisons):
         "NotIn",
     ]
     l = left
-    result = True
-    for op, r in comparisons:
+    last = len(comparisons) - 1
+    operation_reads = hook_args.get("operation")
+    for index, (op, r) in enumerate(comparisons):
+        if lazy and index > 0:
+            r = r()
         if op == 0:
             tmp = l == r
         elif op == 1:
@@ -323,7 +778,9 @@ def _comp_op_(dyn_ast, iid, left, comparisons):
             tmp = l is not r
         elif op == 9:
             tmp = l not in r
-        call_if_exists("operation", dyn_ast, iid, comp_op[op], [left, r], tmp)
+        if operation_reads is not None:
+            operands = [l, r] if 3 in operation_reads else None
+            call_if_exists("operation", dyn_ast, iid, comp_op[op], operands, tmp)
         result_high = call_if_exists("comparison", dyn_ast, iid, l, comp_op[op], r, tmp)
         result_low = call_if_exists(
             get_name(snake(comp_op[op])), dyn_ast, iid, l, r, tmp
@@ -332,14 +789,14 @@ def _comp_op_(dyn_ast, iid, left, comparisons):
             tmp = result_low
         elif result_high != None:
             tmp = result_high
-        result = result and tmp
+        # like Python, only asks for the truth of results that are not last
+        if index == last or not tmp:
+            return tmp
         l = r
-    return result
 
 
 def _call_(dyn_ast, iid, call, only_post, pos_args, kw_args):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    call_if_exists("control_flow_event", dyn_ast, iid)
+    call_if_exists("_control_flow_", dyn_ast, iid)
     if only_post:
         result = call
         new_res = call_if_exists(
@@ -352,76 +809,68 @@ def _call_(dyn_ast, iid, call, only_post, pos_args, kw_args):
             if star == "":
                 tmp.append(a)
             elif star == "*":
-                tmp.extend(list(a))
+                tmp.extend(a)
             else:
                 kw_args = dict(kw_args, **a)
         pos_args = tuple(tmp)
-        call_if_exists("pre_call", dyn_ast, iid, call, pos_args, kw_args)
+        if "pre_call" in hook_args:
+            call_if_exists("pre_call", dyn_ast, iid, call, pos_args, kw_args)
         result = call(*pos_args, **kw_args)
+        if "post_call" not in hook_args:
+            return result
         new_res = call_if_exists(
             "post_call", dyn_ast, iid, result, call, pos_args, kw_args
         )
         return new_res if new_res is not None else result
 
 
-def _bool_(dyn_ast, iid, val):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    res_high = call_if_exists("literal", dyn_ast, iid, val)
-    res_low = call_if_exists("boolean", dyn_ast, iid, val)
-    if res_low != None:
-        return res_low
-    elif res_high != None:
-        return res_high
-    return val
+def _bool_(dyn_ast, iid, val, reported=None):
+    res = call_if_exists("_bool_", dyn_ast, iid, val)
+    if res is None:
+        res = val
+    if reported is not None:
+        reported[iid] = res
+    return res
 
 
-def _int_(dyn_ast, iid, val):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    res_high = call_if_exists("literal", dyn_ast, iid, val)
-    res_low = call_if_exists("integer", dyn_ast, iid, val)
-    if res_low != None:
-        return res_low
-    elif res_high != None:
-        return res_high
-    return val
+def _int_(dyn_ast, iid, val, reported=None):
+    res = call_if_exists("_int_", dyn_ast, iid, val)
+    if res is None:
+        res = val
+    if reported is not None:
+        reported[iid] = res
+    return res
 
 
-def _float_(dyn_ast, iid, val):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    res_high = call_if_exists("literal", dyn_ast, iid, val)
-    res_low = call_if_exists("float", dyn_ast, iid, val)
-    if res_low != None:
-        return res_low
-    elif res_high != None:
-        return res_high
-    return val
+def _float_(dyn_ast, iid, val, reported=None):
+    res = call_if_exists("_float_", dyn_ast, iid, val)
+    if res is None:
+        res = val
+    if reported is not None:
+        reported[iid] = res
+    return res
 
 
-def _str_(dyn_ast, iid, val):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    res_high = call_if_exists("literal", dyn_ast, iid, val)
-    res_low = call_if_exists("string", dyn_ast, iid, val)
-    if res_low != None:
-        return res_low
-    elif res_high != None:
-        return res_high
-    return val
+def _str_(dyn_ast, iid, val, reported=None):
+    res = call_if_exists("_str_", dyn_ast, iid, val)
+    if res is None:
+        res = val
+    if reported is not None:
+        reported[iid] = res
+    return res
 
 
-def _img_(dyn_ast, iid, val):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    res_high = call_if_exists("literal", dyn_ast, iid, val)
-    res_low = call_if_exists("imaginary", dyn_ast, iid, val)
-    if res_low != None:
-        return res_low
-    elif res_high != None:
-        return res_high
-    return val
+def _img_(dyn_ast, iid, val, reported=None):
+    res = call_if_exists("_img_", dyn_ast, iid, val)
+    if res is None:
+        res = val
+    if reported is not None:
+        reported[iid] = res
+    return res
 
 
 def _literal_(dyn_ast, iid, val):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    res = call_if_exists("literal", dyn_ast, iid, val)
+    res = call_if_exists("_literal_", dyn_ast, iid, val)
     return res if res != None else val
 
 
@@ -432,7 +881,7 @@ def _dict_(dyn_ast, iid, val):
         if not isinstance(v, tuple):
             value.update(v)
         else:
-            value.update({v[0]: v[1]})
+            value[v[0]] = v[1]
     call_if_exists("literal", dyn_ast, iid, value)
     res = call_if_exists("dictionary", dyn_ast, iid, val, value)
     return res if res != None else value
@@ -474,28 +923,46 @@ def _delete_(dyn_ast, iid, del_target: List[Tuple[Any, Any, bool]], analyze: boo
                 delattr(base, offset)
 
 
-def _attr_(dyn_ast, iid, base, attr):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    if (attr.startswith("__")) and (not attr.endswith("__")):
-        if type(base).__name__ == "type":
-            parents = [base]
-        else:
-            parents = [type(base)]
-        found = True
+def _private_attr(base, attr):
+    if type(base).__name__ == "type":
+        cls = base
+    else:
+        cls = type(base)
+    # every lookup reorders the cache, so each thread has its own
+    context = event_context()
+    private_names = context.private_names
+    if private_names is None:
+        private_names = context.private_names = ShadowMemory()
+    names = private_names.get(cls)
+    if names is None:
+        names = private_names[cls] = {}
+    candidates = names.get(attr)
+    if candidates is None:
+        # the class and then its bases, depth first from the last base
+        candidates = []
+        parents = [cls]
         while len(parents) > 0:
-            found = True
             cur_par = parents.pop()
-            try:
-                cur_name = cur_par.__name__
-                cur_name = cur_name.lstrip("_")
-                val = getattr(base, "_" + cur_name + attr)
-            except AttributeError:
-                found = False
-                parents.extend(list(cur_par.__bases__))
-                continue
-            break
-        if not found:
-            raise AttributeError()
+            name = "_" + cur_par.__name__.lstrip("_") + attr
+            if name not in candidates:
+                candidates.append(name)
+            parents.extend(list(cur_par.__bases__))
+        candidates = names[attr] = tuple(candidates)
+    for name in candidates:
+        try:
+            return getattr(base, name)
+        except AttributeError:
+            continue
+    raise AttributeError()
+
+
+def _attr_(dyn_ast, iid, base, attr, name=None):
+    call_if_exists("runtime_event", dyn_ast, iid)
+    if name is not None:
+        # the private name, mangled by the instrumenter
+        val = getattr(base, name)
+    elif (attr.startswith("__")) and (not attr.endswith("__")):
+        val = _private_attr(base, attr)
     else:
         val = getattr(base, attr)
     call_if_exists("memory_access", dyn_ast, iid, val)
@@ -517,27 +984,19 @@ def _sub_(dyn_ast, iid, base, sl):
 
 
 def _try_(dyn_ast, iid):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    call_if_exists("control_flow_event", dyn_ast, iid)
-    call_if_exists("enter_try", dyn_ast, iid)
+    call_if_exists("_try_", dyn_ast, iid)
 
 
 def _end_try_(dyn_ast, iid):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    call_if_exists("control_flow_event", dyn_ast, iid)
-    call_if_exists("clean_exit_try", dyn_ast, iid)
+    call_if_exists("_end_try_", dyn_ast, iid)
 
 
 def _exc_(dyn_ast, iid, exc=None, name=None):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    call_if_exists("control_flow_event", dyn_ast, iid)
-    call_if_exists("exception", dyn_ast, iid, exc, name)
+    call_if_exists("_exc_", dyn_ast, iid, exc, name)
 
 
 def _raise_(dyn_ast, iid, exc=None, cause=None):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    call_if_exists("control_flow_event", dyn_ast, iid)
-    res = call_if_exists("_raise", dyn_ast, iid, exc, cause)
+    res = call_if_exists("_raise_", dyn_ast, iid, exc, cause)
     if res is not None:
         exc, cause = res
     if exc == None:
@@ -549,6 +1008,12 @@ def _raise_(dyn_ast, iid, exc=None, cause=None):
             raise exc from cause
 
 
+def _bind_(dyn_ast, *names):
+    """Runtime functions bound to the file, for compactly instrumented code."""
+    module = sys.modules[__name__]
+    return tuple(partial(getattr(module, name), dyn_ast) for name in names)
+
+
 def _catch_(exception):
     t, v, stack_trace = exc_info()
     call_if_exists("runtime_event", "", -1)
@@ -559,49 +1024,57 @@ def _catch_(exception):
 def _read_(dyn_ast, iid, var_arg):
     call_if_exists("runtime_event", dyn_ast, iid)
     value = var_arg()
-    call_if_exists("memory_access", dyn_ast, iid, value)
-    call_if_exists("read", dyn_ast, iid, value)
-    result = call_if_exists("read_identifier", dyn_ast, iid, value)
+    result = call_if_exists("_read_", dyn_ast, iid, value)
     return result if result != None else value
 
 
 def _if_expr_(dyn_ast, iid, condition, true_val, false_val):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    call_if_exists("control_flow_event", dyn_ast, iid)
-    result_high = call_if_exists("enter_control_flow", dyn_ast, iid, condition)
-    result_low = call_if_exists("enter_if", dyn_ast, iid, condition)
-    final_condition = condition
-    if result_low is not None:
-        final_condition = result_low
-    elif result_high is not None:
-        final_condition = result_high
-    if final_condition:
+    if _enter_if_(dyn_ast, iid, condition):
         res = true_val()
     else:
         res = false_val()
-    call_if_exists("runtime_event", dyn_ast, iid)
-    call_if_exists("control_flow_event", dyn_ast, iid)
-    call_if_exists("exit_control_flow", dyn_ast, iid)
-    call_if_exists("exit_if", dyn_ast, iid)
+    return _exit_if_expr_(dyn_ast, iid, res)
+
+
+def _exit_if_expr_(dyn_ast, iid, res):
+    # conditional expressions with await keep their branches in place:
+    # _exit_if_expr_(..., body if _enter_if_(..., test) else orelse)
+    _exit_if_(dyn_ast, iid)
     return res
 
 
 def _func_entry_(dyn_ast, iid, args, name: str, is_lambda=False):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    call_if_exists("control_flow_event", dyn_ast, iid)
-    call_if_exists("function_enter", dyn_ast, iid, args, name, is_lambda)
+    _enter_frame(dyn_ast, iid, name, sys._getframe(1))
+    call_if_exists("_func_entry_", dyn_ast, iid, args, name, is_lambda)
+
+
+def _enter_frame(dyn_ast, iid, name: str, frame):
+    if _prepared is not analyses or analyses is None:
+        _load_analyses()
+    if tracks_calls:
+        call_stack().append(StackEntry(iid, name, id(frame), dyn_ast))
+
+
+def _leave_frame(frame_id: int):
+    # every instrumented function leaves the stack in a finally block, so
+    # the entry of the function that is left is always on top
+    if tracks_calls:
+        stack = call_stack()
+        if len(stack) > 0 and stack[-1].frame_id == frame_id:
+            stack.pop()
+
+
+def _func_leave_():
+    _leave_frame(id(sys._getframe(1)))
 
 
 def _func_exit_(dyn_ast, iid, name: str):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    call_if_exists("control_flow_event", dyn_ast, iid)
-    call_if_exists("function_exit", dyn_ast, iid, name, None)
+    call_if_exists("_func_exit_", dyn_ast, iid, name, None)
     return
 
 
 def _return_(dyn_ast, iid, function_iid, function_name, return_val=None):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    call_if_exists("control_flow_event", dyn_ast, iid)
+    call_if_exists("_control_flow_", dyn_ast, iid)
     result_high = call_if_exists(
         "function_exit", dyn_ast, function_iid, function_name, return_val
     )
@@ -616,14 +1089,15 @@ def _return_(dyn_ast, iid, function_iid, function_name, return_val=None):
 
 
 def _yield_(dyn_ast, iid, function_iid, function_name, return_val=None):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    call_if_exists("control_flow_event", dyn_ast, iid)
+    call_if_exists("_control_flow_", dyn_ast, iid)
     result_high = call_if_exists(
         "function_exit", dyn_ast, function_iid, function_name, return_val
     )
     result_low = call_if_exists(
         "_yield", dyn_ast, iid, function_iid, function_name, return_val
     )
+    # a resumed generator is not on the stack again
+    _leave_frame(id(sys._getframe(1)))
     if result_low != None:
         return result_low
     elif result_high != None:
@@ -631,75 +1105,57 @@ def _yield_(dyn_ast, iid, function_iid, function_name, return_val=None):
     return return_val
 
 
+def _resume_(dyn_ast, function_iid, function_name, sent):
+    _enter_frame(dyn_ast, function_iid, function_name, sys._getframe(1))
+    return sent
+
+
 def _assert_(dyn_ast, iid, test, msg):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    call_if_exists("control_flow_event", dyn_ast, iid)
-    result = call_if_exists("_assert", dyn_ast, iid, test, msg)
+    result = call_if_exists("_assert_", dyn_ast, iid, test, msg)
     return result if result is not None else test
 
 
 def _lambda_(dyn_ast, iid, args, expr):
-    _func_entry_(dyn_ast, iid, args, "lambda", True)
-    res = expr()
-    return _return_(dyn_ast, iid, iid, res)
+    # the entry is the frame of the lambda, whose code is named <lambda>
+    frame = sys._getframe(1)
+    _enter_frame(dyn_ast, iid, "<lambda>", frame)
+    try:
+        call_if_exists("_func_entry_", dyn_ast, iid, args, "lambda", True)
+        return _return_(dyn_ast, iid, iid, "lambda", expr())
+    finally:
+        _leave_frame(id(frame))
 
 
 def _break_(dyn_ast, iid):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    call_if_exists("control_flow_event", dyn_ast, iid)
-    result = call_if_exists("_break", dyn_ast, iid)
-    return result if result != None else True
+    result = call_if_exists("_break_", dyn_ast, iid)
+    return result if result is not None else True
 
 
 def _continue_(dyn_ast, iid):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    call_if_exists("control_flow_event", dyn_ast, iid)
-    result = call_if_exists("_continue", dyn_ast, iid)
-    return result if result != None else True
+    result = call_if_exists("_continue_", dyn_ast, iid)
+    return result if result is not None else True
 
 
 def _enter_if_(dyn_ast, iid, condition):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    call_if_exists("control_flow_event", dyn_ast, iid)
-    result_high = call_if_exists("enter_control_flow", dyn_ast, iid, condition)
-    result_low = call_if_exists("enter_if", dyn_ast, iid, condition)
-    final_condition = condition
-    if result_low is not None:
-        final_condition = result_low
-    elif result_high is not None:
-        final_condition = result_high
-    return final_condition
+    result = call_if_exists("_enter_if_", dyn_ast, iid, condition)
+    return result if result is not None else condition
 
 
 def _exit_if_(dyn_ast, iid):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    call_if_exists("control_flow_event", dyn_ast, iid)
-    call_if_exists("exit_control_flow", dyn_ast, iid)
-    call_if_exists("exit_if", dyn_ast, iid)
+    call_if_exists("_exit_if_", dyn_ast, iid)
 
 
 def _enter_while_(dyn_ast, iid, condition):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    call_if_exists("control_flow_event", dyn_ast, iid)
-    result_high = call_if_exists("enter_control_flow", dyn_ast, iid, condition)
-    result_low = call_if_exists("enter_while", dyn_ast, iid, condition)
-    if result_low is not None:
-        return result_low
-    elif result_high is not None:
-        return result_high
-    return condition
+    result = call_if_exists("_enter_while_", dyn_ast, iid, condition)
+    return result if result is not None else condition
 
 
 def _exit_while_(dyn_ast, iid):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    call_if_exists("control_flow_event", dyn_ast, iid)
-    call_if_exists("exit_control_flow", dyn_ast, iid)
-    call_if_exists("exit_while", dyn_ast, iid)
+    call_if_exists("_exit_while_", dyn_ast, iid)
 
 
 def _enter_for_(dyn_ast, iid, next_val, iterable):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    call_if_exists("control_flow_event", dyn_ast, iid)
+    call_if_exists("_control_flow_", dyn_ast, iid)
     result_high = call_if_exists(
         "enter_control_flow", dyn_ast, iid, not isinstance(next_val, StopIteration)
     )
@@ -714,26 +1170,99 @@ def _enter_for_(dyn_ast, iid, next_val, iterable):
 
 
 def _exit_for_(dyn_ast, iid):
-    call_if_exists("runtime_event", dyn_ast, iid)
-    call_if_exists("control_flow_event", dyn_ast, iid)
-    call_if_exists("exit_control_flow", dyn_ast, iid)
-    call_if_exists("exit_for", dyn_ast, iid)
+    call_if_exists("_exit_for_", dyn_ast, iid)
 
 
-def _gen_(dyn_ast, iid, iterator):
-    if iterator is None:
-        return
+class _LoopSummary:
+    """
+    Counts the iterations of a for loop without Python calls per iteration,
+    and reports them with how the loop was left at its end:
+
+        with _rt._loop_(_dynapyt_ast_, iid, iterable) as loop:
+            try:
+                for x in loop:
+                    ...
+                else:
+                    loop.exhausted()
+                    ...
+                loop.left()
+            finally:
+                del loop
+    """
+
+    __slots__ = ("dyn_ast", "iid", "counter", "iterator", "exited_by")
+
+    def __init__(self, dyn_ast, iid, iterable):
+        self.dyn_ast = dyn_ast
+        self.iid = iid
+        self.counter = count()
+        # zip takes the next item of the iterable first, so the counter only
+        # advances for items that start an iteration
+        self.iterator = map(itemgetter(0), zip(iterable, self.counter))
+        self.exited_by = None
+
+    def __enter__(self):
+        return self
+
+    def __iter__(self):
+        return self.iterator
+
+    def exhausted(self):
+        self.exited_by = "exhausted"
+
+    def left(self):
+        if self.exited_by is None:
+            self.exited_by = "break"
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            exited_by = "exception"
+        elif self.exited_by is None:
+            exited_by = "return"
+        else:
+            exited_by = self.exited_by
+        call_if_exists(
+            "_loop_summary_", self.dyn_ast, self.iid, next(self.counter), exited_by
+        )
+
+
+def _loop_(dyn_ast, iid, iterable):
+    return _LoopSummary(dyn_ast, iid, iterable)
+
+
+class _ForIterator:
+    """Iterator of an instrumented for loop, calls the enter_for hooks for every item."""
+
+    __slots__ = ("dyn_ast", "iid", "iterable", "iterator", "done")
 
-    new_iter = iter(iterator)
-    while True:
+    def __init__(self, dyn_ast, iid, iterable):
+        self.dyn_ast = dyn_ast
+        self.iid = iid
+        self.iterable = iterable
+        self.iterator = iter(iterable)
+        self.done = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
         try:
-            it = next(new_iter)
-            result = _enter_for_(dyn_ast, iid, it, iterator)
-            if result is not None:
-                yield result
-            else:
-                yield it
+            item = next(self.iterator)
+            result = _enter_for_(self.dyn_ast, self.iid, item, self.iterable)
         except StopIteration as e:
-            _enter_for_(dyn_ast, iid, e, iterator)
-            _exit_for_(dyn_ast, iid)
-            return
+            # also raised by _enter_for_ if a hook ends the loop
+            if not self.done:
+                self.done = True
+                self.iterator = iter(())
+                try:
+                    _enter_for_(self.dyn_ast, self.iid, e, self.iterable)
+                finally:
+                    _exit_for_(self.dyn_ast, self.iid)
+            raise
+        return item if result is None else result
+
+
+def _gen_(dyn_ast, iid, iterator):
+    if iterator is None:
+        return iter(())
+    return _ForIterator(dyn_ast, iid, iterator)
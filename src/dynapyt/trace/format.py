@@ -0,0 +1,248 @@
+"""
+Binary layout of DynaPyt trace files.
+
+A trace file starts with a fixed-size header, followed by chunks of
+fixed-width event records and a trailing metadata block:
+
+    header | chunk header | records ... | chunk header | records ... | metadata
+
+Every chunk is stored either raw or compressed (zlib, or zstd if the
+`zstandard` package is installed). The metadata block is zlib-compressed
+JSON holding the hook names and the symbol table (file paths, short
+strings, type and function names) that records refer to by index.
+"""
+
+import json
+import struct
+import zlib
+from types import BuiltinFunctionType, FunctionType, MethodType
+from typing import Any, List, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b"DYNTRC01"
+VERSION = 2
+
+# magic, version, record size, codec, reserved, records per chunk,
+# metadata offset, metadata length
+HEADER = struct.Struct("<8sHHHHIQQ28x")
+# records in chunk, stored (possibly compressed) size, codec
+CHUNK_HEADER = struct.Struct("<IIH6x")
+# sequence number, timestamp (ns), thread id, file symbol, iid, hook id,
+# number of values, four value tags, four value payloads
+RECORD = struct.Struct("<QQIIiHHHHHHqqqq")
+RECORD_FIELDS = (
+    "seq",
+    "timestamp",
+    "thread",
+    "file",
+    "iid",
+    "hook",
+    "count",
+    "tag0",
+    "tag1",
+    "tag2",
+    "tag3",
+    "value0",
+    "value1",
+    "value2",
+    "value3",
+)
+# the most values a hook takes after dyn_ast and iid, e.g. the operator,
+# operands and result of binary_operation
+MAX_VALUES = 4
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+CODECS = {None: CODEC_NONE, "none": CODEC_NONE, "zlib": CODEC_ZLIB, "zstd": CODEC_ZSTD}
+
+TAG_NONE = 0
+TAG_BOOL = 1
+TAG_INT = 2
+TAG_BIG_INT = 3
+TAG_FLOAT = 4
+TAG_STR = 5
+TAG_LONG_STR = 6
+TAG_BYTES = 7
+TAG_LIST = 8
+TAG_TUPLE = 9
+TAG_DICT = 10
+TAG_SET = 11
+TAG_CALLABLE = 12
+TAG_OBJECT = 13
+# Tags from TAG_TYPE_BASE upwards encode the type name symbol of an object
+TAG_TYPE_BASE = 16
+MAX_TYPE_SYMBOL = 0xFFFF - TAG_TYPE_BASE
+
+MAX_INLINE_STR = 64
+MAX_SYMBOLS = 1 << 20
+
+_DOUBLE = struct.Struct("<d")
+_INT64 = struct.Struct("<q")
+_SIZED = {
+    bytes: TAG_BYTES,
+    list: TAG_LIST,
+    tuple: TAG_TUPLE,
+    dict: TAG_DICT,
+    set: TAG_SET,
+    frozenset: TAG_SET,
+}
+_SIZED_NAMES = {
+    TAG_LONG_STR: "str",
+    TAG_BYTES: "bytes",
+    TAG_LIST: "list",
+    TAG_TUPLE: "tuple",
+    TAG_DICT: "dict",
+    TAG_SET: "set",
+}
+_CALLABLES = (FunctionType, BuiltinFunctionType, MethodType, type)
+
+
+def codec_id(name) -> int:
+    if name not in CODECS:
+        raise ValueError(f"Unknown trace compression: {name}")
+    codec = CODECS[name]
+    if codec == CODEC_ZSTD and zstandard is None:
+        raise ImportError("zstd compression requires the zstandard package")
+    return codec
+
+
+def compress(codec: int, data) -> bytes:
+    if codec == CODEC_ZLIB:
+        return zlib.compress(data, 1)
+    elif codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=1).compress(data)
+    return bytes(data)
+
+
+def decompress(codec: int, data) -> bytes:
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data)
+    elif codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ImportError("reading zstd traces requires the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return bytes(data)
+
+
+def encode_metadata(metadata) -> bytes:
+    return zlib.compress(json.dumps(metadata).encode("utf-8"))
+
+
+def decode_metadata(data) -> dict:
+    return json.loads(zlib.decompress(data).decode("utf-8"))
+
+
+class SymbolTable:
+    """
+    Interns the strings that records refer to by index and turns arbitrary
+    values into (tag, payload) summaries.
+    """
+
+    def __init__(self) -> None:
+        self.symbols = []
+        self.index = {}
+
+    def intern(self, s: str) -> int:
+        idx = self.index.get(s)
+        if idx is None:
+            idx = len(self.symbols)
+            self.symbols.append(s)
+            self.index[s] = idx
+        return idx
+
+    def summarize(self, value: Any) -> Tuple[int, int]:
+        t = type(value)
+        if value is None:
+            return TAG_NONE, 0
+        elif t is bool:
+            return TAG_BOOL, int(value)
+        elif t is int:
+            if -(1 << 63) <= value < (1 << 63):
+                return TAG_INT, value
+            return TAG_BIG_INT, value.bit_length()
+        elif t is float:
+            return TAG_FLOAT, _INT64.unpack(_DOUBLE.pack(value))[0]
+        elif t is str:
+            # names, e.g. of functions, are kept whatever their length
+            if (len(value) <= MAX_INLINE_STR or value.isidentifier()) and (
+                value in self.index or len(self.symbols) < MAX_SYMBOLS
+            ):
+                return TAG_STR, self.intern(value)
+            return TAG_LONG_STR, len(value)
+        elif t in _SIZED:
+            return _SIZED[t], len(value)
+        elif isinstance(value, _CALLABLES):
+            name = getattr(value, "__qualname__", None) or getattr(
+                value, "__name__", t.__name__
+            )
+            module = getattr(value, "__module__", None)
+            if module is not None and module != "builtins":
+                name = module + "." + name
+            return TAG_CALLABLE, self.intern(name)
+        idx = self.intern(t.__module__ + "." + t.__qualname__)
+        if idx > MAX_TYPE_SYMBOL:
+            return TAG_OBJECT, id(value)
+        return TAG_TYPE_BASE + idx, id(value)
+
+
+class RecordedValue:
+    """
+    Stand-in for a value of which the trace only keeps a summary, e.g. the
+    length of a list or the type and identity of an object.
+    """
+
+    def __init__(self, type_name: str, payload: int, name: str = None) -> None:
+        self.type_name = type_name
+        self.payload = payload
+        if name is not None:
+            self.__qualname__ = name
+            self.__name__ = name.split(".")[-1]
+
+    def __len__(self) -> int:
+        return self.payload
+
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, RecordedValue)
+            and self.type_name == other.type_name
+            and self.payload == other.payload
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.type_name, self.payload))
+
+    def __repr__(self) -> str:
+        if self.type_name == "callable":
+            return f"<recorded callable {self.__qualname__}>"
+        elif self.type_name in _SIZED_NAMES.values():
+            return f"<recorded {self.type_name} of length {self.payload}>"
+        elif self.type_name == "int":
+            return f"<recorded int of {self.payload} bits>"
+        return f"<recorded {self.type_name} at {hex(self.payload)}>"
+
+
+def decode_value(tag: int, payload: int, symbols: List[str]) -> Any:
+    if tag == TAG_NONE:
+        return None
+    elif tag == TAG_BOOL:
+        return bool(payload)
+    elif tag == TAG_INT:
+        return payload
+    elif tag == TAG_FLOAT:
+        return _DOUBLE.unpack(_INT64.pack(payload))[0]
+    elif tag == TAG_STR:
+        return symbols[payload]
+    elif tag in _SIZED_NAMES:
+        return RecordedValue(_SIZED_NAMES[tag], payload)
+    elif tag == TAG_BIG_INT:
+        return RecordedValue("int", payload)
+    elif tag == TAG_CALLABLE:
+        return RecordedValue("callable", payload, symbols[payload])
+    elif tag >= TAG_TYPE_BASE:
+        return RecordedValue(symbols[tag - TAG_TYPE_BASE], payload)
+    return RecordedValue("object", payload)
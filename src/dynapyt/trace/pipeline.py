@@ -0,0 +1,308 @@
+"""
+Runs analyses in separate processes, concurrently with the program under
+analysis.
+
+The instrumented process only summarizes the events the analyses listen
+to into a shared-memory ring (see `dynapyt.trace.ring`). Every analysis
+process loads its group of analyses with `load_analyses`, reads all events
+from the ring and dispatches those its analyses use like
+`dynapyt.trace.replay` does. New symbols (file paths, short strings, type
+and function names) go to the analysis processes through their standard
+input before the first record referring to them.
+
+When the ring is full, the instrumented process either waits for the
+slowest analysis process (policy `block`, the default) or drops the event
+(policy `drop`) and reports the number of dropped events at the end. The
+policy can also be chosen with the `DYNAPYT_RING_POLICY` environment
+variable.
+"""
+
+import argparse
+import os
+import pickle
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from itertools import count
+from types import MethodType
+from typing import List, Set, Union
+from ..analyses.BaseAnalysis import BaseAnalysis
+from ..analyses.TraceRecorder import (
+    TraceRecorder,
+    HOOKS,
+    OPT_IN_HOOKS,
+    recording_hook,
+)
+from ..utils.load_analysis import load_analyses, load_analysis_class
+from .format import SymbolTable
+from .replay import Replayer, decode
+from .ring import RingBuffer, check_shared_memory
+
+POLICIES = ("block", "drop")
+BATCH_RECORDS = 4096
+IDLE_SLEEP = 0.0005
+
+_LENGTH = struct.Struct("<I")
+_EXECUTION_HOOKS = ("begin_execution", "end_execution", "uncaught_exception")
+
+
+class _ForwardedSymbols(SymbolTable):
+    def __init__(self) -> None:
+        super().__init__()
+        self.streams = []
+
+    def forward(self, streams):
+        self.streams = streams
+        for s in self.symbols:
+            self.__send(s)
+
+    def __send(self, s: str):
+        data = s.encode("utf-8", "surrogatepass")
+        message = _LENGTH.pack(len(data)) + data
+        for stream in self.streams:
+            try:
+                stream.write(message)
+                stream.flush()
+            except (BrokenPipeError, ValueError):
+                # the analysis process is gone
+                pass
+
+    def intern(self, s: str) -> int:
+        idx = self.index.get(s)
+        if idx is None:
+            idx = super().intern(s)
+            self.__send(s)
+        return idx
+
+
+def _groups(analyses: Union[str, List[Union[str, List[str]]]]) -> List[List[str]]:
+    if isinstance(analyses, str):
+        return [group.split(",") for group in analyses.split(";")]
+    if all(isinstance(a, str) for a in analyses):
+        return [list(analyses)]
+    return [[a] if isinstance(a, str) else list(a) for a in analyses]
+
+
+def _used_hooks(analyses: List[str]) -> Set[str]:
+    used = set()
+    for analysis in analyses:
+        class_ = load_analysis_class(analysis)
+        used.update(h for h in HOOKS if hasattr(class_, h))
+    return used
+
+
+class OutOfProcessAnalysis(TraceRecorder):
+    """
+    Forwards the events used by `analyses` to analysis processes. The
+    analysis configuration is a list of analysis groups separated by `;`,
+    each a comma-separated list of analyses, e.g.
+    `dynapyt.trace.pipeline.OutOfProcessAnalysis:dynapyt.analyses.BranchCoverage.BranchCoverage;dynapyt.analyses.CallGraph.CallGraph`.
+    Every group runs in a process of its own, and all of them read the
+    same events from one ring.
+
+    At `end_execution`, the analyses are pickled back from the analysis
+    processes and their `end_execution` runs here, in the order in which
+    they were given. `results` then holds the analyses. Analyses that
+    cannot be pickled end in their analysis process and are None in
+    `results`.
+    """
+
+    def __init__(
+        self,
+        analyses: Union[str, List[Union[str, List[str]]]],
+        policy: str = None,
+        capacity: int = None,
+    ) -> None:
+        BaseAnalysis.__init__(self)
+        check_shared_memory()
+        self.groups = _groups(analyses)
+        self.policy = policy or os.environ.get("DYNAPYT_RING_POLICY", "block")
+        if self.policy not in POLICIES:
+            raise ValueError(f"Unknown ring policy: {self.policy}")
+        self.dropped = 0
+        self.consumed = None
+        self.results = None
+        used = set().union(*[_used_hooks(group) for group in self.groups])
+        for hook_id, hook in enumerate(HOOKS):
+            if hook not in used and hook not in _EXECUTION_HOOKS:
+                # the runtime skips hooks that are None
+                setattr(self, hook, None)
+            elif hook in OPT_IN_HOOKS:
+                setattr(self, hook, MethodType(recording_hook(hook_id), self))
+
+        self.capacity = capacity
+        self.ring = None
+        self.processes = None
+        self.hook_ids = {name: i for i, name in enumerate(HOOKS)}
+        self.symbols = _ForwardedSymbols()
+        self.sequence = count()
+        # the analysis processes start with the first event, so that merely
+        # creating the analysis, e.g. to look up its hooks, starts nothing
+        self._write = self.__start
+
+    def __start(self, *fields):
+        self.ring = RingBuffer(capacity=self.capacity, consumers=len(self.groups))
+        search_path = [p or os.getcwd() for p in sys.path]
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(search_path))
+        self.processes = []
+        self.results_paths = []
+        try:
+            for i, group in enumerate(self.groups):
+                fd, results_path = tempfile.mkstemp(suffix=".pickle", prefix="dynapyt-")
+                os.close(fd)
+                self.results_paths.append(results_path)
+                self.processes.append(
+                    subprocess.Popen(
+                        [sys.executable, "-m", "dynapyt.trace.pipeline"]
+                        + ["--ring", self.ring.name, "--consumer", str(i)]
+                        + ["--results", results_path, "--analysis"]
+                        + group,
+                        stdin=subprocess.PIPE,
+                        env=env,
+                    )
+                )
+        except BaseException:
+            # the processes that did start end without standard input
+            for process in self.processes:
+                process.stdin.close()
+            self.processes = None
+            self.ring.close()
+            self.__remove_results()
+            raise
+        self.symbols.forward([p.stdin for p in self.processes])
+        self._write = self.__put
+        self.__put(*fields)
+
+    def __put(self, *fields):
+        if not self.ring.put(*fields):
+            self.__full(fields)
+
+    def __full(self, fields: tuple):
+        if self.policy == "drop":
+            self.dropped += 1
+            return
+        while not self.ring.put(*fields):
+            if any(p.poll() is not None for p in self.processes):
+                # nobody will make room in the ring anymore
+                self.policy = "drop"
+                self.dropped += 1
+                return
+            time.sleep(IDLE_SLEEP)
+
+    def end_execution(self) -> None:
+        self._write = lambda *fields: None
+        if self.processes is None:
+            return
+        self.ring.finish(self.dropped)
+        for process in self.processes:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+        for process in self.processes:
+            process.wait()
+        self.processes = None
+        self.ring.close()
+        self.results = []
+        try:
+            for group, results_path in zip(self.groups, self.results_paths):
+                res = {"analyses": None}
+                if os.path.getsize(results_path) > 0:
+                    with open(results_path, "rb") as f:
+                        res = pickle.load(f)
+                    self.consumed = res["consumed"]
+                self.results.extend(res["analyses"] or [None] * len(group))
+        finally:
+            self.__remove_results()
+        for analysis in self.results:
+            func = getattr(analysis, "end_execution", None)
+            if func is not None:
+                func()
+        if self.dropped > 0:
+            print(
+                f"DynaPyt dropped {self.dropped} events, the analysis processes could not keep up",
+                file=sys.stderr,
+            )
+
+    def __remove_results(self):
+        for results_path in self.results_paths:
+            try:
+                os.remove(results_path)
+            except OSError:
+                pass
+        self.results_paths = []
+
+
+def _read_symbols(stream, symbols: List[str]):
+    while True:
+        header = stream.read(_LENGTH.size)
+        if len(header) < _LENGTH.size:
+            return
+        (length,) = _LENGTH.unpack(header)
+        symbols.append(stream.read(length).decode("utf-8", "surrogatepass"))
+
+
+def consume(
+    ring_name: str, consumer: int, analyses: List[str], results_path: str = None
+):
+    ring = RingBuffer(ring_name, consumer=consumer)
+    symbols = []
+    symbol_reader = threading.Thread(
+        target=_read_symbols, args=(sys.stdin.buffer, symbols), daemon=True
+    )
+    symbol_reader.start()
+    used = _used_hooks(analyses)
+    wanted = {i for i, hook in enumerate(HOOKS) if hook in used}
+    analyses = load_analyses(analyses)
+    replayer = Replayer(analyses)
+    replayer.begin_execution()
+    consumed = 0
+    while True:
+        # without standard input, the producer has ended or is gone
+        closed = ring.closed or not symbol_reader.is_alive()
+        records = ring.get(BATCH_RECORDS)
+        if len(records) == 0:
+            if closed:
+                break
+            time.sleep(IDLE_SLEEP)
+            continue
+        consumed += len(records)
+        for record in records:
+            if record[5] not in wanted:
+                # another analysis process uses this event
+                continue
+            while True:
+                reading = symbol_reader.is_alive()
+                try:
+                    _, hook, dyn_ast, iid, values = decode(record, HOOKS, symbols)
+                    break
+                except IndexError:
+                    # the symbol is written before the record, it is on its way
+                    if not reading:
+                        raise
+                    time.sleep(0)
+            replayer.call(hook, dyn_ast, iid, values)
+    ring.close()
+    try:
+        data = pickle.dumps({"analyses": analyses, "consumed": consumed})
+    except Exception:
+        # the analyses cannot be handed back, so they end here
+        replayer.end_execution()
+        data = pickle.dumps({"analyses": None, "consumed": consumed})
+    if results_path is not None:
+        with open(results_path, "wb") as f:
+            f.write(data)
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--ring", help="Name of the shared memory ring")
+parser.add_argument("--consumer", help="Index of this consumer", type=int, default=0)
+parser.add_argument("--analysis", help="Analysis class name(s)", nargs="+")
+parser.add_argument("--results", help="File to pickle the analyses into")
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    consume(args.ring, args.consumer, args.analysis, args.results)
@@ -0,0 +1,113 @@
+import mmap
+from collections import namedtuple
+from typing import Iterator, Tuple
+from .format import (
+    MAGIC,
+    VERSION,
+    HEADER,
+    CHUNK_HEADER,
+    RECORD,
+    MAX_VALUES,
+    decompress,
+    decode_metadata,
+    decode_value,
+)
+
+TraceRecord = namedtuple(
+    "TraceRecord", ["seq", "timestamp", "thread", "file", "iid", "hook", "values"]
+)
+
+
+class TraceReader:
+    """
+    Iterates over the records of a trace written by `TraceRecorder`.
+
+    Iterating the reader yields `TraceRecord`s with the hook name, file path
+    and decoded values. `raw()` yields the undecoded record tuples and
+    `chunks()` the raw record bytes of each chunk.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic,
+            self.version,
+            record_size,
+            self.codec,
+            _,
+            self.chunk_records,
+            meta_offset,
+            meta_length,
+        ) = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            self.map.close()
+            raise ValueError(f"{path} is not a DynaPyt trace")
+        if self.version != VERSION or record_size != RECORD.size:
+            self.map.close()
+            raise ValueError(
+                f"{path} has trace format version {self.version}, this version of DynaPyt reads {VERSION}"
+            )
+        if meta_offset > 0:
+            # a trace without metadata was not closed, its records are still readable
+            self.metadata = decode_metadata(
+                self.map[meta_offset : meta_offset + meta_length]
+            )
+            self.data_end = meta_offset
+        else:
+            self.metadata = {"hooks": [], "symbols": [], "records": None}
+            self.data_end = len(self.map)
+        self.hooks = self.metadata["hooks"]
+        self.symbols = self.metadata["symbols"]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        if self.metadata["records"] is not None:
+            return self.metadata["records"]
+        return sum(len(c) // RECORD.size for c in self.chunks())
+
+    def close(self):
+        self.map.close()
+
+    def chunks(self) -> Iterator[bytes]:
+        offset = HEADER.size
+        while offset + CHUNK_HEADER.size <= self.data_end:
+            count, stored, codec = CHUNK_HEADER.unpack_from(self.map, offset)
+            if count == 0:
+                break
+            start = offset + CHUNK_HEADER.size
+            yield decompress(codec, self.map[start : start + stored])
+            offset = start + stored
+
+    def raw(self) -> Iterator[Tuple]:
+        for chunk in self.chunks():
+            yield from RECORD.iter_unpack(chunk)
+
+    def hook_name(self, hook: int) -> str:
+        return self.hooks[hook] if hook < len(self.hooks) else str(hook)
+
+    def file_name(self, file: int) -> str:
+        return self.symbols[file] if file < len(self.symbols) else ""
+
+    def __iter__(self) -> Iterator[TraceRecord]:
+        symbols = self.symbols
+        for seq, ts, thread, file, iid, hook, count, *summary in self.raw():
+            values = tuple(
+                decode_value(summary[i], summary[MAX_VALUES + i], symbols)
+                for i in range(count)
+            )
+            yield TraceRecord(
+                seq,
+                ts,
+                thread,
+                self.file_name(file),
+                iid,
+                self.hook_name(hook),
+                values,
+            )
@@ -0,0 +1,108 @@
+"""
+Replays recorded traces into analyses, so that one instrumented execution
+can serve many analyses.
+
+    python -m dynapyt.trace.replay --trace <trace file(s)> --analysis <analysis class full dotted path>
+
+Hooks receive the values kept in the trace: None, booleans, numbers and
+short strings are exact, all other values are `RecordedValue` stand-ins.
+Values returned by hooks have no effect. The recorded file paths are
+passed on as `dyn_ast`, so analyses look up iids and syntax trees through
+`IIDs` of the instrumented files just like during a live run.
+
+So analyses that only look at where events happen and at exact values
+can run over a trace, e.g. `BranchCoverage`, `CallGraph`,
+`OperationAnalysis`, `LiteralAnalysis` and `EventAnalysis`. Analyses that
+inspect objects (`isinstance` checks, attributes, contents, identity across
+hooks), e.g. `KeyInListAnalysis`, `SimpleTaintAnalysis` or
+`MLMemoryAnalysis`, or that change the execution through their return
+values, e.g. `ManipulateExec`, need a live run.
+"""
+
+import argparse
+import heapq
+from typing import Any, Iterator, List, Tuple
+from ..analyses.BaseAnalysis import BaseAnalysis
+from ..runtime import filtered
+from ..utils.load_analysis import load_analyses
+from .format import MAX_VALUES, decode_value
+from .reader import TraceReader
+
+ReplayEvent = Tuple[int, str, str, int, tuple]
+
+
+def decode(record: tuple, hooks: List[str], symbols: List[str]) -> ReplayEvent:
+    _, ts, _, file, iid, hook, count, *summary = record
+    values = tuple(
+        decode_value(summary[i], summary[MAX_VALUES + i], symbols) for i in range(count)
+    )
+    return ts, hooks[hook], symbols[file], iid, values
+
+
+def events(trace: TraceReader) -> Iterator[ReplayEvent]:
+    hooks, symbols = trace.hooks, trace.symbols
+    for record in trace.raw():
+        yield decode(record, hooks, symbols)
+
+
+class Replayer:
+    def __init__(self, analyses: List[BaseAnalysis]) -> None:
+        self.analyses = analyses
+        self.dispatch = {}
+
+    def hooks(self, hook: str) -> List[Any]:
+        if hook not in self.dispatch:
+            self.dispatch[hook] = [
+                getattr(a, hook) for a in self.analyses if hasattr(a, hook)
+            ]
+        return self.dispatch[hook]
+
+    def call(self, hook: str, dyn_ast: str, iid: int, values: tuple):
+        if hook in ("begin_execution", "end_execution"):
+            # the replay itself begins and ends the execution
+            return
+        if hook == "uncaught_exception":
+            args = values + (None,) * (2 - len(values))
+        else:
+            args = (dyn_ast, iid) + values
+        for func in self.hooks(hook):
+            if not filtered(func, hook, args):
+                func(*args)
+
+    def begin_execution(self):
+        for func in self.hooks("begin_execution"):
+            func()
+
+    def end_execution(self):
+        for func in self.hooks("end_execution"):
+            func()
+
+    def replay(self, traces: List[TraceReader]):
+        # traces of several processes are interleaved by their timestamps
+        for _, hook, dyn_ast, iid, values in heapq.merge(
+            *[events(t) for t in traces], key=lambda e: e[0]
+        ):
+            self.call(hook, dyn_ast, iid, values)
+
+
+def replay(trace_paths: List[str], analyses: List[Any]) -> List[BaseAnalysis]:
+    analyses = load_analyses(analyses)
+    replayer = Replayer(analyses)
+    traces = [TraceReader(p) for p in trace_paths]
+    try:
+        replayer.begin_execution()
+        replayer.replay(traces)
+        replayer.end_execution()
+    finally:
+        for t in traces:
+            t.close()
+    return analyses
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--trace", help="Recorded trace file(s)", nargs="+")
+parser.add_argument("--analysis", help="Analysis class name(s)", nargs="+")
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    replay(args.trace, args.analysis)
@@ -0,0 +1,150 @@
+"""
+Single-producer ring of trace records in shared memory, read by one or
+more consumers that each see every record.
+
+The instrumented process packs records (see `dynapyt.trace.format.RECORD`)
+into the ring, analysis processes read them from other cores:
+
+    header | tail 0 | ... | tail n - 1 | slot 0 | ... | slot capacity - 1
+
+The header keeps the number of records ever written (head), the number of
+records the producer had to drop and whether the producer has finished.
+Every consumer counts the records it has read (its tail) on a cache line
+of its own. A slot is free again once all consumers have read it.
+"""
+
+import struct
+from typing import List, Tuple
+from .format import RECORD
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # new in Python 3.8
+    shared_memory = None
+
+DEFAULT_CAPACITY = 1 << 16
+MAX_CONSUMERS = 64
+
+_U64 = struct.Struct("<Q")
+_LINE = 64
+_HEAD = 0
+_DROPPED = 8
+_CLOSED = 16
+_CAPACITY = 24
+_CONSUMERS = 32
+_TAILS = _LINE
+
+
+def check_shared_memory() -> None:
+    if shared_memory is None:
+        raise ImportError(
+            "rings of trace records require multiprocessing.shared_memory (Python 3.8 or newer)"
+        )
+
+
+class RingBuffer:
+    """
+    Creates a new ring for `consumers` readers if `name` is None, otherwise
+    attaches to the ring created under that name by another process as
+    reader number `consumer`.
+    """
+
+    def __init__(
+        self,
+        name: str = None,
+        capacity: int = None,
+        consumers: int = 1,
+        consumer: int = 0,
+    ) -> None:
+        check_shared_memory()
+        if name is None:
+            if not 0 < consumers <= MAX_CONSUMERS:
+                raise ValueError(f"A ring supports 1 to {MAX_CONSUMERS} consumers")
+            self.capacity = capacity or DEFAULT_CAPACITY
+            self.consumers = consumers
+            data = _TAILS + consumers * _LINE
+            self.shm = shared_memory.SharedMemory(
+                create=True, size=data + self.capacity * RECORD.size
+            )
+            self.shm.buf[:data] = bytes(data)
+            _U64.pack_into(self.shm.buf, _CAPACITY, self.capacity)
+            _U64.pack_into(self.shm.buf, _CONSUMERS, self.consumers)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.capacity = _U64.unpack_from(self.shm.buf, _CAPACITY)[0]
+            self.consumers = _U64.unpack_from(self.shm.buf, _CONSUMERS)[0]
+            self.owner = False
+            _untrack(self.shm)
+        self.name = self.shm.name
+        self.buf = self.shm.buf
+        self.data = _TAILS + self.consumers * _LINE
+        self.consumer_tail = _TAILS + consumer * _LINE
+        self.head = _U64.unpack_from(self.buf, _HEAD)[0]
+        self.tail = _U64.unpack_from(self.buf, self.consumer_tail)[0]
+
+    def __slowest_tail(self) -> int:
+        return min(
+            _U64.unpack_from(self.buf, _TAILS + i * _LINE)[0]
+            for i in range(self.consumers)
+        )
+
+    def put(self, *fields) -> bool:
+        """Appends a record, returns False without writing if the ring is full."""
+        head = self.head
+        if head - self.tail >= self.capacity:
+            # for the producer, tail is the position of the slowest consumer
+            self.tail = self.__slowest_tail()
+            if head - self.tail >= self.capacity:
+                return False
+        RECORD.pack_into(
+            self.buf, self.data + (head % self.capacity) * RECORD.size, *fields
+        )
+        self.head = head + 1
+        # publish the record only after it is completely written
+        _U64.pack_into(self.buf, _HEAD, self.head)
+        return True
+
+    def get(self, limit: int = None) -> List[Tuple]:
+        """Removes and returns up to `limit` contiguous records for this consumer."""
+        self.head = _U64.unpack_from(self.buf, _HEAD)[0]
+        available = self.head - self.tail
+        if available == 0:
+            return []
+        start = self.tail % self.capacity
+        n = min(available, self.capacity - start, limit or self.capacity)
+        offset = self.data + start * RECORD.size
+        data = bytes(self.buf[offset : offset + n * RECORD.size])
+        self.tail += n
+        _U64.pack_into(self.buf, self.consumer_tail, self.tail)
+        return list(RECORD.iter_unpack(data))
+
+    @property
+    def dropped(self) -> int:
+        return _U64.unpack_from(self.buf, _DROPPED)[0]
+
+    @property
+    def closed(self) -> bool:
+        return _U64.unpack_from(self.buf, _CLOSED)[0] != 0
+
+    def finish(self, dropped: int):
+        _U64.pack_into(self.buf, _DROPPED, dropped)
+        _U64.pack_into(self.buf, _CLOSED, 1)
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _untrack(shm: shared_memory.SharedMemory):
+    # only the creator may unlink the ring, the resource tracker of an
+    # attaching process would do so when it exits
+    try:
+        from multiprocessing import resource_tracker
+
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
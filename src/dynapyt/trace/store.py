@@ -0,0 +1,343 @@
+"""
+Columnar store for recorded traces.
+
+Converts one or more traces into memory-mapped NumPy columns and answers
+aggregate questions over them without writing a new analysis:
+
+    python -m dynapyt.trace.store --store <store directory> --trace <trace file(s)>
+    python -m dynapyt.trace.store --store <store directory> top-iids
+    python -m dynapyt.trace.store --store <store directory> calls
+    python -m dynapyt.trace.store --store <store directory> branches
+    python -m dynapyt.trace.store --store <store directory> count-by hook thread
+    python -m dynapyt.trace.store --store <store directory> histogram timestamp
+"""
+
+import argparse
+import json
+from os import path, makedirs
+from typing import Dict, List, Tuple
+from ..instrument.IIDs import IIDs
+from .format import (
+    RECORD,
+    RECORD_FIELDS,
+    TAG_BOOL,
+    TAG_STR,
+    TAG_CALLABLE,
+    TAG_TYPE_BASE,
+)
+from .reader import TraceReader
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+COLUMNS = (
+    "timestamp",
+    "thread",
+    "file",
+    "iid",
+    "hook",
+    "tag0",
+    "value0",
+    "tag1",
+    "value1",
+)
+_FORMATS = (
+    "<u8",
+    "<u8",
+    "<u4",
+    "<u4",
+    "<i4",
+    "<u2",
+    "<u2",
+    "<u2",
+    "<u2",
+    "<u2",
+    "<u2",
+    "<i8",
+    "<i8",
+    "<i8",
+    "<i8",
+)
+# largest composite key for which group-by counts with bincount instead of sorting
+MAX_BINCOUNT_KEYS = 1 << 26
+
+
+def _record_dtype():
+    return np.dtype(
+        {
+            "names": list(RECORD_FIELDS),
+            "formats": list(_FORMATS),
+            "offsets": [0, 8, 16, 20, 24, 28, 30, 32, 34, 36, 38, 40, 48, 56, 64],
+            "itemsize": RECORD.size,
+        }
+    )
+
+
+class _SymbolMerger:
+    def __init__(self) -> None:
+        self.symbols = []
+        self.index = {}
+
+    def mapping(self, symbols: List[str]):
+        res = np.empty(len(symbols) + 1, dtype=np.int64)
+        for i, s in enumerate(symbols):
+            if s not in self.index:
+                self.index[s] = len(self.symbols)
+                self.symbols.append(s)
+            res[i] = self.index[s]
+        res[-1] = -1
+        return res
+
+
+class TraceStore:
+    def __init__(self, directory: str) -> None:
+        if np is None:
+            raise ImportError("the trace store requires numpy")
+        self.directory = directory
+        with open(path.join(directory, "store.json")) as f:
+            self.metadata = json.load(f)
+        self.hooks = self.metadata["hooks"]
+        self.symbols = self.metadata["symbols"]
+        self.columns = {}
+        self.iids = {}
+
+    def __len__(self) -> int:
+        return self.metadata["records"]
+
+    def __getitem__(self, column: str):
+        if column not in self.columns:
+            self.columns[column] = np.load(
+                path.join(self.directory, column + ".npy"), mmap_mode="r"
+            )
+        return self.columns[column]
+
+    @staticmethod
+    def build(trace_paths: List[str], directory: str) -> "TraceStore":
+        if np is None:
+            raise ImportError("the trace store requires numpy")
+        makedirs(directory, exist_ok=True)
+        dtype = _record_dtype()
+        traces = [TraceReader(p) for p in trace_paths]
+        total = sum(len(t) for t in traces)
+        columns = {
+            c: np.lib.format.open_memmap(
+                path.join(directory, c + ".npy"),
+                mode="w+",
+                dtype=dtype.fields[c][0].newbyteorder("="),
+                shape=(total,),
+            )
+            for c in COLUMNS
+        }
+        hooks, symbols = _SymbolMerger(), _SymbolMerger()
+        start = 0
+        for trace in traces:
+            hook_map = hooks.mapping(trace.hooks)
+            symbol_map = symbols.mapping(trace.symbols)
+            for chunk in trace.chunks():
+                records = np.frombuffer(chunk, dtype=dtype)
+                end = start + len(records)
+                columns["timestamp"][start:end] = records["timestamp"]
+                columns["thread"][start:end] = records["thread"]
+                columns["file"][start:end] = symbol_map[records["file"]]
+                columns["iid"][start:end] = records["iid"]
+                columns["hook"][start:end] = hook_map[records["hook"]]
+                for i in (0, 1):
+                    tags = records[f"tag{i}"].astype(np.int64)
+                    values = records[f"value{i}"].copy()
+                    # symbols are renumbered when several traces are merged
+                    refers_symbol = (tags == TAG_STR) | (tags == TAG_CALLABLE)
+                    values[refers_symbol] = symbol_map[values[refers_symbol]]
+                    is_type = tags >= TAG_TYPE_BASE
+                    tags[is_type] = (
+                        symbol_map[tags[is_type] - TAG_TYPE_BASE] + TAG_TYPE_BASE
+                    )
+                    columns[f"tag{i}"][start:end] = tags
+                    columns[f"value{i}"][start:end] = values
+                start = end
+            trace.close()
+        for column in columns.values():
+            column.flush()
+        with open(path.join(directory, "store.json"), "w") as f:
+            json.dump(
+                {
+                    "hooks": hooks.symbols,
+                    "symbols": symbols.symbols,
+                    "records": start,
+                    "traces": [path.abspath(p) for p in trace_paths],
+                },
+                f,
+            )
+        return TraceStore(directory)
+
+    def hook_id(self, hook: str) -> int:
+        return self.hooks.index(hook) if hook in self.hooks else -1
+
+    def where(self, hook: str = None, thread: int = None, file: str = None):
+        mask = None
+        conditions = []
+        if hook is not None:
+            conditions.append(self["hook"] == self.hook_id(hook))
+        if thread is not None:
+            conditions.append(self["thread"] == thread)
+        if file is not None:
+            file_id = self.symbols.index(file) if file in self.symbols else -1
+            conditions.append(self["file"] == file_id)
+        for c in conditions:
+            mask = c if mask is None else mask & c
+        return mask
+
+    def _column(self, column: str, mask):
+        values = self[column]
+        return values if mask is None else values[mask]
+
+    def count_by(self, *columns: str, mask=None) -> Dict[Tuple, int]:
+        """Number of records per distinct combination of the given columns."""
+        cols = [np.asarray(self._column(c, mask), dtype=np.int64) for c in columns]
+        if len(cols) == 0 or len(cols[0]) == 0:
+            return {}
+        lows = [c.min() for c in cols]
+        spans = [int(c.max() - low) + 1 for c, low in zip(cols, lows)]
+        key_space = 1
+        for s in spans:
+            key_space *= s
+        if key_space <= MAX_BINCOUNT_KEYS:
+            keys = np.zeros(len(cols[0]), dtype=np.int64)
+            for c, low, span in zip(cols, lows, spans):
+                keys = keys * span + (c - low)
+            counts = np.bincount(keys, minlength=key_space)
+            present = np.nonzero(counts)[0]
+            groups = []
+            rest = present
+            for low, span in reversed(list(zip(lows, spans))):
+                groups.append(rest % span + low)
+                rest = rest // span
+            groups.reverse()
+            counts = counts[present]
+        else:
+            unique, counts = np.unique(np.stack(cols), axis=1, return_counts=True)
+            groups = list(unique)
+        return {
+            tuple(int(g[i]) for g in groups): int(counts[i]) for i in range(len(counts))
+        }
+
+    def histogram(self, column: str, bins: int = 10, mask=None):
+        return np.histogram(self._column(column, mask), bins=bins)
+
+    def location(self, file: int, iid: int):
+        file_path = self.symbols[file]
+        if file_path not in self.iids:
+            iids_file = (
+                file_path[:-8] if file_path.endswith(".py.orig") else file_path[:-3]
+            ) + "-dynapyt.json"
+            self.iids[file_path] = IIDs(file_path) if path.exists(iids_file) else None
+        if self.iids[file_path] is None:
+            return None
+        return self.iids[file_path].iid_to_location.get(iid)
+
+    def top_iids(self, limit: int = 10, hook: str = "runtime_event") -> List[Tuple]:
+        """The most frequently executed (file, iid) pairs."""
+        counts = self.count_by("file", "iid", mask=self.where(hook=hook))
+        top = sorted(counts.items(), key=lambda kv: -kv[1])[:limit]
+        return [(self.symbols[f], iid, n) for (f, iid), n in top]
+
+    def call_counts(self) -> List[Tuple]:
+        """Number of calls per (file, function iid, function name)."""
+        mask = self.where(hook="function_enter")
+        counts = self.count_by("file", "iid", "tag1", "value1", mask=mask)
+        res = [
+            (self.symbols[f], iid, self.__name(tag, name), n)
+            for (f, iid, tag, name), n in counts.items()
+        ]
+        return sorted(res, key=lambda r: -r[3])
+
+    def __name(self, tag: int, value: int) -> str:
+        if tag == TAG_STR:
+            return self.symbols[value]
+        # a long string that did not fit into the symbol table, only its
+        # length is known
+        return f"<name of {value} characters>"
+
+    def branch_ratios(self) -> List[Tuple]:
+        """Taken branches, total branch evaluations and their ratio per (file, iid)."""
+        mask = self.where(hook="enter_control_flow")
+        if mask is not None:
+            mask &= self["tag0"] == TAG_BOOL
+        counts = self.count_by("file", "iid", "value0", mask=mask)
+        branches = {}
+        for (f, iid, taken), n in counts.items():
+            entry = branches.setdefault((f, iid), [0, 0])
+            entry[1] += n
+            if taken:
+                entry[0] += n
+        return [
+            (self.symbols[f], iid, taken, total, taken / total)
+            for (f, iid), (taken, total) in sorted(branches.items())
+        ]
+
+
+def _open_store(args) -> TraceStore:
+    if args.trace:
+        # converting the traces happens once, later queries reuse the store
+        directory = args.store or path.splitext(args.trace[0])[0] + ".columns"
+        store = TraceStore.build(args.trace, directory)
+        print(f"Stored {len(store)} records in {directory}")
+        return store
+    return TraceStore(args.store)
+
+
+def _line(store: TraceStore, file_path: str, iid: int) -> str:
+    location = store.location(store.symbols.index(file_path), iid)
+    return "?" if location is None else str(location.start_line)
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--trace", help="Trace file(s) to load into the store", nargs="+")
+parser.add_argument("--store", help="Directory of the columnar store")
+queries = parser.add_subparsers(dest="query")
+top_parser = queries.add_parser("top-iids", help="Most executed iids")
+top_parser.add_argument("--limit", type=int, default=10)
+top_parser.add_argument("--hook", default="runtime_event")
+queries.add_parser("calls", help="Call counts per function")
+queries.add_parser("branches", help="Branch taken ratios per iid")
+count_parser = queries.add_parser("count-by", help="Record counts per column values")
+count_parser.add_argument("columns", nargs="+", choices=COLUMNS)
+count_parser.add_argument("--hook")
+histogram_parser = queries.add_parser("histogram", help="Histogram of a column")
+histogram_parser.add_argument("column", choices=COLUMNS)
+histogram_parser.add_argument("--bins", type=int, default=10)
+histogram_parser.add_argument("--hook")
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    store = _open_store(args)
+    if args.query == "top-iids":
+        for file_path, iid, n in store.top_iids(args.limit, args.hook):
+            print(f"{n:>12} {file_path}:{_line(store, file_path, iid)} iid {iid}")
+    elif args.query == "calls":
+        for file_path, iid, name, n in store.call_counts():
+            print(f"{n:>12} {name} ({file_path}:{_line(store, file_path, iid)})")
+    elif args.query == "branches":
+        for file_path, iid, taken, total, ratio in store.branch_ratios():
+            print(
+                f"{ratio:>8.2%} {taken:>10}/{total:<10} {file_path}:{_line(store, file_path, iid)} iid {iid}"
+            )
+    elif args.query == "count-by":
+        counts = store.count_by(*args.columns, mask=store.where(hook=args.hook))
+        for key, n in sorted(counts.items(), key=lambda kv: -kv[1]):
+            names = [
+                (
+                    store.hooks[k]
+                    if c == "hook"
+                    else store.symbols[k] if c == "file" else k
+                )
+                for c, k in zip(args.columns, key)
+            ]
+            print(f"{n:>12} " + " ".join(str(k) for k in names))
+    elif args.query == "histogram":
+        counts, edges = store.histogram(
+            args.column, args.bins, mask=store.where(hook=args.hook)
+        )
+        for n, low, high in zip(counts, edges[:-1], edges[1:]):
+            print(f"{n:>12} [{low:.6g}, {high:.6g})")
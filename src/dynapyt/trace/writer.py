@@ -0,0 +1,115 @@
+import mmap
+from .format import (
+    MAGIC,
+    VERSION,
+    HEADER,
+    CHUNK_HEADER,
+    RECORD,
+    CODEC_NONE,
+    codec_id,
+    compress,
+    encode_metadata,
+)
+
+DEFAULT_CHUNK_RECORDS = 1 << 14
+
+
+class TraceWriter:
+    """
+    Appends fixed-width records to a memory-mapped trace file.
+
+    Only a window around the chunk being written is mapped. Records are
+    packed straight into the mapping when compression is off. Otherwise a
+    chunk is packed into memory and compressed into the file once full.
+    """
+
+    def __init__(
+        self, path: str, compression: str = None, chunk_records: int = None
+    ) -> None:
+        self.path = path
+        self.codec = codec_id(compression)
+        self.chunk_records = chunk_records or DEFAULT_CHUNK_RECORDS
+        self.file = open(path, "w+b")
+        self.file.write(self.__header(0, 0))
+        self.file.flush()
+        self.map = None
+        self.end = HEADER.size
+        self.total = 0
+        self.closed = False
+        self.__start_chunk()
+
+    def __header(self, meta_offset: int, meta_length: int) -> bytes:
+        return HEADER.pack(
+            MAGIC,
+            VERSION,
+            RECORD.size,
+            self.codec,
+            0,
+            self.chunk_records,
+            meta_offset,
+            meta_length,
+        )
+
+    def __map_window(self, size: int):
+        # maps [base, size) of the file, base being the aligned start of the window
+        if self.map is not None:
+            self.map.close()
+        self.file.truncate(size)
+        self.base = self.end - self.end % mmap.ALLOCATIONGRANULARITY
+        self.map = mmap.mmap(self.file.fileno(), size - self.base, offset=self.base)
+
+    def __start_chunk(self):
+        self.count = 0
+        if self.codec == CODEC_NONE:
+            self.__map_window(
+                self.end + CHUNK_HEADER.size + self.chunk_records * RECORD.size
+            )
+            self.buffer = self.map
+            self.offset = self.end - self.base + CHUNK_HEADER.size
+        else:
+            self.buffer = bytearray(self.chunk_records * RECORD.size)
+            self.offset = 0
+
+    def __finish_chunk(self):
+        if self.count == 0:
+            return
+        size = self.count * RECORD.size
+        if self.codec == CODEC_NONE:
+            CHUNK_HEADER.pack_into(
+                self.map, self.end - self.base, self.count, size, CODEC_NONE
+            )
+            self.end += CHUNK_HEADER.size + size
+        else:
+            blob = compress(self.codec, memoryview(self.buffer)[:size])
+            self.__map_window(self.end + CHUNK_HEADER.size + len(blob))
+            start = self.end - self.base
+            CHUNK_HEADER.pack_into(self.map, start, self.count, len(blob), self.codec)
+            start += CHUNK_HEADER.size
+            self.map[start : start + len(blob)] = blob
+            self.end += CHUNK_HEADER.size + len(blob)
+        self.total += self.count
+        self.count = 0
+
+    def write(self, *fields):
+        RECORD.pack_into(self.buffer, self.offset, *fields)
+        self.offset += RECORD.size
+        self.count += 1
+        if self.count == self.chunk_records:
+            self.__finish_chunk()
+            self.__start_chunk()
+
+    def close(self, metadata: dict):
+        if self.closed:
+            return
+        self.closed = True
+        self.__finish_chunk()
+        self.buffer = None
+        self.map.flush()
+        self.map.close()
+        blob = encode_metadata(dict(metadata, records=self.total))
+        self.file.truncate(self.end)
+        self.file.seek(self.end)
+        self.file.write(blob)
+        self.file.seek(0)
+        self.file.write(self.__header(self.end, len(blob)))
+        self.file.close()
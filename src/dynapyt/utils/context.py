@@ -0,0 +1,189 @@
+"""
+Per-thread event context.
+
+The runtime dispatches the events of all threads of the analyzed program.
+State that changes with every event, like the coverage counts, lives in the
+context of the thread that produced the event, so that threads never write
+to shared structures, and the runtime merges the contexts of all threads at
+the end of the execution. The only lock is taken once per thread, when its
+context is created, so the runtime stays correct without relying on the GIL,
+e.g. on free-threaded builds of CPython.
+
+Analyses can ask for the context of the current event, e.g. to tell the
+threads apart or to keep per-thread state in `data`:
+
+    from dynapyt.utils.context import event_context
+
+    def function_enter(self, dyn_ast, iid, args, name, is_lambda):
+        stack = event_context().data.setdefault("stack", [])
+
+Coroutines of one thread interleave at every `await`, so analyses of
+asyncio programs keep their state per task instead, through
+`task_context()`.
+
+The runtime also keeps a shadow call stack of the instrumented functions
+of each thread, or of each task in asyncio programs, which analyses query
+in constant time with `current_function()`, `caller()` and `call_depth()`.
+Only analyses that set `uses_call_stack` get it, the functions are then
+instrumented so that every exit, also by an exception, takes them off the
+stack:
+
+    class Callers(BaseAnalysis):
+        uses_call_stack = True
+
+        def pre_call(self, dyn_ast, iid, function, pos_args, kw_args):
+            print(current_function())
+"""
+
+import sys
+import threading
+import weakref
+from typing import List, NamedTuple, Optional
+
+
+class StackEntry(NamedTuple):
+    iid: int
+    name: str
+    # id() of the frame of the call, tells recursive calls apart
+    frame_id: int
+    file: str
+
+
+class EventContext:
+    __slots__ = (
+        "thread_id",
+        "thread_name",
+        "events",
+        "covered",
+        "current_file",
+        "data",
+        "tasks",
+        "task_count",
+        "stack",
+        "operands",
+        "private_names",
+        "profile",
+    )
+
+    def __init__(self) -> None:
+        self.thread_id = threading.get_ident()
+        self.thread_name = threading.current_thread().name
+        # number of events of this thread so far
+        self.events = 0
+        self.covered = {}
+        # IIDs of the file of the last covered event
+        self.current_file = None
+        # free for analyses
+        self.data = {}
+        # contexts of the asyncio tasks of this thread, made on first use
+        self.tasks = None
+        self.task_count = 0
+        self.stack = []
+        # left operands of and/or with await, see runtime._bool_left_
+        self.operands = []
+        # class -> private attribute name -> the mangled names to look it up
+        # under, dropped with the class, see runtime._private_attr
+        self.private_names = None
+        # analysis -> file -> iid -> [events, relevant events] in profiling runs
+        self.profile = {}
+
+    @property
+    def task(self) -> Optional["TaskContext"]:
+        """Context of the asyncio task that runs the current event, if any."""
+        task = _current_task()
+        if task is None:
+            return None
+        if self.tasks is None:
+            self.tasks = weakref.WeakKeyDictionary()
+        context = self.tasks.get(task)
+        if context is None:
+            self.task_count += 1
+            context = self.tasks[task] = TaskContext(task, self.task_count)
+        return context
+
+
+class TaskContext:
+    __slots__ = ("task_id", "task_name", "data", "stack", "operands")
+
+    def __init__(self, task, task_id: int) -> None:
+        # unique among the tasks of one thread
+        self.task_id = task_id
+        self.task_name = task.get_name() if hasattr(task, "get_name") else None
+        # free for analyses, dropped with the task
+        self.data = {}
+        self.stack = []
+        self.operands = []
+
+
+def _current_task():
+    asyncio = sys.modules.get("asyncio")
+    if asyncio is None:
+        return None
+    # cheap check, current_task raises if no event loop runs in this thread
+    loop = asyncio._get_running_loop()
+    if loop is None:
+        return None
+    return asyncio.current_task(loop)
+
+
+_local = threading.local()
+_contexts: List[EventContext] = []
+_contexts_lock = threading.Lock()
+
+
+def event_context() -> EventContext:
+    """Context of the current thread."""
+    try:
+        return _local.context
+    except AttributeError:
+        context = EventContext()
+        with _contexts_lock:
+            _contexts.append(context)
+        _local.context = context
+        return context
+
+
+def task_context() -> Optional[TaskContext]:
+    """Context of the current asyncio task, None outside of tasks."""
+    return event_context().task
+
+
+def call_stack() -> List[StackEntry]:
+    """
+    Shadow call stack of the current task, or of the thread outside of
+    tasks, empty unless an analysis sets `uses_call_stack`.
+    """
+    context = event_context()
+    task = context.task
+    return context.stack if task is None else task.stack
+
+
+def current_function() -> Optional[StackEntry]:
+    """Innermost instrumented function that is running, if any."""
+    stack = call_stack()
+    return stack[-1] if stack else None
+
+
+def caller() -> Optional[StackEntry]:
+    """Instrumented function that called the current one, if any."""
+    stack = call_stack()
+    return stack[-2] if len(stack) > 1 else None
+
+
+def call_depth() -> int:
+    return len(call_stack())
+
+
+def event_contexts() -> List[EventContext]:
+    """Contexts of all threads that produced events, including finished ones."""
+    with _contexts_lock:
+        return list(_contexts)
+
+
+def reset_contexts():
+    """Drops the contexts of all threads, e.g. in a forked child."""
+    global _local, _contexts, _contexts_lock
+    _local = threading.local()
+    _contexts = []
+    # might have been held by another thread of the parent when forking
+    _contexts_lock = threading.Lock()
@@ -1,17 +1,12 @@
-from typing import Dict, List
-
-try:
-    import importlib.resources as pkg_resources
-except ImportError:
-    # Try backported to PY<37 `importlib_resources`.
-    import importlib_resources as pkg_resources
-import json
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Tuple
+from types import MappingProxyType
+from os import path
+import os
 import builtins
 import keyword
-import importlib
 
 from ..instrument.filters import START, END, SEPERATOR, get_details
-from .load_analysis import load_analyses
+from .load_analysis import load_analyses, load_analysis_class
 
 
 def snake(x):
@@ -30,6 +25,19 @@ def get_name(s):
     return s
 
 
+def load_hierarchy():
+    # imported here to keep importing the runtime fast
+    try:
+        import importlib.resources as pkg_resources
+    except ImportError:
+        # Try backported to PY<37 `importlib_resources`.
+        import importlib_resources as pkg_resources
+    import json
+
+    with pkg_resources.open_text("dynapyt.utils", "hierarchy.json") as f:
+        return json.load(f)
+
+
 def all_leaves(root):
     res = []
     l = [(k, v) for k, v in root.items()]
@@ -43,45 +51,216 @@ def all_leaves(root):
     return res
 
 
-def get_used_leaves(
-    root, methods: Dict[str, Dict[str, List[str]]]
-) -> Dict[str, Dict[str, List[str]]]:
-    if len(root.items()) == 0:
+class Hierarchy:
+    """
+    The hook hierarchy, parsed once: every hook in depth-first order, the
+    leaves below every hook (a leaf has itself), the ancestors of every
+    hook, from the root down, and the opt-in hooks outside of
+    `runtime_event`, which only analyses that name them get, e.g.
+    `loop_summary`.
+    """
+
+    __slots__ = ("hooks", "leaves", "ancestors", "opt_in")
+
+    def __init__(self, root) -> None:
+        hooks = []
+        leaves = {}
+        ancestors = {}
+
+        def visit(node, above):
+            for hook, children in node.items():
+                hooks.append(hook)
+                ancestors[hook] = above
+                visit(children, above + (hook,))
+                leaves[hook] = (
+                    frozenset(all_leaves(children))
+                    if len(children) > 0
+                    else frozenset((hook,))
+                )
+
+        visit(root, ())
+        self.hooks: Tuple[str, ...] = tuple(hooks)
+        self.leaves: Mapping[str, FrozenSet[str]] = MappingProxyType(leaves)
+        self.ancestors: Mapping[str, Tuple[str, ...]] = MappingProxyType(ancestors)
+        self.opt_in: FrozenSet[str] = frozenset(
+            hook for hook in hooks if (ancestors[hook] + (hook,))[0] != "runtime_event"
+        )
+
+    def is_leaf(self, hook: str) -> bool:
+        return self.leaves[hook] == frozenset((hook,))
+
+
+_hierarchy = None
+
+
+def hierarchy() -> Hierarchy:
+    """The hook hierarchy of hierarchy.json, loaded on first use."""
+    global _hierarchy
+    if _hierarchy is None:
+        _hierarchy = Hierarchy(load_hierarchy())
+    return _hierarchy
+
+
+def get_hooks_from_analysis(classes: List[str]) -> Dict[str, Dict[str, Any]]:
+    tree = hierarchy()
+    methods = {}
+    # leaf -> details of all implementations that the leaf reaches
+    reached = {}
+    call_stack = False
+    for instance in load_analyses(classes):
+        call_stack = call_stack or getattr(instance, "uses_call_stack", False)
+        for hook in tree.hooks:
+            func = getattr(instance, hook, None)
+            if not callable(func):
+                continue
+            details = get_details(func)
+            if hook not in methods:
+                methods[hook] = details
+            for leaf in tree.leaves[hook]:
+                reached.setdefault(leaf, []).append(details)
+    used_leaves = {}
+    for leaf in tree.hooks:
+        if not tree.is_leaf(leaf):
+            continue
+        # the details of the highest implemented hook above the leaf count
+        for hook in tree.ancestors[leaf] + (leaf,):
+            if hook in methods:
+                details = {
+                    k: v for k, v in methods[hook].items() if k not in ("once", "types")
+                }
+                # reported once only if all implementations are marked
+                if all(d.get("once", False) for d in reached[leaf]):
+                    details["once"] = True
+                types = _operand_types(reached[leaf])
+                if len(types) > 0:
+                    details["types"] = types
+                used_leaves[leaf] = details
+                break
+    if call_stack:
+        # not a hook, function entries and exits are instrumented for it
+        used_leaves["call_stack"] = {}
+    return used_leaves
+
+
+def _operand_types(implementations: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    # an operand is restricted only if all implementations restrict it
+    if any("types" not in details for details in implementations):
         return {}
-    res = {}
-    for hook, children in root.items():
-        if hook in methods:
-            if len(children.items()) > 0:
-                for leaf in all_leaves(children):
-                    res.update({leaf: methods[hook]})
+    operands = set.intersection(*(set(d["types"]) for d in implementations))
+    return {
+        operand: sorted(set().union(*(d["types"][operand] for d in implementations)))
+        for operand in sorted(operands)
+    }
+
+
+def _hooks_key(classes: List[str]) -> Optional[str]:
+    # the analyses and the sources of all classes they inherit hooks from,
+    # the analyses are imported but not made
+    import hashlib
+    import sys
+
+    key = [list(classes), list(hierarchy().hooks)]
+    for analysis in classes:
+        try:
+            class_ = load_analysis_class(analysis)
+        except (ImportError, AttributeError, ValueError):
+            return None
+        for base in class_.__mro__[:-1]:
+            source = getattr(sys.modules.get(base.__module__), "__file__", None)
+            if source is None or not path.exists(source):
+                return None
+            key.append([base.__qualname__, source, path.getmtime(source)])
+    return hashlib.sha256(repr(key).encode()).hexdigest()
+
+
+def cached_hooks_from_analysis(
+    classes: List[str], cache_file: str
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Like `get_hooks_from_analysis`, but reuses the hooks stored in
+    `cache_file` as long as the analyses, the modules of the classes they
+    inherit from and the hierarchy did not change, so that instrumentation
+    workers and repeated runs do not make the analyses again.
+    """
+    import json
+
+    key = _hooks_key(classes)
+    if key is not None and path.exists(cache_file):
+        try:
+            with open(cache_file, "r") as f:
+                cached = json.load(f)
+            if cached.get("key") == key:
+                return cached["selected_hooks"]
+        except (OSError, ValueError):
+            pass
+    selected_hooks = get_hooks_from_analysis(classes)
+    if key is not None:
+        os.makedirs(path.dirname(cache_file), exist_ok=True)
+        # workers may read the file concurrently
+        tmp = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"key": key, "selected_hooks": selected_hooks}, f)
+        os.replace(tmp, cache_file)
+    return selected_hooks
+
+
+class _AllArguments:
+    def __contains__(self, position: int) -> bool:
+        return True
+
+    def __or__(self, other):
+        return self
+
+    __ror__ = __or__
+
+
+ALL_ARGUMENTS = _AllArguments()
+
+
+def read_arguments(hook) -> Optional[FrozenSet[int]]:
+    """
+    Positions of the arguments that `hook` reads, not counting `self`, or
+    None if that cannot be told from its code.
+    """
+    import dis
+    import inspect
+
+    func = getattr(hook, "__func__", hook)
+    code = getattr(func, "__code__", None)
+    if code is None or code.co_flags & (inspect.CO_VARARGS | inspect.CO_VARKEYWORDS):
+        return None
+    if "locals" in code.co_names or "vars" in code.co_names:
+        return None
+    parameters = code.co_varnames[: code.co_argcount + code.co_kwonlyargcount]
+    read = set(code.co_cellvars)
+    for instruction in dis.get_instructions(code):
+        if instruction.opname.startswith("LOAD_"):
+            if isinstance(instruction.argval, tuple):
+                read.update(instruction.argval)
             else:
-                res.update({hook: methods[hook]})
-        else:
-            res.update(get_used_leaves(children, methods))
-    return res
+                read.add(instruction.argval)
+    skip = 1 if hasattr(hook, "__self__") else 0
+    return frozenset(
+        i - skip for i, p in enumerate(parameters) if i >= skip and p in read
+    )
 
 
-def get_hooks_from_analysis(classes: List[str]) -> Dict[str, Dict[str, List[str]]]:
-    try:
-        methods = {}
-        analyses = load_analyses(classes)
-        for instance in analyses:
-            methods.update(
-                {
-                    func: get_details(getattr(instance, func))
-                    for func in dir(instance)
-                    if callable(getattr(instance, func))
-                    and not func.startswith("__")
-                    and (
-                        (func not in methods)
-                        or (methods[func] == get_details(getattr(instance, func)))
-                    )
-                }
-            )
-    except TypeError as e:
-        raise e
-    except ImportError as e:
-        raise e
-    with pkg_resources.open_text("dynapyt.utils", "hierarchy.json") as f:
-        hierarchy = json.load(f)
-    return get_used_leaves(hierarchy, methods)
+def hook_arguments(analyses: List[Any]) -> Dict[str, Any]:
+    """
+    Maps every hook that one of `analyses` implements to the positions of the
+    arguments that at least one implementation reads, so that the runtime
+    builds only those.
+    """
+    res = {}
+    for hook in hierarchy().hooks + ("begin_execution", "end_execution"):
+        for analysis in analyses:
+            func = getattr(analysis, hook, None)
+            if func is None:
+                continue
+            read = read_arguments(func)
+            details = get_details(func)
+            if read is None or "only" in details or "ignore" in details:
+                # unknown, or needed by the filters of the hook
+                read = ALL_ARGUMENTS
+            res[hook] = res.get(hook, frozenset()) | read
+    return res
@@ -3,16 +3,20 @@ from typing import List, Any
 from ..analyses.BaseAnalysis import BaseAnalysis
 
 
+def load_analysis_class(analysis: str) -> type:
+    module_parts = analysis.split(":")[0].split(".")
+    module = importlib.import_module(".".join(module_parts[:-1]))
+    return getattr(module, module_parts[-1])
+
+
 def load_analyses(analyses: List[Any]) -> List[BaseAnalysis]:
     res_analyses = []
     for ana in analyses:
         if isinstance(ana, str):
             conf = None
             if ":" in ana:
-                ana, conf = ana.split(":")
-            module_parts = ana.split(".")
-            module = importlib.import_module(".".join(module_parts[:-1]))
-            class_ = getattr(module, module_parts[-1])
+                ana, conf = ana.split(":", 1)
+            class_ = load_analysis_class(ana)
             if conf is not None:
                 res_analyses.append(class_(conf))
             else:
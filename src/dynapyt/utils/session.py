@@ -0,0 +1,128 @@
+"""
+Per-run session directories.
+
+A session is a directory that holds everything of one analysis run: the
+list of analyses, coverage, snapshots and other outputs. Its path is
+passed in the `DYNAPYT_SESSION` environment variable, so that all child
+processes of the run belong to the same session and concurrent runs do
+not interfere. Without a session, the runtime falls back to the global
+files in /tmp used by older versions.
+
+A temporary session, i.e. one that a run made up because none was given,
+is removed when the run ends, unless it holds other outputs than the list
+of analyses, coverage and snapshots, e.g. a profile or traces. Its coverage
+is added to the global coverage directory, like that of runs without a
+session.
+"""
+
+import os
+from pathlib import Path
+from typing import Optional
+
+SESSION_ENV = "DYNAPYT_SESSION"
+# pid of the process that started the session and collects the results of the others
+SESSION_ROOT_ENV = "DYNAPYT_SESSION_ROOT"
+
+_LEGACY_ANALYSES = "/tmp/dynapyt_analyses.txt"
+_LEGACY_COVERAGE = "/tmp/dynapyt_coverage"
+_LEGACY_HOOKS = "/tmp/dynapyt_hooks"
+
+
+def start_session(directory: str = None) -> str:
+    """
+    Makes `directory`, or the session inherited from the parent process, or
+    a new temporary directory the session of this process and its children.
+    """
+    if directory is None:
+        directory = os.environ.get(SESSION_ENV)
+    if directory is None:
+        import tempfile
+
+        directory = tempfile.mkdtemp(prefix="dynapyt-session-")
+    directory = os.path.abspath(directory)
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    os.environ[SESSION_ENV] = directory
+    os.environ[SESSION_ROOT_ENV] = str(os.getpid())
+    return directory
+
+
+def end_session(directory: str, keep: bool = False) -> Optional[str]:
+    """
+    Ends the temporary session `directory` of a run. Returns the directory
+    if it was kept, or None if it was removed.
+    """
+    from shutil import rmtree
+
+    # the list of analyses, coverage and snapshots were consumed by this run
+    consumed = {"analyses.txt", "coverage", "snapshots", "hooks.json"}
+    outputs = [
+        f
+        for f in Path(directory).rglob("*")
+        if f.is_file() and f.relative_to(directory).parts[0] not in consumed
+    ]
+    if not keep and len(outputs) == 0:
+        rmtree(directory, ignore_errors=True)
+    if os.environ.get(SESSION_ENV) == directory:
+        del os.environ[SESSION_ENV]
+        os.environ.pop(SESSION_ROOT_ENV, None)
+    return directory if keep or len(outputs) > 0 else None
+
+
+def session_dir() -> Optional[str]:
+    return os.environ.get(SESSION_ENV)
+
+
+def is_session_root() -> bool:
+    return session_dir() is not None and os.environ.get(SESSION_ROOT_ENV) == str(
+        os.getpid()
+    )
+
+
+def analyses_file() -> str:
+    session = session_dir()
+    if session is None:
+        return _LEGACY_ANALYSES
+    return os.path.join(session, "analyses.txt")
+
+
+def coverage_dir() -> str:
+    session = session_dir()
+    if session is None:
+        return _LEGACY_COVERAGE
+    return os.path.join(session, "coverage")
+
+
+def hooks_cache(directory: str) -> str:
+    """
+    Where the hooks of the analyses of the project in `directory` are
+    cached, in the session or else in /tmp, but never in the project.
+    """
+    session = session_dir()
+    if session is not None:
+        return os.path.join(session, "hooks.json")
+    import hashlib
+
+    project = hashlib.sha256(os.path.abspath(directory).encode()).hexdigest()
+    return os.path.join(_LEGACY_HOOKS, f"{project[:16]}.json")
+
+
+def profile_dir() -> Optional[str]:
+    session = session_dir()
+    if session is None:
+        return None
+    return os.path.join(session, "profile")
+
+
+def snapshot_dir() -> Optional[str]:
+    session = session_dir()
+    if session is None:
+        return None
+    return os.path.join(session, "snapshots")
+
+
+def output_path(name: str) -> str:
+    """Path for an output file of an analysis, inside the session if there is one."""
+    session = session_dir()
+    if session is None:
+        return name
+    return os.path.join(session, name)
@@ -0,0 +1,107 @@
+"""
+Shadow memory: metadata of analyses about live objects of the analyzed
+program, e.g. taint tags or allocation sites.
+
+Keying metadata by `id()` leaks it and, once the object is collected and its
+id reused, attaches it to an unrelated object. `ShadowMemory` holds a weak
+reference to every object that supports one and forgets its metadata when
+the object dies. Objects without weak references (ints, strings, lists,
+dicts, tuples, ...) are kept alive as long as they have metadata, so that
+their ids stay unique. At most `limit` objects are tracked, after that the
+least recently used ones are evicted; the limit defaults to the
+`DYNAPYT_SHADOW_MEMORY_LIMIT` environment variable.
+"""
+
+import os
+import weakref
+from collections import OrderedDict
+from typing import Any, Iterator
+
+LIMIT_ENV = "DYNAPYT_SHADOW_MEMORY_LIMIT"
+DEFAULT_LIMIT = 1 << 20
+
+_MISSING = object()
+
+
+class ShadowMemory:
+    def __init__(self, limit: int = None) -> None:
+        if limit is None:
+            limit = int(os.environ.get(LIMIT_ENV, DEFAULT_LIMIT))
+        if limit <= 0:
+            raise ValueError("The limit of a shadow memory must be positive")
+        self.limit = limit
+        self.evicted = 0
+        # id -> (weak reference or the object itself, metadata)
+        self.__entries = OrderedDict()
+
+    def __forget(self, key: int, ref: weakref.ref):
+        entry = self.__entries.get(key)
+        # the id may already belong to a new object
+        if entry is not None and entry[0] is ref:
+            del self.__entries[key]
+
+    def __lookup(self, obj: Any):
+        key = id(obj)
+        entry = self.__entries.get(key)
+        if entry is None:
+            return key, None
+        holder = entry[0]
+        if holder is obj or (type(holder) is weakref.ref and holder() is obj):
+            return key, entry
+        return key, None
+
+    def __setitem__(self, obj: Any, value: Any):
+        key, entry = self.__lookup(obj)
+        if entry is not None:
+            self.__entries[key] = (entry[0], value)
+            self.__entries.move_to_end(key)
+            return
+        try:
+            holder = weakref.ref(obj, lambda ref, key=key: self.__forget(key, ref))
+        except TypeError:
+            holder = obj
+        self.__entries[key] = (holder, value)
+        if len(self.__entries) > self.limit:
+            self.__entries.popitem(last=False)
+            self.evicted += 1
+
+    def __getitem__(self, obj: Any) -> Any:
+        value = self.get(obj, _MISSING)
+        if value is _MISSING:
+            raise KeyError(obj)
+        return value
+
+    def get(self, obj: Any, default: Any = None) -> Any:
+        key, entry = self.__lookup(obj)
+        if entry is None:
+            return default
+        self.__entries.move_to_end(key)
+        return entry[1]
+
+    def __contains__(self, obj: Any) -> bool:
+        return self.__lookup(obj)[1] is not None
+
+    def __delitem__(self, obj: Any):
+        key, entry = self.__lookup(obj)
+        if entry is None:
+            raise KeyError(obj)
+        del self.__entries[key]
+
+    def discard(self, obj: Any):
+        key, entry = self.__lookup(obj)
+        if entry is not None:
+            del self.__entries[key]
+
+    def add(self, obj: Any):
+        """Tags `obj`, for analyses that use the shadow memory as a set."""
+        self[obj] = True
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def objects(self) -> Iterator[Any]:
+        """The live objects that have metadata."""
+        for holder, _ in list(self.__entries.values()):
+            obj = holder() if type(holder) is weakref.ref else holder
+            if obj is not None:
+                yield obj
@@ -0,0 +1,13 @@
+from typing import Any
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+from dynapyt.instrument.filters import operand_types
+
+
+class TestAnalysis(BaseAnalysis):
+    @operand_types(right=[list])
+    def _in(self, dyn_ast: str, iid: int, left: Any, right: Any, result: Any) -> Any:
+        print(f"in {type(right).__name__} {result}")
+
+    @operand_types(left=["int"], right=["int"])
+    def add(self, dyn_ast: str, iid: int, left: Any, right: Any, result: Any) -> Any:
+        print(f"add {left} {right}")
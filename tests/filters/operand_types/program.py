@@ -0,0 +1,19 @@
+from typing import List, Set
+
+listed: List[int] = [1, 2]
+numbers: set = {1, 2}
+unknown = {1, 2}
+
+
+def check(key, keys: Set[int]):
+    return key in keys
+
+
+print(1 in [1, 2])
+print(1 in {1, 2})
+print(1 in listed)
+print(1 in numbers)
+print(1 in unknown)
+print(1 in set(listed))
+print(check(1, {1}))
+print("a" + "b", 1 + 2, True + 1, [1] + [2])
@@ -0,0 +1,12 @@
+from typing import Any, Callable, List
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+
+
+class TestAnalysis(BaseAnalysis):
+    def add(self, dyn_ast: str, iid: int, left: Any, right: Any, result: Any) -> Any:
+        print(f"add {left} {right}")
+
+    def function_enter(
+        self, dyn_ast: str, iid: int, args: List[Any], name: str, is_lambda: bool
+    ) -> None:
+        print(f"enter {name}")
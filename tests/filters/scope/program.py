@@ -0,0 +1,26 @@
+# DYNAPYT: Only program.parse_* program.Parser
+# DYNAPYT: Ignore program.Parser.skip
+
+
+def parse_int(s):
+    def inner():
+        return 2 + 3
+
+    return int(s) + inner()
+
+
+def helper():
+    return 4 + 5
+
+
+class Parser:
+    offset = 6 + 7
+
+    def parse(self):
+        return self.offset + 8
+
+    def skip(self):
+        return 9 + 10
+
+
+print(parse_int("1"), helper(), Parser().parse(), Parser().skip(), 11 + 12)
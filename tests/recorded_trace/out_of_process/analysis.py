@@ -0,0 +1,20 @@
+import dynapyt.trace.pipeline as pipeline
+
+
+class TestAnalysis(pipeline.OutOfProcessAnalysis):
+    def __init__(self):
+        super().__init__(
+            [
+                "dynapyt.analyses.BranchCoverage.BranchCoverage",
+                "dynapyt.analyses.OperationAnalysis.OperationAnalysis",
+            ],
+            capacity=16,
+        )
+
+    def end_execution(self):
+        if self.processes is None:
+            return
+        super().end_execution()
+        print("consumed", self.consumed, "dropped", self.dropped)
+        for (iid, cond), n in sorted(self.results[0].branches.items()):
+            print(f"Branch {iid} {cond} {n}")
@@ -0,0 +1,4 @@
+# DYNAPYT: Requires multiprocessing.shared_memory
+for i in range(3):
+    if i % 2 == 0:
+        print(i * 10)
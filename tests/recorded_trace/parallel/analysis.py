@@ -0,0 +1,17 @@
+import dynapyt.trace.pipeline as pipeline
+
+
+class TestAnalysis(pipeline.OutOfProcessAnalysis):
+    def __init__(self):
+        super().__init__(
+            "dynapyt.analyses.OperationAnalysis.OperationAnalysis;"
+            "dynapyt.analyses.BranchCoverage.BranchCoverage,"
+            "dynapyt.analyses.OperationAnalysis.OperationAnalysis",
+        )
+
+    def end_execution(self):
+        if self.processes is None:
+            return
+        super().end_execution()
+        print("consumed", self.consumed, "dropped", self.dropped)
+        print([type(a).__name__ for a in self.results])
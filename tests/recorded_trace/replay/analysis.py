@@ -0,0 +1,25 @@
+import tempfile
+from os import path, remove
+import dynapyt.analyses.TraceRecorder as recorder
+from dynapyt.trace.replay import replay
+
+
+class TestAnalysis(recorder.TraceRecorder):
+    def __init__(self):
+        super().__init__(
+            None, path.join(tempfile.gettempdir(), "dynapyt-replay.dyntrace")
+        )
+
+    def end_execution(self):
+        if self.writer.closed:
+            return
+        super().end_execution()
+        print("replaying")
+        replay(
+            [self.path],
+            [
+                "dynapyt.analyses.BranchCoverage.BranchCoverage",
+                "dynapyt.analyses.OperationAnalysis.OperationAnalysis",
+            ],
+        )
+        remove(self.path)
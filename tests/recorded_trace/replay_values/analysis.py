@@ -0,0 +1,19 @@
+import tempfile
+from os import path, remove
+import dynapyt.analyses.TraceRecorder as recorder
+from dynapyt.trace.replay import replay
+
+
+class TestAnalysis(recorder.TraceRecorder):
+    def __init__(self):
+        super().__init__(
+            None, path.join(tempfile.gettempdir(), "dynapyt-replay-values.dyntrace")
+        )
+
+    def end_execution(self):
+        if self.writer.closed:
+            return
+        super().end_execution()
+        print("replaying")
+        replay([self.path], ["recorded_trace.replay_values.values.Values"])
+        remove(self.path)
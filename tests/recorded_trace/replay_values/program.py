@@ -0,0 +1,2 @@
+x = 3 + 4
+print(max(x, 2, key=abs))
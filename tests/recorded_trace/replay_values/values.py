@@ -0,0 +1,9 @@
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+
+
+class Values(BaseAnalysis):
+    def binary_operation(self, dyn_ast, iid, op, left, right, result):
+        print("binary_operation", op, left, right, result)
+
+    def post_call(self, dyn_ast, iid, result, call, pos_args, kw_args):
+        print("post_call", result, call, pos_args, kw_args)
@@ -0,0 +1,20 @@
+import tempfile
+from os import path, remove
+import dynapyt.analyses.TraceRecorder as recorder
+from dynapyt.trace.reader import TraceReader
+
+
+class TestAnalysis(recorder.TraceRecorder):
+    def __init__(self):
+        super().__init__(
+            "zlib", path.join(tempfile.gettempdir(), "dynapyt-test.dyntrace")
+        )
+
+    def end_execution(self):
+        if self.writer.closed:
+            return
+        super().end_execution()
+        with TraceReader(self.path) as trace:
+            for record in trace:
+                print(record.seq, record.hook, record.iid, record.values)
+        remove(self.path)
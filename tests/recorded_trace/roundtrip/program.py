@@ -0,0 +1,3 @@
+x = 1 + 2.5
+if x > 3:
+    print("big")
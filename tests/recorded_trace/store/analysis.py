@@ -0,0 +1,30 @@
+import shutil
+import tempfile
+from os import path, remove
+import dynapyt.analyses.TraceRecorder as recorder
+from dynapyt.trace.store import TraceStore
+
+
+class TestAnalysis(recorder.TraceRecorder):
+    def __init__(self):
+        super().__init__(
+            "zlib", path.join(tempfile.gettempdir(), "dynapyt-store.dyntrace")
+        )
+
+    def end_execution(self):
+        if self.writer.closed:
+            return
+        super().end_execution()
+        directory = tempfile.mkdtemp(prefix="dynapyt-store-")
+        store = TraceStore.build([self.path], directory)
+        for _, _, name, n in store.call_counts():
+            print(f"calls {name} {n}")
+        for _, _, taken, total, ratio in store.branch_ratios():
+            print(f"branch {taken}/{total} {ratio:.2f}")
+        hooks = store.count_by("hook")
+        print("binary_operation", hooks[(store.hook_id("binary_operation"),)])
+        print("top", store.top_iids(1, "function_enter")[0][2])
+        counts, _ = store.histogram("hook", bins=4)
+        print("histogram", int(counts.sum()) == len(store))
+        shutil.rmtree(directory)
+        remove(self.path)
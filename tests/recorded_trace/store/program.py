@@ -0,0 +1,17 @@
+# DYNAPYT: Requires numpy
+def square(x):
+    return x * x
+
+
+for i in range(4):
+    if i % 2 == 0:
+        square(i)
+square(5)
+
+
+def compute_the_square_of_a_number_with_a_name_longer_than_sixty_four_chars(x):
+    return x * x
+
+
+compute_the_square_of_a_number_with_a_name_longer_than_sixty_four_chars(1)
+compute_the_square_of_a_number_with_a_name_longer_than_sixty_four_chars(2)
@@ -0,0 +1,31 @@
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+from dynapyt.utils.context import task_context
+
+
+class TestAnalysis(BaseAnalysis):
+    def __init__(self):
+        super().__init__()
+        self.events = []
+
+    def function_enter(self, dyn_ast, iid, args, name, is_lambda):
+        context = task_context()
+        if context is not None:
+            context.data[name] = context.data.get(name, 0) + 1
+
+    def add(self, dyn_ast, iid, left, right, result):
+        # the calls of value() so far in this task, not in all tasks
+        context = task_context()
+        self.events.append(f"{context.task_id} {context.data['value']} {result}")
+
+    def _and(self, dyn_ast, iid, left, right, result):
+        context = task_context()
+        self.events.append(f"{context.task_id} and {result}")
+
+    def enter_if(self, dyn_ast, iid, cond_value):
+        context = task_context()
+        if context is not None:
+            self.events.append(f"{context.task_id} if {cond_value}")
+
+    def end_execution(self):
+        for event in sorted(self.events):
+            print(event)
@@ -0,0 +1,22 @@
+import asyncio
+
+
+async def value(x):
+    await asyncio.sleep(0)
+    return x
+
+
+async def worker(n):
+    total = 0
+    for i in range(n):
+        total = total + await value(i)
+    odd = await value(total % 2 == 1) and await value("odd")
+    return await value("small") if total < 3 else "large"
+
+
+async def main():
+    tasks = [asyncio.ensure_future(worker(n)) for n in (2, 3)]
+    print(await asyncio.gather(*tasks))
+
+
+asyncio.run(main())
@@ -0,0 +1,9 @@
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+
+
+class TestAnalysis(BaseAnalysis):
+    def _and(self, dyn_ast, iid, left, right, result):
+        print("and", left, right, result)
+
+    def _or(self, dyn_ast, iid, left, right, result):
+        print("or", left, right, result)
@@ -0,0 +1,40 @@
+import asyncio
+
+
+class Counted:
+    # counts how often its truth value is asked for
+    tests = 0
+
+    def __init__(self, value):
+        self.value = value
+
+    def __bool__(self):
+        Counted.tests += 1
+        return self.value
+
+    def __repr__(self):
+        return f"Counted({self.value})"
+
+
+async def value(x):
+    await asyncio.sleep(0)
+    return x
+
+
+def exhausted():
+    return next(iter([]))
+
+
+async def main():
+    print(await value(Counted(True)) and await value("right"))
+    print(await value(Counted(False)) or await value(0))
+    print(Counted.tests)
+    try:
+        await value(True) and exhausted()
+    except StopIteration:
+        print("StopIteration")
+    if await value(None) or await value(2):
+        print("if")
+
+
+asyncio.run(main())
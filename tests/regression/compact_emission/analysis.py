@@ -0,0 +1,21 @@
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+from dynapyt.instrument.filters import once
+
+
+class TestAnalysis(BaseAnalysis):
+    def binary_operation(self, dyn_ast, iid, op, left, right, result):
+        print("binary_operation", op, left, right, result)
+
+    def read_identifier(self, dyn_ast, iid, val):
+        if callable(val):
+            print("read_identifier", val.__name__)
+
+    @once
+    def integer(self, dyn_ast, iid, val):
+        print("integer", val)
+
+    def function_enter(self, dyn_ast, iid, args, name, is_lambda):
+        print("function_enter", name)
+
+    def function_exit(self, dyn_ast, iid, name, result):
+        print("function_exit", name, result)
@@ -0,0 +1,9 @@
+# DYNAPYT: Compact
+
+
+def double(x):
+    return x * 2
+
+
+for i in range(2):
+    print(double(i) + 1)
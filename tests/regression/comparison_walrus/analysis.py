@@ -0,0 +1,6 @@
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+
+
+class TestAnalysis(BaseAnalysis):
+    def less_than(self, dyn_ast, iid, left, right, result):
+        print("less_than", left, right, result)
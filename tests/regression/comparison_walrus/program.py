@@ -0,0 +1,19 @@
+# DYNAPYT: Python 3.8
+def f():
+    return 5
+
+
+if 0 < 3 < (n := f()):
+    print(n)
+
+
+def numbers():
+    print(0 < 1 < (yield 2))
+
+
+generator = numbers()
+print(next(generator))
+try:
+    generator.send(3)
+except StopIteration:
+    pass
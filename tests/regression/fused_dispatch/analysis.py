@@ -0,0 +1,27 @@
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+
+
+class TestAnalysis(BaseAnalysis):
+    def literal(self, dyn_ast, iid, val):
+        if isinstance(val, int):
+            print("first literal", val)
+            return val + 1
+
+    def integer(self, dyn_ast, iid, val):
+        print("first integer", val)
+        return val * 10
+
+    def enter_if(self, dyn_ast, iid, cond_value):
+        print("first enter_if", cond_value)
+
+
+class TestOtherAnalysis(BaseAnalysis):
+    def integer(self, dyn_ast, iid, val):
+        print("other integer", val)
+        # the last analysis of a level decides its result, even if it is None
+        if val != 1:
+            return val * 100
+
+    def enter_control_flow(self, dyn_ast, iid, cond_value):
+        print("other enter_control_flow", cond_value)
+        return False
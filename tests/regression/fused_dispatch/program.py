@@ -0,0 +1,8 @@
+x = 1
+print(x)
+y = 2
+print(y)
+if x:
+    print("then")
+else:
+    print("else")
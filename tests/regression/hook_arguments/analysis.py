@@ -0,0 +1,14 @@
+import dynapyt.runtime as rt
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+
+
+class TestAnalysis(BaseAnalysis):
+    def operation(self, dyn_ast, iid, operator, operands, result):
+        print(operator, operands, result)
+
+    def write(self, dyn_ast, iid, old_vals, new_val):
+        # reads only the new value, the runtime passes None for old_vals
+        print("write", new_val)
+
+    def end_execution(self):
+        print(sorted(rt.hook_args["operation"]), sorted(rt.hook_args["write"]))
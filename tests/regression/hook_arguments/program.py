@@ -0,0 +1,4 @@
+x = 1
+x = x + 2
+y = -x
+print(x < 5 < y)
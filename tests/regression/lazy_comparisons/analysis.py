@@ -0,0 +1,10 @@
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+
+
+class TestAnalysis(BaseAnalysis):
+    def operation(self, dyn_ast, iid, operator, operands, result):
+        if operator == "LessThan":
+            print("operation", operands, result)
+
+    def less_than(self, dyn_ast, iid, left, right, result):
+        print("less_than", left, right, result)
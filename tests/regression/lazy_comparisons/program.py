@@ -0,0 +1,26 @@
+calls = []
+
+
+def expensive(value):
+    calls.append(value)
+    return value
+
+
+print(1 < expensive(0) < expensive(5))
+print(1 < expensive(2) < expensive(3) < expensive(4))
+print(calls)
+
+
+class Elementwise:
+    # like a NumPy array, has no truth value
+    def __lt__(self, other):
+        return self
+
+    def __bool__(self):
+        raise ValueError("truth value is ambiguous")
+
+    def __repr__(self):
+        return "Elementwise()"
+
+
+print(Elementwise() < 1)
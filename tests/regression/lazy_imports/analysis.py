@@ -0,0 +1,6 @@
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+
+
+class TestAnalysis(BaseAnalysis):
+    def end_execution(self):
+        print("end")
@@ -0,0 +1,10 @@
+import os
+import subprocess
+import sys
+import dynapyt
+
+# a fresh interpreter, this one already has json and argparse loaded
+src = os.path.dirname(os.path.dirname(dynapyt.__file__))
+env = dict(os.environ, PYTHONPATH=os.pathsep.join([src] + sys.path))
+check = "import sys, dynapyt.runtime; print('json' in sys.modules, 'argparse' in sys.modules)"
+print("loaded", subprocess.check_output([sys.executable, "-c", check], env=env, text=True).strip())
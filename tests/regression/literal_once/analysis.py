@@ -0,0 +1,17 @@
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+from dynapyt.instrument.filters import once
+
+
+class TestAnalysis(BaseAnalysis):
+    @once
+    def integer(self, dyn_ast, iid, val):
+        print("integer", val)
+
+    @once
+    def string(self, dyn_ast, iid, val):
+        print("string", val)
+        if val == "old":
+            return "new"
+
+    def boolean(self, dyn_ast, iid, val):
+        print("boolean", val)
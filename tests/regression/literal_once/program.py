@@ -0,0 +1,3 @@
+for i in range(3):
+    print(i + 10, "old" + "!", f"{i} x")
+    print(True)
@@ -0,0 +1,6 @@
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+
+
+class TestAnalysis(BaseAnalysis):
+    def loop_summary(self, dyn_ast, iid, iterations, exited_by):
+        print("loop", iterations, exited_by)
@@ -0,0 +1,51 @@
+total = 0
+for i in range(1000):
+    total += i
+print(total)
+
+for c in "abc":
+    if c == "b":
+        break
+else:
+    print("not printed")
+
+for c in []:
+    pass
+else:
+    print("empty")
+
+
+def find(items, wanted):
+    for index, item in enumerate(items):
+        if item == wanted:
+            return index
+
+
+print(find([3, 4, 5], 4))
+
+try:
+    for x in [1, 2, 0]:
+        print(1 // x)
+except ZeroDivisionError:
+    print("caught")
+
+for row in [[1, 2], [3]]:
+    for cell in row:
+        continue
+
+
+def gen():
+    for y in range(3):
+        yield y
+
+
+print(list(gen()))
+
+
+class Table:
+    for n in range(2):
+        pass
+
+
+# the loops leave no names behind
+print([name for name in list(globals()) + list(vars(Table)) if "loop" in name])
@@ -0,0 +1,13 @@
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+
+
+class TestAnalysis(BaseAnalysis):
+    def __init__(self):
+        super().__init__()
+        self.events = 0
+
+    def runtime_event(self, dyn_ast, iid):
+        self.events += 1
+
+    def end_execution(self):
+        print("events", self.events)
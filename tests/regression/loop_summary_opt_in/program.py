@@ -0,0 +1,5 @@
+total = 0
+for i in range(3):
+    total += i
+with open(__file__) as f:
+    print("summarized", "_rt._loop" + "_(" in f.read())
@@ -0,0 +1,37 @@
+import sys
+import threading
+import dynapyt.runtime as rt
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+from dynapyt.utils.context import event_context
+
+
+class TestAnalysis(BaseAnalysis):
+    def read_attribute(self, dyn_ast, iid, base, attr, val):
+        if attr.startswith("__") and not attr.endswith("__"):
+            print("read", attr, val)
+
+    def delete(self, dyn_ast, iid, del_target):
+        print("delete", [target[1] for target in del_target])
+
+    def end_execution(self):
+        # private names in code without a class are resolved at runtime,
+        # through the cached names of the class and its bases
+        program = sys.modules[__name__.rsplit(".", 1)[0] + ".program"]
+        child = program.Child()
+        print(rt._private_attr(child, "__secret"))
+        del child._Child__secret
+        print(rt._private_attr(child, "__secret"))
+        print(event_context().private_names.get(program.Child))
+        # other threads resolve the names in caches of their own
+        found = []
+
+        def lookup():
+            cache_of_thread = event_context().private_names is None
+            found.append((rt._private_attr(child, "__secret"), cache_of_thread))
+
+        threads = [threading.Thread(target=lookup) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        print(found)
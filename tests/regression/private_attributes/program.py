@@ -0,0 +1,24 @@
+class _Base:
+    def __init__(self):
+        self.__secret = 1
+
+    def secret(self):
+        return self.__secret
+
+
+class Child(_Base):
+    def __init__(self):
+        super().__init__()
+        self.__secret = 2
+
+    def both(self):
+        return self.__secret, self.secret()
+
+    def drop(self):
+        del self.__secret
+
+
+child = Child()
+print(child.both())
+child.drop()
+print(hasattr(child, "_Child__secret"), child._Base__secret)
@@ -0,0 +1,15 @@
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+
+
+class TestAnalysis(BaseAnalysis):
+    def __init__(self):
+        super().__init__()
+        self.reported = 0
+
+    def integer(self, dyn_ast, iid, val):
+        if val == 42:
+            self.reported += 1
+            print("integer", val)
+
+    def profile_state(self):
+        return self.reported
@@ -0,0 +1,11 @@
+# DYNAPYT: Prune
+
+
+def answer():
+    return 42
+
+
+x = 1 + 2
+with open(__file__) as f:
+    calls = f.read().count("_rt._int" + "_(")
+print(x, answer(), calls)
@@ -0,0 +1,14 @@
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+
+
+class TestAnalysis(BaseAnalysis):
+    def __init__(self):
+        super().__init__()
+        self.total = 0
+
+    def integer(self, dyn_ast, iid, val):
+        # reports no state, all reached sites are kept
+        self.total += val
+
+    def end_execution(self):
+        print(self.total)
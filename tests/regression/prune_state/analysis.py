@@ -0,0 +1,18 @@
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+
+
+class TestAnalysis(BaseAnalysis):
+    def __init__(self):
+        super().__init__()
+        self.seen = {"big": []}
+
+    def integer(self, dyn_ast, iid, val):
+        # changes the state deep inside an attribute
+        if val > 40:
+            self.seen["big"].append(val)
+
+    def profile_state(self):
+        return len(self.seen["big"])
+
+    def end_execution(self):
+        print(self.seen)
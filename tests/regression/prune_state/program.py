@@ -0,0 +1,8 @@
+# DYNAPYT: Prune
+
+x = 1 + 2
+y = 41
+z = 42
+with open(__file__) as f:
+    calls = f.read().count("_rt._int" + "_(")
+print(x, y, z, calls)
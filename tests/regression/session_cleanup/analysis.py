@@ -0,0 +1,18 @@
+from os import path
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+from dynapyt.utils.session import session_dir
+
+
+class TestAnalysis(BaseAnalysis):
+    def __init__(self):
+        super().__init__()
+        self.session = None
+
+    def end_execution(self):
+        if self.session is None:
+            # the end of the run
+            self.session = session_dir()
+            print("session", path.isdir(self.session))
+        else:
+            # after the run, the temporary session without outputs is gone
+            print("removed", not path.exists(self.session), session_dir() is None)
@@ -0,0 +1,20 @@
+from os import path
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+from dynapyt.utils.session import analyses_file, coverage_dir, session_dir
+
+
+class TestAnalysis(BaseAnalysis):
+    def __init__(self):
+        super().__init__()
+        self.ended = False
+
+    def end_execution(self):
+        if self.ended:
+            return
+        self.ended = True
+        session = session_dir()
+        print(path.basename(session).startswith("dynapyt-session-"))
+        print(path.dirname(analyses_file()) == session)
+        print(path.dirname(coverage_dir()) == session)
+        with open(analyses_file(), "r") as f:
+            print(f.read())
@@ -0,0 +1,2 @@
+# DYNAPYT: Run as file
+print("running")
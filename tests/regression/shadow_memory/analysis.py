@@ -0,0 +1,16 @@
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+from dynapyt.utils.shadow_memory import ShadowMemory
+
+
+class TestAnalysis(BaseAnalysis):
+    def __init__(self):
+        super().__init__()
+        self.allocations = ShadowMemory(limit=3)
+
+    def write(self, dyn_ast, iid, old_vals, new_val):
+        if type(new_val).__name__ in ("Box", "list"):
+            self.allocations[new_val] = iid
+
+    def end_execution(self):
+        print(len(self.allocations), self.allocations.evicted)
+        print(sorted(type(o).__name__ for o in self.allocations.objects()))
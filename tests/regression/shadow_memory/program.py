@@ -0,0 +1,11 @@
+class Box:
+    pass
+
+
+kept = []
+for i in range(4):
+    box = Box()
+    if i % 2 == 0:
+        kept.append(box)
+names = ["a"]
+del box
@@ -0,0 +1,18 @@
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+from dynapyt.utils.context import call_depth, caller, current_function
+
+
+class TestAnalysis(BaseAnalysis):
+    uses_call_stack = True
+
+    def pre_call(self, dyn_ast, iid, function, pos_args, kw_args):
+        if getattr(function, "__name__", None) != "log":
+            return
+        current = current_function()
+        calling = caller()
+        print(
+            pos_args[0],
+            call_depth(),
+            current.name,
+            calling.name if calling is not None else None,
+        )
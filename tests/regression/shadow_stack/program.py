@@ -0,0 +1,44 @@
+from contextlib import suppress
+
+
+def log(message):
+    pass
+
+
+def countdown(n):
+    log(f"countdown {n}")
+    if n > 0:
+        return countdown(n - 1)
+
+
+def numbers():
+    log("numbers start")
+    yield 1
+    log("numbers resumed")
+    yield 2
+
+
+def fail():
+    raise ValueError()
+
+
+def consume():
+    for _ in numbers():
+        log("consume loop")
+    try:
+        fail()
+    except ValueError:
+        pass
+    log("consume end")
+
+
+def quiet():
+    with suppress(ValueError):
+        fail()
+    log("quiet")
+    countdown(0)
+
+
+countdown(2)
+consume()
+quiet()
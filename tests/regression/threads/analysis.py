@@ -0,0 +1,17 @@
+import threading
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+from dynapyt.utils.context import event_context, event_contexts
+
+
+class TestAnalysis(BaseAnalysis):
+    def enter_control_flow(self, dyn_ast, iid, cond_value):
+        context = event_context()
+        context.data["branches"] = context.data.get("branches", 0) + 1
+
+    def end_execution(self):
+        contexts = event_contexts()
+        print(len(contexts))
+        main = threading.main_thread().ident
+        for context in sorted(contexts, key=lambda c: c.thread_name):
+            if context.thread_id != main:
+                print(context.thread_name, context.data.get("branches"))
@@ -0,0 +1,19 @@
+import threading
+
+
+def count_even(n):
+    evens = 0
+    for i in range(n):
+        if i % 2 == 0:
+            evens += 1
+    return evens
+
+
+workers = [
+    threading.Thread(target=count_even, args=(n,), name=f"worker-{n}")
+    for n in (10, 20, 30)
+]
+for worker in workers:
+    worker.start()
+for worker in workers:
+    worker.join()
@@ -1,14 +1,17 @@
 from importlib import import_module
 from os import sep, remove
-from os.path import join, exists
+from os.path import join, exists, abspath
 from shutil import copyfile, move
 from inspect import getmembers, isclass
+import sys
 from typing import Tuple
 import pytest
 
 from dynapyt.instrument.instrument import instrument_file
+from dynapyt.instrument.scope import Scope
 from dynapyt.utils.hooks import get_hooks_from_analysis
 from dynapyt.run_analysis import run_analysis
+from dynapyt.prune import relevant_sites
 import dynapyt.runtime as rt
 from dynapyt.analyses.BaseAnalysis import BaseAnalysis
 
@@ -35,6 +38,17 @@ def correct_output(expected: str, actual: str) -> bool:
 def test_runner(directory_pair: Tuple[str, str], capsys):
     abs_dir, rel_dir = directory_pair
 
+    # skip tests of optional features whose dependencies are missing
+    with open(join(abs_dir, "program.py"), "r") as file:
+        for line in file.read().split("\n"):
+            if line.startswith("# DYNAPYT: Requires "):
+                for name in line[len("# DYNAPYT: Requires ") :].split():
+                    pytest.importorskip(name)
+            elif line.startswith("# DYNAPYT: Python "):
+                version = line[len("# DYNAPYT: Python ") :].strip()
+                if sys.version_info < tuple(int(v) for v in version.split(".")):
+                    pytest.skip(f"needs Python {version}")
+
     # gather hooks used by the analysis
     module_prefix = rel_dir.replace(sep, ".")
     module = import_module(f"{module_prefix}.analysis")
@@ -50,6 +64,10 @@ def test_runner(directory_pair: Tuple[str, str], capsys):
     orig_program_file = join(abs_dir, "program.py.orig")
     # make sure to instrument the uninstrumented version
     run_as_file = False
+    compact = False
+    prune = False
+    only = None
+    ignore = None
     with open(program_file, "r") as file:
         src = file.read()
         if "DYNAPYT: DO NOT INSTRUMENT" in src:
@@ -58,18 +76,47 @@ def test_runner(directory_pair: Tuple[str, str], capsys):
             copyfile(orig_program_file, program_file)
         elif "# DYNAPYT: Run as file" in src:
             run_as_file = True
+        if "# DYNAPYT: Compact" in src:
+            compact = True
+        if "# DYNAPYT: Prune" in src:
+            prune = True
+        for line in src.split("\n"):
+            if line.startswith("# DYNAPYT: Only "):
+                only = line[len("# DYNAPYT: Only ") :].split()
+            elif line.startswith("# DYNAPYT: Ignore "):
+                ignore = line[len("# DYNAPYT: Ignore ") :].split()
+    scope = None
+    if only is not None or ignore is not None:
+        scope = Scope(only, ignore)
 
-    instrument_file(program_file, selected_hooks)
+    instrument_file(program_file, selected_hooks, compact, None, scope)
 
     if exists(join(abs_dir, "__init__.py")) and not exists(
         join(abs_dir, "__init__.py.orig")
     ):
-        instrument_file(join(abs_dir, "__init__.py"), selected_hooks)
+        instrument_file(join(abs_dir, "__init__.py"), selected_hooks, compact)
 
     # analyze
     # class_ = getattr(module, "TestAnalysis")
     analysis_instances = [class_[1]() for class_ in analysis_classes]
     rt.analyses = None
+    rt.profiling = prune
+    if prune:
+        # profiling run, then instrument again only at the relevant sites
+        rt.set_analysis(analysis_instances)
+        import_module(f"{module_prefix}.program")
+        sites = relevant_sites(
+            rt.collected_profile(),
+            [f"{module_prefix}.analysis.{class_[0]}" for class_ in analysis_classes],
+        ).get(abspath(orig_program_file), set())
+        copyfile(orig_program_file, program_file)
+        instrument_file(program_file, selected_hooks, compact, sites)
+        del sys.modules[f"{module_prefix}.program"]
+        analysis_instances = [class_[1]() for class_ in analysis_classes]
+        rt.analyses = None
+        rt.profiling = False
+    if run_as_file:
+        rt.end_execution_called = False
     rt.set_analysis(analysis_instances)
     captured = capsys.readouterr()  # clear stdout
     # print(f"Before analysis: {captured.out}")  # for debugging purposes
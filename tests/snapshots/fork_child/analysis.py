@@ -0,0 +1,16 @@
+import os
+import dynapyt.analyses.BranchCoverage as branch_coverage
+
+
+class TestAnalysis(branch_coverage.BranchCoverage):
+    def __init__(self):
+        super().__init__()
+        self.pid = os.getpid()
+
+    def end_execution(self):
+        if self.pid != os.getpid():
+            return
+        # reported once, by the parent, after merging the shard of the child
+        self.pid = None
+        for (iid, cond), n in sorted(self.branches.items()):
+            print(cond, n)
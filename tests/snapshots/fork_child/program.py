@@ -0,0 +1,16 @@
+# DYNAPYT: Run as file
+import multiprocessing
+
+
+def count_even(n):
+    evens = 0
+    for i in range(n):
+        if i % 2 == 0:
+            evens += 1
+    return evens
+
+
+child = multiprocessing.get_context("fork").Process(target=count_even, args=(4,))
+child.start()
+child.join()
+print(count_even(2))
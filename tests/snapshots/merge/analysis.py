@@ -0,0 +1,37 @@
+import os
+import shutil
+import tempfile
+import dynapyt.analyses.BranchCoverage as branch_coverage
+import dynapyt.analyses.CallGraph as call_graph
+import dynapyt.analyses.BaseAnalysis as base_analysis
+from dynapyt.merge_snapshots import merge_snapshots, write_snapshots
+
+
+class TestAnalysis(branch_coverage.BranchCoverage):
+    def end_execution(self):
+        directory = tempfile.mkdtemp(prefix="dynapyt-snapshots-")
+        # two workers that observed the same execution
+        write_snapshots([self], directory)
+        os.rename(
+            os.path.join(directory, f"snapshot-{os.getpid()}.jsonl"),
+            os.path.join(directory, "snapshot-0.jsonl"),
+        )
+        write_snapshots([self], directory)
+        merged = merge_snapshots(directory)
+        shutil.rmtree(directory)
+        print([type(a).__name__ for a in merged])
+        branch_coverage.BranchCoverage.end_execution(merged[0])
+
+        graph = call_graph.CallGraph.__new__(call_graph.CallGraph)
+        graph.graph = {"a": ["b", "c"]}
+        graph.merge({"graph": {"a": ["c", "d"], "e": ["a"]}})
+        print(graph.serialize())
+
+        try:
+
+            class SnapshotOnly(base_analysis.BaseAnalysis):
+                def snapshot(self):
+                    return {}
+
+        except TypeError as e:
+            print(e)